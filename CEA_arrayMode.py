@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 23:57:41 2026
+Complex Environmental Acoustics (CEA) modeling.
+Frank McQuarrie, Skidaway Institute of Oceanography
+
+Purpose of script: Model a whole receiver array at once, from instrument positions and gridded bathymetry.
+The scenarios in CEA_createEnv are single transects between hand-picked pairs (FS17, STSNew1, SURT20), each with
+hand-made bathymetry. An array of N transceivers has N x (N - 1) transects (each direction is its own transect, as
+the transmitter and receiver depths swap). Here every one of them is built automatically:
+    bathymetry  read off the grid along the line between the two instruments (CEA_bathymetryGrid)
+    surface     the chosen CEA_surfaceLevels surface over the transect's length
+    SSP         the stratified profile, deep and long enough for the transect
+and all of them are solved through the async Bellhop runner. The result is a detection matrix: the detectable
+fraction of arrivals from each transmitter (rows) at each receiver (columns).
+
+The instruments file is a CSV with columns name, x, y, depth: position in the bathymetry grid's coordinates (m)
+and instrument depth (m). Every instrument is used as both a transmitter and a receiver.
+
+Scripts.
+CEA_automate : current. Runs and saves outputs from propagation modeling.
+CEA_singleExperiment: Run and save a specific model.
+
+CEA_createEnv: Creates an environment for Bellhop to model sound through.
+CEA_ssp: Sets a soundspeed profile. Currently set to create one given stratification strength and depth.
+CEA_surfaceLevels: defines surface waves for the environment.
+
+CEA_rayTracing: Traces (and can plot) sound pathways through the environment.
+CEA_arrivals: Measures signal strength and arrival timing for sound through the environment. Also adds initial power, and given a detection threshold, can define a ray as detectable or not.
+CEA_bathymetryGrid: Gridded bathymetry, with depth profiles extracted along any line.
+******CEA_arrayMode: Builds and solves every transect of a receiver array, giving an N x N detection matrix.
+
+Usage:
+    python CEA_arrayMode.py <instruments.csv> <bathymetry grid> [--surface mid_waves] [--SBL 5] [--threshold 50]
+                            [--max-range 1500] [--out detectionMatrix.csv]
+"""
+
+import math
+import argparse
+import numpy as np
+import CEA_surfaceLevels
+from CEA_lazy import lazyModule
+from CEA_createEnv import buildSSP, envFromGeometry
+from CEA_arrivals import processArrivals
+from CEA_asyncRunner import runJobs
+from CEA_bathymetryGrid import BathymetryProvider
+pd = lazyModule("pandas")  # Imported on first use (see CEA_lazy).
+
+INSTRUMENT_COLUMNS = ("name", "x", "y", "depth")
+
+# Surfaces from CEA_surfaceLevels, and their descriptions (as in createEnv).
+SURFACES = {"flat_surface": "Flat", "mid_waves": "Mid", "rough_waves": "Rough"}
+
+#################################################
+
+def loadInstruments(path):
+    """Instrument table (name, x, y, depth), indexed by name."""
+    instruments = pd.read_csv(path)
+    missing = [c for c in INSTRUMENT_COLUMNS if c not in instruments.columns]
+    if missing:
+        raise ValueError(f"{path} is missing columns {missing}.")
+    if instruments["name"].duplicated().any():
+        raise ValueError(f"Duplicate instrument names in {path}.")
+    return instruments.set_index("name")
+
+
+def transectGeometry(raster, tx, rx, surface_type="flat_surface", deltaSS=4, gradient_depth=6, spacing=5.0,
+                     extend=10.0):
+    """
+    Geometry of the transect from instrument tx to instrument rx (rows of the instrument table), in the same form
+    as createEnv's buildGeometry, so envFromGeometry turns it into a Bellhop environment.
+    The bathymetry is sampled every `spacing` m and continued `extend` m past the receiver.
+    """
+    if surface_type not in SURFACES:
+        raise ValueError(f"Invalid surface_type '{surface_type}'. Must be one of {list(SURFACES)}.")
+    rx_range = float(np.hypot(rx["x"] - tx["x"], rx["y"] - tx["y"]))
+    signalRange = int(math.ceil(rx_range))
+
+    bottom = raster.profile((tx["x"], tx["y"]), (rx["x"], rx["y"]), spacing=spacing, extend=extend)
+    if np.isnan(bottom[:, 1]).any():
+        raise ValueError(f"Transect {tx.name} to {rx.name} crosses cells with no bathymetry.")
+    for name, depth, bottom_depth in ((tx.name, tx["depth"], bottom[0, 1]),
+                                      (rx.name, rx["depth"], np.interp(rx_range, bottom[:, 0], bottom[:, 1]))):
+        if depth >= bottom_depth:
+            raise ValueError(f"{name} is at {depth} m, at or below the bottom ({bottom_depth:.1f} m) in the grid.")
+
+    # SSP every 2 m down past the deepest point, and out past the end of the bathymetry.
+    ssp_bottom = 2 * math.ceil(bottom[:, 1].max() / 2) + 2
+    soundspeed, sspDescrip = buildSSP(deltaSS=deltaSS, gradient_depth=gradient_depth, depth_range=(0, ssp_bottom),
+                                      range_steps=(-10, 0, max(2100, signalRange + extend + 10)))
+
+    return {
+        "bottom": bottom,
+        "surface": getattr(CEA_surfaceLevels, surface_type)(signalRange),
+        "soundspeed": soundspeed,
+        "topDescrip": SURFACES[surface_type],
+        "sspDescrip": sspDescrip,
+        "botDescrip": f"{tx.name}to{rx.name}Grid",
+        "signalRange": signalRange,
+        "rx_range": rx_range,
+        "tx_depth": float(tx["depth"]),
+        "rx_depth": float(rx["depth"]),
+    }
+
+
+def arrayPairs(instruments, max_range=None):
+    """Every (transmitter, receiver) pair of different instruments, optionally only those within max_range (m)."""
+    xy = instruments[["x", "y"]].to_numpy(dtype=float)
+    distance = np.hypot(*(xy[:, None, :] - xy[None, :, :]).transpose(2, 0, 1))
+    names = list(instruments.index)
+    return [(names[i], names[j]) for i in range(len(names)) for j in range(len(names))
+            if i != j and (max_range is None or distance[i, j] <= max_range)]
+
+
+def runArray(
+    instruments,                # Instrument table (loadInstruments), or the path of its CSV
+    raster,                     # BathymetryRaster or BathymetryProvider, or the path of a grid (.npy, .tif, .nc, .npz)
+    surface_type = "flat_surface",
+    SBL = 0,                    # Surface bubble loss (dB)
+    detectionThreshold = 50,    # Det. threshold (dB) representing background noise.
+    deltaSS = 4,                # Strength of sound speed (m/s) stratification.
+    gradient_depth = 6,         # Depth (m) of sound speed stratification.
+    bottom_absorption = 0,
+    nBeams = 1000,
+    max_range = None,           # (m) Pairs further apart are not modeled (nan in the matrix).
+    spacing = 5.0,              # (m) Bathymetry sample spacing along each transect.
+    concurrency = None,         # Bellhop processes at once; defaults to one per core.
+    timeout = 600,
+    retries = 1,
+    context = None              # RunContext: Bellhop's location and scratch folder (see CEA_runContext).
+):
+    """
+    Solve every transect of the array. Returns (matrix, details): the detectable fraction for each transmitter
+    (rows) x receiver (columns), and a table with one row per solved transect.
+    """
+    if isinstance(instruments, str):
+        instruments = loadInstruments(instruments)
+    if isinstance(raster, str):
+        raster = BathymetryProvider(raster, spacing=spacing)
+    pairs = arrayPairs(instruments, max_range)
+    print(f">>> {len(instruments)} instruments, {len(pairs)} transects to solve")
+
+    def jobs():
+        for pair in pairs:
+            tx, rx = instruments.loc[pair[0]], instruments.loc[pair[1]]
+            try:
+                geometry = transectGeometry(raster, tx, rx, surface_type=surface_type, deltaSS=deltaSS,
+                                            gradient_depth=gradient_depth, spacing=spacing)
+                env = envFromGeometry(geometry, nBeams=nBeams, bottom_absorption=bottom_absorption)
+            except Exception as e:
+                print(f" SKIPPING {pair[0]} to {pair[1]} (geometry error): {e}")
+                continue
+            yield pair, env
+
+    rows = []
+
+    def on_result(pair, arrivals, error):
+        if error is not None:
+            print(f" SKIPPING {pair[0]} to {pair[1]} (Bellhop error): {error}")
+            return
+        _, _, _, _, X_detectable, Y_undetectable, avg_low_dB, _, _, _ = processArrivals(
+            arrivals, detectionThreshold, SBL, verbose=False)
+        n = X_detectable + Y_undetectable
+        tx, rx = instruments.loc[pair[0]], instruments.loc[pair[1]]
+        rows.append({
+            "Transmitter": pair[0],
+            "Receiver": pair[1],
+            "Range_m": float(np.hypot(rx["x"] - tx["x"], rx["y"] - tx["y"])),
+            "Detectable": int(X_detectable),
+            "Undetectable": int(Y_undetectable),
+            "Detectable_Fraction": X_detectable / n if n else np.nan,
+            "Avg_Signal_dB": avg_low_dB,
+        })
+        print(f" COMPLETED {pair[0]} to {pair[1]} ({len(rows)}/{len(pairs)})")
+
+    runJobs(jobs(), on_result, concurrency=concurrency, timeout=timeout, retries=retries, context=context)
+
+    details = pd.DataFrame(rows, columns=["Transmitter", "Receiver", "Range_m", "Detectable", "Undetectable",
+                                          "Detectable_Fraction", "Avg_Signal_dB"])
+    names = list(instruments.index)
+    matrix = details.pivot(index="Transmitter", columns="Receiver", values="Detectable_Fraction")
+    matrix = matrix.reindex(index=names, columns=names)
+    return matrix, details.sort_values(["Transmitter", "Receiver"], ignore_index=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Detection matrix of a receiver array over gridded bathymetry.")
+    parser.add_argument("instruments", help="CSV with columns name, x, y, depth")
+    parser.add_argument("bathymetry", help="Bathymetry grid: .npy (see CEA_bathymetryGrid), GeoTIFF, NetCDF or .npz")
+    parser.add_argument("--surface", default="flat_surface", choices=list(SURFACES))
+    parser.add_argument("--SBL", type=float, default=0)
+    parser.add_argument("--threshold", type=float, default=50)
+    parser.add_argument("--max-range", type=float)
+    parser.add_argument("--concurrency", type=int)
+    parser.add_argument("--out", help="Save the matrix here (CSV); the per-transect table goes next to it.")
+    args = parser.parse_args()
+
+    matrix, details = runArray(args.instruments, args.bathymetry, surface_type=args.surface, SBL=args.SBL,
+                               detectionThreshold=args.threshold, max_range=args.max_range,
+                               concurrency=args.concurrency)
+    print(matrix.round(3).to_string())
+    if args.out:
+        matrix.to_csv(args.out)
+        details.to_csv(args.out.rsplit(".", 1)[0] + "_transects.csv", index=False)
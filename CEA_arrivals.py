@@ -18,47 +18,67 @@ CEA_rayTracing: Traces (and can plot) sound pathways through the environment.
 ******CEA_arrivals: Measures signal strength and arrival timing for sound through the environment. Also adds initial power, and given a detection threshold, can define a ray as detectable or not.
 @author: fmm17241
 """
-import arlpy.uwapm as pm
 import numpy as np
-import pandas as pd
-import scipy.stats as st
-import os
+from CEA_lazy import lazyModule
+from CEA_onlineStats import RunningStats
+from CEA_bellhop import solve
+from CEA_runContext import defaultContext
+# Imported on first use (see CEA_lazy).
+pm = lazyModule("arlpy.uwapm")
+pd = lazyModule("pandas")
 
 # Calculates the number of arrivals, sets their strength, and defines them as detectable or undetectable.
-def calculateArrivals(topDescrip, botDescrip, sspDescrip, env, detectionThreshold, SBL):
-# Set output directory
-    base_dir = r"path"
-
-    if not os.path.exists(base_dir):
-        os.makedirs(base_dir)
-     #Bellhop's location. You need to have previously run the AT makefile to create executables.
-    os.chdir(r"path\executables")   
+# context (CEA_runContext) says where Bellhop and the output folder are; the working directory is left alone.
+def calculateArrivals(topDescrip, botDescrip, sspDescrip, env, detectionThreshold, SBL, context=None):
+# Set output directory, and Bellhop's location. You need to have previously run the AT makefile to create executables.
+    context = context or defaultContext()
 
     # Computes the arrival time of rays between instruments.
-    arrivals = pm.compute_arrivals(env)
+    arrivals = solve(env, "arrivals", context)
     #Optional: plot the arrivals
 #    pm.plot_arrivals(arrivals, width=500, dB=True, title=f"Arrivals: 69 kHz,{topDescrip}, {botDescrip}, {sspDescrip}")
 
+    return processArrivals(arrivals, detectionThreshold, SBL)
+
+
+# Received level (dB) of each arrival from the low-power source, less SBL per surface bounce. Vectorized; SBL can be
+# an array that broadcasts against the arrivals (e.g. a column of SBL values gives one row of levels per SBL).
+def arrivalLevels(amplitudes, surface_bounces, SBL=0, low_power_SL=142):
+    amplitude = np.abs(np.asarray(amplitudes, dtype=complex))
+    with np.errstate(divide="ignore"):
+        arrival_dB = 20 * np.log10(amplitude)
+    return arrival_dB + low_power_SL - np.asarray(SBL, dtype=float) * np.asarray(surface_bounces, dtype=float)
+
+
+# Levels below 0 dB set to 0: a ray that's -80 dB at the end is not actually arriving at the receiver, it is being
+# lost well before. Detectability and the histogram use these; the average uses the unclipped levels.
+def clippedLevels(low_power_dB):
+    return np.maximum(low_power_dB, 0)
+
+
+# Post-processing of a Bellhop arrivals table: power, SBL, binning, CI and detectability.
+# Split from calculateArrivals so runs solved elsewhere (e.g. CEA_asyncRunner) get exactly the same treatment.
+def processArrivals(arrivals, detectionThreshold, SBL, low_power_SL=142, verbose=True):
+
 # Table of arrivals, and converts complex number to decibels.
     arrivals[['time_of_arrival', 'angle_of_arrival', 'surface_bounces', 'bottom_bounces']]
-    arrivals['amplitude_magnitude'] = arrivals['arrival_amplitude'].apply(lambda x: abs(complex(x)))
+    # Vectorized; arlpy hands the amplitudes back as an object column, so convert once rather than per element.
+    arrivals['amplitude_magnitude'] = np.abs(arrivals['arrival_amplitude'].to_numpy(dtype=complex))
     arrivals['arrival_dB'] = 20 * np.log10(arrivals['amplitude_magnitude'])
 # Compute mean arrival amplitude
 #    arrivalAmplitude = np.mean(arrivals['arrival_amplitude'])
 
 # VR2Tx powers. These scripts currently set to only use and save the low_power transmissions, but number can be easily edited to fit needs.
-    low_power_SL = 142  # Weaker source
+# low_power_SL (dB) is the weaker source, 142 dB by default. Passed in for tags with a different source level (e.g. 180 kHz tags).
 #    high_power_SL = 160  # Stronger source
-    arrivals["low_power_dB"] = arrivals["arrival_dB"] + low_power_SL
 #    arrivals["high_power_dB"] = arrivals["arrival_dB"] + high_power_SL
 
 
 # Implementing SBL: uses the number of surface bounces to correct for the surface layer.
-    counts4SBL = arrivals.surface_bounces
-    SBLattenuation = counts4SBL * SBL 
-    arrivals["low_power_dB"] = arrivals["low_power_dB"] - SBLattenuation
+    arrivals["low_power_dB"] = arrivalLevels(arrivals['amplitude_magnitude'], arrivals.surface_bounces, SBL,
+                                             low_power_SL)
 #    arrivals["high_power_dB"] = arrivals["high_power_dB"] - SBLattenuation
-    arrivals["SBLattenuation"] = SBLattenuation
+    arrivals["SBLattenuation"] = arrivals.surface_bounces * SBL
 
 # High powered arrivals
 #    bins = np.arange(0, 111, 10)
@@ -66,39 +86,33 @@ def calculateArrivals(topDescrip, botDescrip, sspDescrip, env, detectionThreshol
 #    binned_countsHigh = arrivals['dB_binHigh'].value_counts().sort_index()
 
 
-# Low powered arrivals, and clipping them so that negative values become 0
-# This is done to make a more accurate average; a ray that's -80 dB at the end is not actually arriving at the receiver, it is being lost well before.
+# Low powered arrivals, and clipping them so that negative values become 0 (see clippedLevels).
     bins = np.arange(0, 100, 10)
-    low_power_dB_hist = arrivals["low_power_dB"].clip(lower=0)
+    low_power_dB_hist = clippedLevels(arrivals["low_power_dB"])
     arrivals['dB_binLow'] = pd.cut(low_power_dB_hist, bins=bins, include_lowest=True)
     binned_countsLow = arrivals['dB_binLow'].value_counts().sort_index()
     avg_low_dB = np.mean(arrivals["low_power_dB"])
 
 
-# 95% confidence interval
-    low_power_values = arrivals["low_power_dB"]
-    n_lp = len(low_power_values)
-    std_lp = np.std(low_power_values, ddof=1)
-    sem_lp = std_lp / np.sqrt(n_lp)
-    t_value_lp = st.t.ppf(1 - 0.05/2, n_lp - 1)
-    margin_of_error_lp = t_value_lp * sem_lp
-    ci_lower_lp = avg_low_dB - margin_of_error_lp
-    ci_upper_lp = avg_low_dB + margin_of_error_lp
+# 95% confidence interval. Same RunningStats as the sweep-level statistics (CEA_onlineStats), so they agree.
+    low_power_stats = RunningStats.fromValues(arrivals["low_power_dB"])
+    ci_lower_lp, ci_upper_lp = low_power_stats.ci(0.95)
     confidence_interval = (ci_lower_lp, ci_upper_lp)
 
     # Detectability classification using raw arrival values
-    low_power_dB_vals = arrivals["low_power_dB"].clip(lower=0)  # Ensure valid values
+    low_power_dB_vals = clippedLevels(arrivals["low_power_dB"])  # Ensure valid values
     X_detectable = (low_power_dB_vals >= detectionThreshold).sum()
     Y_undetectable = (low_power_dB_vals < detectionThreshold).sum()
     # arrivals that don't touch the bottom.
     nonbottom_arrivals = len(arrivals[arrivals["bottom_bounces"] == 0])
     
-# Create a summary DataFrame for console output
-    summary_df = pd.DataFrame({
-        "Metric": ["Detectable", "Undetectable", "Avg Signal (dB)", "95% CI (dB)"],
-        "Value": [X_detectable, Y_undetectable, f"{avg_low_dB:.1f}", f"({ci_lower_lp:.1f}, {ci_upper_lp:.1f})"]
-    })
-    print(summary_df)
+# Create a summary DataFrame for console output. Turned off (verbose=False) when re-used many times per solve.
+    if verbose:
+        summary_df = pd.DataFrame({
+            "Metric": ["Detectable", "Undetectable", "Avg Signal (dB)", "95% CI (dB)"],
+            "Value": [X_detectable, Y_undetectable, f"{avg_low_dB:.1f}", f"({ci_lower_lp:.1f}, {ci_upper_lp:.1f})"]
+        })
+        print(summary_df)
 
 
 
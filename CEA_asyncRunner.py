@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 10:41:17 2026
+Complex Environmental Acoustics (CEA) modeling.
+Frank McQuarrie, Skidaway Institute of Oceanography
+
+Purpose of script: Drive many Bellhop runs at once from a single Python process. Bellhop is an external program, so
+asyncio can keep every core busy launching and waiting on it without threads or extra Python processes.
+Each run gets a timeout (a hung Bellhop is killed instead of stalling the sweep), failed runs can be retried, and
+finished results are handed to a callback as they come in so post-processing keeps up with the solves.
+Where Bellhop is and where its files go come from a RunContext (see CEA_runContext); nothing changes directory.
+
+Scripts.
+CEA_automate : current. Runs and saves outputs from propagation modeling.
+CEA_singleExperiment: Run and save a specific model.
+
+CEA_createEnv: Creates an environment for Bellhop to model sound through.
+CEA_ssp: Sets a soundspeed profile. Currently set to create one given stratification strength and depth.
+CEA_surfaceLevels: defines surface waves for the environment.
+
+CEA_rayTracing: Traces (and can plot) sound pathways through the environment.
+CEA_arrivals: Measures signal strength and arrival timing for sound through the environment. Also adds initial power, and given a detection threshold, can define a ray as detectable or not.
+CEA_bellhop: Writes Bellhop input files, reads results back, and cleans up.
+******CEA_asyncRunner: Runs many Bellhop solves at once with concurrency limits, timeouts and retries.
+CEA_runContext: Bellhop executable, scratch and output folders, passed explicitly to every solve.
+
+Example:
+    def on_result(key, arrivals, error):
+        ...                                     # post-process as each run finishes
+    runJobs(((i, env) for i, env in enumerate(envs)), on_result, concurrency=8, timeout=300)
+"""
+
+import os
+import asyncio
+from CEA_bellhop import writeInputs, bellhopCommand, loadResults, cleanup
+from CEA_runContext import defaultContext
+from CEA_envTemplate import templatesInUse
+
+
+class BellhopTimeout(RuntimeError):
+    """Raised when a run is still going after its timeout on every attempt."""
+
+
+#################################################
+
+async def solveAsync(env, task="arrivals", timeout=600, retries=1, context=None):
+    """
+    Run Bellhop on one environment without blocking the event loop. Returns the arrivals (or rays) table.
+
+    Timeouts and failures to launch are retried up to `retries` extra times. A fatal error reported by Bellhop
+    itself is not retried; the same inputs would fail the same way.
+    """
+    context = context or defaultContext()
+    last_error = None
+    for attempt in range(retries + 1):
+        fname_base = await asyncio.to_thread(writeInputs, env, task, context.scratch_dir)
+        proc = None
+        try:
+            try:
+                proc = await asyncio.create_subprocess_exec(
+                    *bellhopCommand(fname_base, context.bellhop_exe),
+                    cwd=os.path.dirname(fname_base),
+                    stdout=asyncio.subprocess.DEVNULL,
+                    stderr=asyncio.subprocess.DEVNULL,
+                )
+            except OSError as e:
+                last_error = e
+                continue
+
+            try:
+                await asyncio.wait_for(proc.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                last_error = BellhopTimeout(f"Bellhop still running after {timeout} s (attempt {attempt + 1})")
+                continue
+
+            # Reading the output is file I/O and parsing; done in a thread so other runs keep launching.
+            return await asyncio.to_thread(loadResults, fname_base, task)
+
+        finally:
+            # Kill on timeout or cancellation; a no-op when Bellhop has already exited.
+            if proc is not None and proc.returncode is None:
+                proc.kill()
+                await proc.wait()
+            cleanup(fname_base)
+
+    raise last_error
+
+
+async def runJobsAsync(jobs, on_result=None, concurrency=None, task="arrivals", timeout=600, retries=1,
+                       context=None):
+    """
+    Solve every (key, env) pair in jobs with at most `concurrency` Bellhop processes running.
+
+    jobs is consumed lazily, so environments are only built as slots open up.
+    on_result(key, result, error) is called as each run finishes; error is None on success.
+    Without on_result, returns a dict of key -> result (or the exception the run ended with).
+    The env templates of the scratch folder are cleared when the last run ends (see CEA_envTemplate).
+    """
+    concurrency = concurrency or os.cpu_count() or 1
+    context = context or defaultContext()
+    semaphore = asyncio.Semaphore(concurrency)
+    results = {}
+    pending = set()
+
+    async def _run(key, env):
+        try:
+            result = await solveAsync(env, task=task, timeout=timeout, retries=retries, context=context)
+            error = None
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            result, error = None, e
+        finally:
+            semaphore.release()
+
+        if on_result is None:
+            results[key] = result if error is None else error
+            return
+        try:
+            on_result(key, result, error)
+        except Exception as e:
+            print(f" Post-processing failed for run {key}: {e}")
+
+    with templatesInUse(context.scratch_dir):
+        try:
+            for key, env in jobs:
+                await semaphore.acquire()
+                t = asyncio.ensure_future(_run(key, env))
+                pending.add(t)
+                t.add_done_callback(pending.discard)
+            if pending:
+                await asyncio.gather(*list(pending))
+        except BaseException:
+            # Cancelled (or Ctrl+C): stop every running Bellhop before leaving.
+            for t in pending:
+                t.cancel()
+            await asyncio.gather(*list(pending), return_exceptions=True)
+            raise
+
+    return results if on_result is None else None
+
+
+def runJobs(jobs, on_result=None, concurrency=None, task="arrivals", timeout=600, retries=1, context=None):
+    """Blocking wrapper around runJobsAsync, for use from ordinary scripts."""
+    return asyncio.run(runJobsAsync(jobs, on_result=on_result, concurrency=concurrency, task=task,
+                                    timeout=timeout, retries=retries, context=context))
@@ -23,29 +23,86 @@ CEA_arrivals: Measures signal strength and arrival timing for sound through the
 ##
 # Load in packages, install if necessary.
 import os
-#Code Repository
-os.chdir()
 import csv
 import datetime
-import pandas as pd
 # Import simulation routines.
-from CEA_createEnv import createEnv
-#from BDA_Rays2 import rayTracing
-from CEA_arrivals import calculateArrivals
+from CEA_arrivals import processArrivals
+from CEA_asyncRunner import runJobs
+from CEA_canonical import groupPlan, paramsFromKey, dedupReport
+from CEA_gallery import GalleryRenderer
+from CEA_compactArrivals import CompactArrivals
+from CEA_onlineStats import GroupedAccumulator
+from CEA_convergence import ConvergenceController, TARGETS, MIN_RUNS
+from CEA_runContext import RunContext
+from CEA_fidelity import FULL, SCREEN_THEN_FULL, createTierEnv, tierEnvFromGeometry, checkTiers, countScale
+from CEA_preflight import preflight
 import numpy as np
 import random
-from pyDOE2 import lhs  # For Latin Hypercube Sampling
+from CEA_lazy import lazyModule
+# Imported on first use (see CEA_lazy).
+pd = lazyModule("pandas")
+pyDOE2 = lazyModule("pyDOE2")  # For Latin Hypercube Sampling
 
 
 # Logistics of the model. How many times, where to put the outputs, etc.
 n_iterations = 9  # Number of simulations
 
+# Bellhop runs are separate processes, so several run at once. A run that hangs is killed after solve_timeout
+# seconds and tried again solve_retries more times before it is skipped.
+concurrency = os.cpu_count() or 1  # Bellhop processes running at the same time
+solve_timeout = 600           # (s) per run
+solve_retries = 1
+
 # File paths
 output_file = r"C:\...*\modelOutputs.csv"
 output_file2 = r"C:\...*\binnedAmplitudesNew.csv"
 output_dir = os.path.dirname(output_file)
 output_dir2 = os.path.dirname(output_file2)
 
+# Where Bellhop is, and where its per-run files go (see CEA_runContext). Passed to every solve; the working
+# directory is never changed, so this file can be run from anywhere.
+run_context = RunContext(
+    bellhop_exe=os.environ.get("CEA_BELLHOP", "bellhop.exe"),   # Full path, or name if on your PATH
+    scratch_dir=os.environ.get("CEA_SCRATCH", os.path.join(output_dir, "scratch")),
+    output_dir=output_dir,
+)
+
+# Diagnostics gallery. Plotting every run is too much for 1000+ iterations, so a random fraction of runs have their
+# rays/arrivals stashed and drawn headless (PNG/SVG) by a background process. Set to 0 to turn off.
+gallery_fraction = 0.01
+gallery_formats = ("png",)
+stash_dir = os.path.join(output_dir, "galleryStash")
+gallery_dir = os.path.join(output_dir, "gallery")
+
+# Keep every run's per-arrival data (compactly, see CEA_compactArrivals) for pooled statistics after the sweep.
+# Saved as .npy files in arrivals_dir, which CompactArrivals.load() memory-maps.
+keep_arrivals = False
+arrivals_dir = os.path.join(output_dir, "arrivals")
+
+# Running statistics per scenario x surface (see CEA_onlineStats), updated as each run finishes. A snapshot is
+# written every stats_every runs, so the sweep can be watched from another process (python CEA_onlineStats.py <file>).
+stats_file = os.path.join(output_dir, "sweepStats.json")
+stats_every = 50
+
+# Stop when the results have converged rather than after n_iterations (see CEA_convergence). Runs go out in batches
+# to the scenario x surface strata whose 95% CIs are still wider than convergence_targets, up to max_iterations runs.
+stop_when_converged = False
+convergence_targets = TARGETS     # {output: CI half-width}, e.g. Detectable_Fraction 0.02, Avg_Signal_dB 0.5 dB
+min_runs_per_stratum = MIN_RUNS
+max_iterations = 20000
+batch_size = 4 * concurrency      # Runs per batch. A few per Bellhop slot keeps every slot busy between batches.
+
+# Fidelity tiers (see CEA_fidelity). SCREEN_THEN_FULL solves every row cheaply first (100 beams, linear surface) and
+# only solves it again at full fidelity when its detectable fraction is not clearly near 0 or 1. (FULL,) solves every
+# row at full fidelity. The tier that produced each row is saved in its Fidelity column.
+fidelity_tiers = (FULL,)
+# fidelity_tiers = SCREEN_THEN_FULL
+
+# Dry run before the sweep (see CEA_preflight): builds and checks every distinct environment without Bellhop, prints
+# the estimated solves and wall time, and stops before any Bellhop run if something is broken.
+preflight_first = True
+preflight_solve_seconds = 20      # (s) One full-fidelity solve on your machine, for the wall time estimate.
+
 # File creation if it doesnt exist. Each model run will be saved as a new line.
 #
 # Output Columns:
@@ -60,25 +117,59 @@ output_dir2 = os.path.dirname(output_file2)
 # Detectable           - Output, detectable pathways between transmitter and receiver; pathways that arrive above the detection threshold.
 # Undetectable         - Output, undetectable pathways between transmitter and receiver; pathways that arrive at or below the detection threshold.
 # Avg_Signal_dB        - Output, signal strength of the arriving rays in dB re 1 µPa. Note: this is calculated using the power set in "CAE_arrivals". Please ensure you set the transmitting strength as needed.
+# Fidelity             - Solve tier that produced the row ("screen" or "full"), see CEA_fidelity. Screen rows are solved
+#                        with fewer beams, so their Detectable/Undetectable and binnedAmplitudes counts are scaled to
+#                        the full tier's beams (countScale); every row's counts are on the same scale.
 # 
 
+OUTPUT_FIELDS = [
+    "Timestamp", "Scenario", "topDescrip", "SBL", "deltaSS", "gradient_depth", "Detection_Threshold",
+    "Bottom_Absorption", "Detectable", "Undetectable", "Avg_Signal_dB", "Fidelity"
+]
+
 # Ensures your path exists, and if not, creates the files with the headers below.
-if not os.path.exists(output_file):
-    with open(output_file, 'w', newline='') as csvfile:
-        fieldnames = [
-            "Timestamp", "Scenario", "topDescrip", "SBL", "deltaSS", "gradient_depth", "Detection_Threshold",
-            "Bottom_Absorption", "Detectable", "Undetectable", "Avg_Signal_dB"
-        ]
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        writer.writeheader()
-
-if not os.path.exists(output_file2):
-    bin_centers = list(range(0, 100, 10))
-    meta_fields = ["Scenario", "deltaSS", "gradient_depth", "Surface_Type", "Detection_Threshold", "Bottom_Absorption"]
-    bin_fields = [f"Bin_{center}" for center in bin_centers]
-    with open(output_file2, 'w', newline='') as csvfile:
-        writer = csv.writer(csvfile)
-        writer.writerow(meta_fields + bin_fields)
+# A modelOutputs file from before the Fidelity column is upgraded in place, so new rows line up with its header.
+def initOutputFiles(output_file=output_file, output_file2=output_file2):
+    if not os.path.exists(output_file) or os.path.getsize(output_file) == 0:
+        with open(output_file, 'w', newline='') as csvfile:
+            writer = csv.DictWriter(csvfile, fieldnames=OUTPUT_FIELDS)
+            writer.writeheader()
+    else:
+        upgradeOutputFile(output_file)
+
+    if not os.path.exists(output_file2):
+        bin_centers = list(range(0, 100, 10))
+        meta_fields = ["Scenario", "deltaSS", "gradient_depth", "Surface_Type", "Detection_Threshold", "Bottom_Absorption"]
+        bin_fields = [f"Bin_{center}" for center in bin_centers]
+        with open(output_file2, 'w', newline='') as csvfile:
+            writer = csv.writer(csvfile)
+            writer.writerow(meta_fields + bin_fields)
+
+
+def upgradeOutputFile(output_file):
+    """
+    Add the Fidelity column to a modelOutputs file written before fidelity tiers existed. Every row in it was solved
+    at full fidelity, so they are marked "full". Files with any other columns are left alone and raise ValueError.
+    """
+    with open(output_file, newline='') as csvfile:
+        header = next(csv.reader(csvfile), [])
+    if header == OUTPUT_FIELDS:
+        return
+    if header != OUTPUT_FIELDS[:-1]:
+        raise ValueError(f"{output_file} has columns {header}, not the modelOutputs columns {OUTPUT_FIELDS}. "
+                         f"Move it aside or set a different output_file.")
+
+    print(f" Adding the Fidelity column to {output_file}")
+    upgraded = output_file + ".upgrading"
+    with open(output_file, newline='') as old, open(upgraded, 'w', newline='') as new:
+        reader = csv.reader(old)
+        writer = csv.writer(new)
+        next(reader)
+        writer.writerow(OUTPUT_FIELDS)
+        for line in reader:
+            if line:
+                writer.writerow(line + [FULL.name])
+    os.replace(upgraded, output_file)
 
 ########################################################
 # DATA FOR THE MODEL.
@@ -105,78 +196,47 @@ param_bounds = {
 # Latin Hypercube Sampling
 # LHS limits the clustering and gaps that occur when fully random.
 # So LHS is NOT fully random, but instead tries to more efficiently explore variables. This helps test the model in a wide variety of environments.
+def buildSamplePlan(n_iterations, scenarios=scenarios, surface_types=surface_types, param_bounds=param_bounds):
+    """
+    Draw the full sample plan up front: one dict per run with the scenario, surface, and the five LHS parameters.
+    """
+    # Run LHS to generate values in [0, 1]
+    lhs_samples = pyDOE2.lhs(len(param_bounds), samples=n_iterations)
 
-# Run LHS to generate values in [0, 1]
-lhs_samples = lhs(len(param_bounds), samples=n_iterations)
-
-# Scale samples to real-world parameter ranges set above
-param_names = list(param_bounds.keys())
-scaled_samples = np.zeros_like(lhs_samples)
-for i, param in enumerate(param_names):
-    low, high = param_bounds[param]
-    scaled_samples[:, i] = lhs_samples[:, i] * (high - low) + low
-
-# LOOP: This goes through as many iterations as I request.
-for i in range(n_iterations):
-
-# Select my variables from the ranges of possibles.
-    bottom_absorption = round(scaled_samples[i, 0], 2)
-    SBL = round(scaled_samples[i, 1], 2)
-    detectionThreshold = round(scaled_samples[i, 2], 1)
-    deltaSS = round(scaled_samples[i, 3], 2)
-    gradient_depth = round(scaled_samples[i, 4], 1)
-    scenario = random.choice(scenarios)
-    surface = random.choice(surface_types)
-
-# Create the environment using the variables above.    
-    try:
-        print(">>> Creating environment...")
-        env, topDescrip, sspDescrip, botDescrip, bottom, soundspeed, signalRange, \
-           _, tx_depth, rx_depth, _ = createEnv(
-               surface_type=surface,
-               scenario=scenario,
-               bottom_absorption=bottom_absorption,
-               SBL=SBL,
-               detectionThreshold=detectionThreshold,
-               deltaSS=deltaSS,
-               gradient_depth=gradient_depth
-       )
-    except Exception as e:
-           print(f" SKIPPING simulation {i+1} (createEnv error): {e}")
-           continue
-
-#Plotting is helpful for testing but too much for 1000+ iterations. Enable this if you'd like.  
-#    try:
-#        print(">>> Computing rays...")
-#        filtered_rays = rayTracing(signalRange, topDescrip, botDescrip, sspDescrip, env)
-#    except Exception as e:
-#        print(f" SKIPPING simulation {i+1} (rayTracing error): {e}")
-#        continue
+    # Scale samples to real-world parameter ranges set above
+    param_names = list(param_bounds.keys())
+    scaled_samples = np.zeros_like(lhs_samples)
+    for i, param in enumerate(param_names):
+        low, high = param_bounds[param]
+        scaled_samples[:, i] = lhs_samples[:, i] * (high - low) + low
 
-# Calculates arrivals. This will output how many arrivals there are between transmitter and receiver, how strong those arriving sounds are, and how many are detectable. 
-    try:
-        print(">>> Calculating arrivals...")
-        arrivals, binned_countsLow, low_power_dB_hist, confidence_interval, \
-        X_detectable, Y_undetectable, avg_low_dB, ci_lower_lp, ci_upper_lp, \
-        nonBottomArrivals = calculateArrivals(
-            topDescrip, botDescrip, sspDescrip, env,
-            detectionThreshold, SBL
-        )
-    except Exception as e:
-        print(f" SKIPPING simulation {i+1} (calculateArrivals error): {e}")
-        continue
-
-# Writing output files.    
+    plan = []
+    for i in range(n_iterations):
+        plan.append({
+            "bottom_absorption": round(scaled_samples[i, 0], 2),
+            "SBL": round(scaled_samples[i, 1], 2),
+            "detectionThreshold": round(scaled_samples[i, 2], 1),
+            "deltaSS": round(scaled_samples[i, 3], 2),
+            "gradient_depth": round(scaled_samples[i, 4], 1),
+            "scenario": random.choice(scenarios),
+            "surface": random.choice(surface_types),
+        })
+    return plan
+
+
+# Writing output files. One line per run in each file.
+def writeRunOutputs(row, topDescrip, binned_countsLow, X_detectable, Y_undetectable, avg_low_dB,
+                    output_file=output_file, output_file2=output_file2, fidelity=FULL.name):
     if isinstance(binned_countsLow, pd.Series):
         bin_centers = [(interval.left + interval.right) / 2 for interval in binned_countsLow.index]
         bin_labels = [f"Bin_{int(center)}" for center in bin_centers]
         row_data = {
-            "Scenario": scenario,
-            "deltaSS": deltaSS,
-            "gradient_depth": gradient_depth,
-            "Surface_Type": surface,
-            "Detection_Threshold": detectionThreshold,
-            "Bottom_Absorption": bottom_absorption
+            "Scenario": row["scenario"],
+            "deltaSS": row["deltaSS"],
+            "gradient_depth": row["gradient_depth"],
+            "Surface_Type": row["surface"],
+            "Detection_Threshold": row["detectionThreshold"],
+            "Bottom_Absorption": row["bottom_absorption"]
         }
         for label, count in zip(bin_labels, binned_countsLow.values):
             row_data[label] = int(count)
@@ -184,24 +244,228 @@ for i in range(n_iterations):
             writer = csv.DictWriter(csvfile, fieldnames=row_data.keys())
             writer.writerow(row_data)
 
-#    nonBottomRays = len(filtered_rays)
     metrics_dict = {
         "Timestamp": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        "Scenario": scenario,
+        "Scenario": row["scenario"],
         "topDescrip": topDescrip,
-        "SBL": SBL,
-        "deltaSS": deltaSS,
-        "gradient_depth": gradient_depth,
-        "Detection_Threshold": detectionThreshold,
-        "Bottom_Absorption": bottom_absorption,
+        "SBL": row["SBL"],
+        "deltaSS": row["deltaSS"],
+        "gradient_depth": row["gradient_depth"],
+        "Detection_Threshold": row["detectionThreshold"],
+        "Bottom_Absorption": row["bottom_absorption"],
         "Detectable": X_detectable,
         "Undetectable": Y_undetectable,
-        "Avg_Signal_dB": f"{avg_low_dB:.1f}"
+        "Avg_Signal_dB": f"{avg_low_dB:.1f}",
+        "Fidelity": fidelity
     }
 
     with open(output_file, 'a', newline='') as csvfile:
         writer = csv.DictWriter(csvfile, fieldnames=metrics_dict.keys())
         writer.writerow(metrics_dict)
 
-    print(f" COMPLETED simulation {i+1}/{n_iterations}")
-.
+
+# Builds each canonical environment only when a Bellhop slot is free. Groups that fail here are skipped, as before.
+def planJobs(plan, groups, run_info, first_run=0, tier=FULL, assets=None):
+    for key, rows in groups.items():
+        params = paramsFromKey(key)
+        try:
+            print(">>> Creating environment...")
+            if assets is not None and assets.published(params["scenario"], params["surface"]):
+                # Geometry shared by the work queue's coordinator (CEA_sharedAssets): only the SSP is built here.
+                geometry = assets.geometry(params["scenario"], params["surface"], deltaSS=params["deltaSS"],
+                                           gradient_depth=params["gradient_depth"])
+                env = tierEnvFromGeometry(tier, geometry, bottom_absorption=params["bottom_absorption"])
+                topDescrip, sspDescrip, botDescrip = geometry["topDescrip"], geometry["sspDescrip"], geometry["botDescrip"]
+            else:
+                env, topDescrip, sspDescrip, botDescrip, bottom, soundspeed, signalRange, \
+                   _, tx_depth, rx_depth, _ = createTierEnv(
+                       tier,
+                       surface_type=params["surface"],
+                       scenario=params["scenario"],
+                       bottom_absorption=params["bottom_absorption"],
+                       deltaSS=params["deltaSS"],
+                       gradient_depth=params["gradient_depth"]
+               )
+        except Exception as e:
+               print(f" SKIPPING simulations {[first_run+i+1 for i in rows]} (createEnv error): {e}")
+               continue
+        run_info[key] = (topDescrip, sspDescrip, botDescrip)
+        yield key, env
+
+
+def runSweep(plan, renderer=None, output_file=output_file, output_file2=output_file2, compact=None,
+             stats=None, stats_file=None, stats_every=stats_every, first_run=0, context=run_context, tiers=None,
+             assets=None):
+    """
+    Solve every row of the plan through the async Bellhop runner, writing outputs as each run finishes.
+    Rows that give Bellhop identical inputs (see CEA_canonical) share one solve.
+    If compact (a CompactArrivals) is given, every row's arrivals are appended to it.
+    If stats (a GroupedAccumulator) is given, every row is added to it, and saved to stats_file every stats_every rows.
+    first_run numbers the rows when this plan is one batch of a longer sweep.
+    context (a RunContext) says where Bellhop is and where its files go.
+    tiers (see CEA_fidelity) defaults to fidelity_tiers. Rows are solved at the first tier, and only those the tier
+    escalates are solved again at the next; each row's outputs are written once, by the tier that kept it.
+    assets (a CEA_sharedAssets.ScenarioAssets) supplies already-built geometries; rows it lacks are built as usual.
+    """
+    context.makeDirs()
+    tiers = checkTiers(fidelity_tiers if tiers is None else tiers)
+    groups = groupPlan(plan)
+    dedupReport(groups)
+
+    envs_for_gallery = {}
+    arrivals_for_gallery = {}
+    completed = 0
+
+    for tier in tiers:
+        if len(tiers) > 1:
+            print(f">>> Fidelity tier '{tier.name}': {sum(len(rows) for rows in groups.values())} simulations, "
+                  f"{len(groups)} solves")
+        run_info = {}
+        escalated = set()
+
+# Calculates arrivals. This will output how many arrivals there are between transmitter and receiver, how strong those arriving sounds are, and how many are detectable. 
+# One solve, post-processed with each row's own SBL and detection threshold.
+        def on_result(key, arrivals, error):
+            nonlocal completed
+            topDescrip, sspDescrip, botDescrip = run_info.pop(key)
+            env = envs_for_gallery.pop(key, None)
+            rows = groups[key]
+            if error is not None:
+                print(f" SKIPPING simulations {[first_run+i+1 for i in rows]} (Bellhop error): {error}")
+                return
+            for i in rows:
+                row = plan[i]
+                arrivals, binned_countsLow, low_power_dB_hist, confidence_interval, \
+                X_detectable, Y_undetectable, avg_low_dB, ci_lower_lp, ci_upper_lp, \
+                nonBottomArrivals = processArrivals(arrivals, row["detectionThreshold"], row["SBL"])
+                n = X_detectable + Y_undetectable
+                detectable_fraction = X_detectable / n if n else np.nan
+
+# Not clearly all or nothing at this tier: solved again at the next one, and only that result is kept.
+                if tier.escalates(detectable_fraction):
+                    escalated.add(i)
+                    continue
+
+# Counts on the last tier's scale, so screen rows and full rows can be summed and compared.
+                scale = countScale(tier, tiers)
+                if scale != 1:
+                    X_detectable, Y_undetectable = round(X_detectable * scale), round(Y_undetectable * scale)
+                    if binned_countsLow is not None:
+                        binned_countsLow = (binned_countsLow * scale).round().astype(int)
+
+                writeRunOutputs(row, topDescrip, binned_countsLow, X_detectable, Y_undetectable, avg_low_dB,
+                                output_file=output_file, output_file2=output_file2, fidelity=tier.name)
+                if compact is not None:
+                    compact.append(arrivals, run_id=first_run+i, fidelity=tier.name, **row)
+                if stats is not None:
+                    stats.update(row, {"Avg_Signal_dB": avg_low_dB, "Detectable_Fraction": detectable_fraction},
+                                 binned_countsLow)
+                    if stats_file and stats.n_updates % stats_every == 0:
+                        stats.save(stats_file)
+
+# Diagnostics for a sampled subset. Their rays are traced after the sweep and drawn in the background.
+# Copied, since the next row in the group re-processes the same arrivals table.
+                if renderer is not None and renderer.sample():
+                    arrivals_for_gallery[i] = (env, arrivals.copy(), row, topDescrip, sspDescrip, botDescrip)
+
+                completed += 1
+                print(f" COMPLETED simulation {first_run+i+1}/{first_run+len(plan)} ({completed} done, {tier.name})")
+
+        # Envs are only held until their solve finishes, so the gallery can re-use the sampled ones.
+        def jobs():
+            for key, env in planJobs(plan, groups, run_info, first_run, tier=tier, assets=assets):
+                if renderer is not None:
+                    envs_for_gallery[key] = env
+                yield key, env
+
+        runJobs(jobs(), on_result, concurrency=concurrency, timeout=solve_timeout, retries=solve_retries,
+                context=context)
+
+        # Only the escalated rows go on, still grouped by their shared solves.
+        groups = {key: [i for i in rows if i in escalated] for key, rows in groups.items()}
+        groups = {key: rows for key, rows in groups.items() if rows}
+        if not groups:
+            break
+
+    if stats is not None and stats_file:
+        stats.save(stats_file)
+
+# Ray tracing for the gallery runs, through the same runner.
+    if renderer is not None and arrivals_for_gallery:
+        def on_rays(i, rays, error):
+            env, arrivals, row, topDescrip, sspDescrip, botDescrip = arrivals_for_gallery.pop(i)
+            if error is not None:
+                print(f" No rays for gallery run {first_run+i+1} (Bellhop error): {error}")
+            renderer.submit(f"run{first_run+i+1:06d}_{row['scenario']}_{row['surface']}",
+                            arrivals=arrivals, rays=rays, env=env,
+                            meta={"topDescrip": topDescrip, "botDescrip": botDescrip, "sspDescrip": sspDescrip,
+                                  "SBL": row["SBL"], "detectionThreshold": row["detectionThreshold"]})
+
+        runJobs([(i, sampled[0]) for i, sampled in arrivals_for_gallery.items()], on_rays, task="rays",
+                concurrency=concurrency, timeout=solve_timeout, retries=solve_retries, context=context)
+
+    return completed
+
+
+def runUntilConverged(controller, batch_size=batch_size, renderer=None, output_file=output_file,
+                      output_file2=output_file2, compact=None, stats_file=None, context=run_context):
+    """
+    Run batches chosen by controller (a ConvergenceController) until every stratum has converged or the budget is
+    spent. Each batch is an LHS plan per stratum, solved with runSweep. Returns the number of completed runs.
+    """
+    def stratumPlan(n, scenario, surface):
+        return buildSamplePlan(n, scenarios=[scenario], surface_types=[surface])
+
+    completed = 0
+    while not controller.done:
+        plan = controller.nextPlan(batch_size, stratumPlan)
+        if not plan:
+            break
+        finished = runSweep(plan, renderer, output_file=output_file, output_file2=output_file2, compact=compact,
+                            stats=controller.stats, stats_file=stats_file, first_run=controller.n_total - len(plan),
+                            context=context)
+        completed += finished
+        n_converged = sum(controller.isConverged(s) for s in controller.strata)
+        print(f" BATCH done: {finished}/{len(plan)} runs, {n_converged}/{len(controller.strata)} strata converged")
+        if finished == 0:
+            print(" STOPPING: no run in the last batch finished; check the errors above.")
+            break
+    return completed
+
+
+# Guarded so worker processes (gallery rendering) can import this file without starting a sweep.
+if __name__ == "__main__":
+    plan = None if stop_when_converged else buildSamplePlan(n_iterations)
+    if preflight_first:
+        # The converged sweep draws its rows as it goes, so a plan with every stratum in it is checked instead.
+        check_plan = plan or sum((buildSamplePlan(min_runs_per_stratum, scenarios=[sc], surface_types=[sf])
+                                  for sc in scenarios for sf in surface_types), [])
+        summary, _ = preflight(check_plan, tiers=fidelity_tiers, param_bounds=param_bounds,
+                               concurrency=concurrency, seconds_per_solve=preflight_solve_seconds)
+        if summary["errors"]:
+            raise SystemExit(f" STOPPING: preflight found {summary['errors']} errors; see above.")
+
+    initOutputFiles()
+    renderer = GalleryRenderer(stash_dir, gallery_dir, sample_fraction=gallery_fraction, formats=gallery_formats)
+
+    compact = CompactArrivals() if keep_arrivals else None
+    stats = GroupedAccumulator()
+
+    if stop_when_converged:
+        controller = ConvergenceController([(sc, sf) for sc in scenarios for sf in surface_types],
+                                           targets=convergence_targets, min_runs=min_runs_per_stratum,
+                                           max_runs=max_iterations, stats=stats)
+        completed = runUntilConverged(controller, renderer=renderer, compact=compact, stats_file=stats_file)
+        print(f" FINISHED {completed}/{controller.n_total} simulations")
+        print(controller.status().to_string(index=False))
+    else:
+        completed = runSweep(plan, renderer, compact=compact, stats=stats, stats_file=stats_file)
+        print(f" FINISHED {completed}/{n_iterations} simulations")
+    if compact is not None:
+        compact.save(arrivals_dir)
+        print(f" Saved {compact.n_arrivals} arrivals ({compact.nbytes / 1e6:.0f} MB) to {arrivals_dir}")
+
+    print(stats.table().to_string(index=False))
+
+    # Waits for any figures still being drawn.
+    renderer.close(wait=True)
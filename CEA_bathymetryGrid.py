@@ -0,0 +1,427 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 23:51:09 2026
+Complex Environmental Acoustics (CEA) modeling.
+Frank McQuarrie, Skidaway Institute of Oceanography
+
+Purpose of script: Gridded bathymetry, and the depth profile along any line across it.
+CEA_bathymetry has each transect typed in by hand as a few [range, depth] points. With a gridded survey, any
+transect's profile can be read off the grid instead: points are spaced evenly along the line between two positions,
+and the depth at each is interpolated (bilinear) from the four surrounding grid cells, all at once.
+
+Survey grids can be far larger than memory, so the grid is never read whole:
+    .npy        memory-mapped; only the pages a transect touches are read. The fastest format (see convertGrid).
+    GeoTIFF     through rasterio, and NetCDF through netCDF4, both optional. Read in 256 x 256 cell tiles, only the
+                tiles a transect crosses, and the most recent tiles are kept.
+    .npz        small grids only; loaded whole.
+BathymetryProvider adds what a sweep over many transects needs: each profile is simplified to the fewest points
+that stay within a depth tolerance (Douglas-Peucker), and cached in memory and, optionally, on disk.
+
+Coordinates are in metres on a flat grid (UTM, or a local east/north frame), depths in metres, positive down.
+Grids of elevation (negative below sea level, e.g. GEBCO) are flipped with elevation=True.
+No-data cells (land, gaps) are nan; a profile through one comes back with nan in it.
+
+Scripts.
+CEA_automate : current. Runs and saves outputs from propagation modeling.
+CEA_singleExperiment: Run and save a specific model.
+
+CEA_createEnv: Creates an environment for Bellhop to model sound through.
+CEA_ssp: Sets a soundspeed profile. Currently set to create one given stratification strength and depth.
+CEA_surfaceLevels: defines surface waves for the environment.
+
+CEA_rayTracing: Traces (and can plot) sound pathways through the environment.
+CEA_arrivals: Measures signal strength and arrival timing for sound through the environment. Also adds initial power, and given a detection threshold, can define a ray as detectable or not.
+CEA_bathymetry: Hand-made bathymetry of each modeled transect.
+******CEA_bathymetryGrid: Gridded bathymetry, with depth profiles extracted along any line.
+
+Usage:
+    python CEA_bathymetryGrid.py convert <survey.tif|survey.nc> <grid.npy> [--elevation]
+"""
+
+import os
+import json
+import hashlib
+import argparse
+import threading
+from collections import OrderedDict
+import numpy as np
+
+# Tile size (cells) for grids read through a file reader, and how many tiles are kept (~0.5 MB each).
+TILE = 256
+MAX_TILES = 64
+
+#################################################
+
+class BathymetryRaster:
+    """
+    Depths on a regular grid. depth[i, j] is the value at (x[j], y[i]); x and y must be evenly spaced, in either
+    direction (north-up rasters usually have y decreasing). depth can be an array, a memory-mapped array, or a
+    reader that returns blocks of the grid when sliced (see openGrid).
+    """
+
+    def __init__(self, x, y, depth, nodata=None, elevation=False):
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        if tuple(depth.shape) != (len(y), len(x)):
+            raise ValueError(f"depth has shape {depth.shape}, expected (len(y), len(x)) = {(len(y), len(x))}.")
+        if len(x) < 2 or len(y) < 2:
+            raise ValueError("The grid needs at least 2 points along each axis.")
+        for name, axis in (("x", x), ("y", y)):
+            steps = np.diff(axis)
+            if not np.allclose(steps, steps[0]) or steps[0] == 0:
+                raise ValueError(f"{name} must be evenly spaced.")
+        self.x0, self.dx = x[0], x[1] - x[0]
+        self.y0, self.dy = y[0], y[1] - y[0]
+        self.depth = depth
+        self.nodata = nodata            # Value marking cells with no data, if the grid does not use nan
+        self.elevation = elevation      # True if the values are heights (negative below sea level)
+        self._tiles = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def fromNpz(cls, path):
+        """Load from an .npz file holding arrays x, y and depth."""
+        with np.load(path) as data:
+            return cls(data["x"], data["y"], data["depth"])
+
+    @property
+    def shape(self):
+        return tuple(self.depth.shape)
+
+    @property
+    def x(self):
+        return self.x0 + self.dx * np.arange(self.shape[1])
+
+    @property
+    def y(self):
+        return self.y0 + self.dy * np.arange(self.shape[0])
+
+    def contains(self, x, y):
+        """Whether points are inside the grid."""
+        fx = (np.asarray(x, dtype=float) - self.x0) / self.dx
+        fy = (np.asarray(y, dtype=float) - self.y0) / self.dy
+        return (fx >= 0) & (fx <= self.shape[1] - 1) & (fy >= 0) & (fy <= self.shape[0] - 1)
+
+    def depthAt(self, x, y):
+        """Bilinear depth at points (arrays of any shape). Points off the grid take the depth at its edge."""
+        x, y = np.broadcast_arrays(np.asarray(x, dtype=float), np.asarray(y, dtype=float))
+        ny, nx = self.shape
+        fx = np.clip((x - self.x0) / self.dx, 0, nx - 1).ravel()
+        fy = np.clip((y - self.y0) / self.dy, 0, ny - 1).ravel()
+        j = np.minimum(fx.astype(np.intp), nx - 2)
+        i = np.minimum(fy.astype(np.intp), ny - 2)
+        tx = fx - j
+        ty = fy - i
+        d00, d01, d10, d11 = self._corners(i, j)
+        depth = (d00 * (1 - tx) + d01 * tx) * (1 - ty) + (d10 * (1 - tx) + d11 * tx) * ty
+        return depth.reshape(x.shape)
+
+    def profile(self, start, end, spacing=5.0, extend=0.0):
+        """
+        Depth profile from start (x, y) towards end, as an array of [range (m), depth (m)] rows like the lists in
+        CEA_bathymetry. Sampled every `spacing` m, with the end point always included, and continued `extend` m
+        past the end (Bellhop needs the bottom to reach a little beyond the receiver).
+        """
+        start = np.asarray(start, dtype=float)
+        end = np.asarray(end, dtype=float)
+        length = float(np.hypot(*(end - start)))
+        if length == 0:
+            raise ValueError("start and end are the same point.")
+        ranges = np.arange(0, length, spacing)
+        if extend > 0:
+            ranges = np.concatenate([ranges, [length], np.arange(length, length + extend, spacing)[1:],
+                                     [length + extend]])
+        else:
+            ranges = np.append(ranges, length)
+        ranges = np.unique(ranges)
+        direction = (end - start) / length
+        depths = self.depthAt(start[0] + ranges * direction[0], start[1] + ranges * direction[1])
+        return np.column_stack([ranges, depths])
+
+    #################################################
+    # Reading the grid
+
+    def _clean(self, values):
+        """Raw grid values as depths: float, nodata as nan, heights flipped."""
+        if np.ma.isMaskedArray(values):
+            values = values.astype(float).filled(np.nan)
+        values = np.array(values, dtype=float)
+        if self.nodata is not None:
+            values[values == self.nodata] = np.nan
+        return -values if self.elevation else values
+
+    def _corners(self, i, j):
+        """Depths of the four cells around each point, whose lower corner is (i, j)."""
+        if isinstance(self.depth, np.ndarray):
+            # In memory or memory-mapped: index the cells directly; only their pages are read.
+            d = self.depth
+            return [self._clean(d[i + a, j + b]) for a, b in ((0, 0), (0, 1), (1, 0), (1, 1))]
+
+        # File reader: read the tiles the points fall in, each with one extra row and column for the neighbours.
+        corners = [np.empty(len(i)) for _ in range(4)]
+        ti, tj = i // TILE, j // TILE
+        tile_ids = ti * (self.shape[1] // TILE + 1) + tj
+        for t in np.unique(tile_ids):
+            sel = tile_ids == t
+            a, b = int(ti[sel][0]), int(tj[sel][0])
+            block = self._tile(a, b)
+            li, lj = i[sel] - a * TILE, j[sel] - b * TILE
+            for k, (di, dj) in enumerate(((0, 0), (0, 1), (1, 0), (1, 1))):
+                corners[k][sel] = block[li + di, lj + dj]
+        return corners
+
+    def _tile(self, a, b):
+        with self._lock:
+            if (a, b) in self._tiles:
+                self._tiles.move_to_end((a, b))
+                return self._tiles[(a, b)]
+        block = self._clean(self.depth[a * TILE:(a + 1) * TILE + 1, b * TILE:(b + 1) * TILE + 1])
+        with self._lock:
+            self._tiles[(a, b)] = block
+            while len(self._tiles) > MAX_TILES:
+                self._tiles.popitem(last=False)
+        return block
+
+
+#################################################
+# Opening grid files
+
+def openGrid(path, elevation=None, variable=None, band=1):
+    """
+    Open a bathymetry grid without reading it. Supported: .npy (with its .json from convertGrid), GeoTIFF (.tif),
+    NetCDF (.nc) and .npz. elevation=True if the values are heights; by default taken from the .json for .npy,
+    guessed for NetCDF (a variable named elevation, or marked positive up), and False otherwise.
+    variable: the NetCDF variable to read (default: the first 2-D one). band: the GeoTIFF band.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".npy":
+        with open(os.path.splitext(path)[0] + ".json") as fh:
+            meta = json.load(fh)
+        depth = np.load(path, mmap_mode="r")
+        ny, nx = depth.shape
+        return BathymetryRaster(meta["x0"] + meta["dx"] * np.arange(nx), meta["y0"] + meta["dy"] * np.arange(ny),
+                                depth, nodata=meta.get("nodata"),
+                                elevation=meta.get("elevation", False) if elevation is None else elevation)
+    if ext in (".tif", ".tiff"):
+        return _openGeoTiff(path, band, bool(elevation))
+    if ext in (".nc", ".nc4", ".grd"):
+        return _openNetCDF(path, variable, elevation)
+    if ext == ".npz":
+        raster = BathymetryRaster.fromNpz(path)
+        raster.elevation = bool(elevation)
+        return raster
+    raise ValueError(f"Unsupported bathymetry grid '{path}'. Must be .npy, .tif, .nc or .npz.")
+
+
+class _RasterioBand:
+    """One band of a rasterio dataset, read a window at a time when sliced."""
+
+    def __init__(self, dataset, band):
+        self.dataset = dataset
+        self.band = band
+        self.shape = (dataset.height, dataset.width)
+
+    def __getitem__(self, key):
+        from rasterio.windows import Window
+        rows, cols = (range(*k.indices(n)) for k, n in zip(key, self.shape))
+        window = Window(cols.start, rows.start, len(cols), len(rows))
+        return self.dataset.read(self.band, window=window)
+
+
+def _openGeoTiff(path, band, elevation):
+    try:
+        import rasterio
+    except ImportError:
+        raise ImportError("Reading GeoTIFF bathymetry needs rasterio (pip install rasterio), or convert it to .npy "
+                          "elsewhere with convertGrid.")
+    dataset = rasterio.open(path)
+    t = dataset.transform
+    if t.b != 0 or t.d != 0:
+        raise ValueError(f"{path} is rotated; only north-up grids are supported.")
+    # Cell centres.
+    x = t.c + t.a * (np.arange(dataset.width) + 0.5)
+    y = t.f + t.e * (np.arange(dataset.height) + 0.5)
+    return BathymetryRaster(x, y, _RasterioBand(dataset, band), nodata=dataset.nodata, elevation=elevation)
+
+
+class _NetCDFVariable:
+    """A 2-D NetCDF variable stored (x, y), read as (y, x)."""
+
+    def __init__(self, variable):
+        self.variable = variable
+        self.shape = tuple(variable.shape[::-1])
+
+    def __getitem__(self, key):
+        return self.variable[key[1], key[0]].T
+
+
+def _openNetCDF(path, variable, elevation):
+    try:
+        import netCDF4
+    except ImportError:
+        raise ImportError("Reading NetCDF bathymetry needs netCDF4 (pip install netCDF4), or convert it to .npy "
+                          "elsewhere with convertGrid.")
+    dataset = netCDF4.Dataset(path)
+    if variable is None:
+        candidates = [name for name, v in dataset.variables.items() if v.ndim == 2]
+        if not candidates:
+            raise ValueError(f"No 2-D variable in {path}.")
+        variable = candidates[0]
+    var = dataset.variables[variable]
+    dim_y, dim_x = var.dimensions
+    y = dataset.variables[dim_y][:] if dim_y in dataset.variables else np.arange(var.shape[0])
+    x = dataset.variables[dim_x][:] if dim_x in dataset.variables else np.arange(var.shape[1])
+    grid = var
+    if dim_y.lower() in ("x", "lon", "longitude", "easting"):
+        # Stored (x, y): swap, without reading anything.
+        x, y, grid = y, x, _NetCDFVariable(var)
+    if elevation is None:
+        elevation = variable.lower() in ("elevation", "z") and getattr(var, "positive", "up") == "up"
+    # netCDF4 masks the fill value itself (masked cells become nan), so no nodata value is needed.
+    return BathymetryRaster(np.asarray(x, dtype=float), np.asarray(y, dtype=float), grid, elevation=elevation)
+
+
+def convertGrid(source, destination, rows_per_block=256, **open_kwargs):
+    """
+    Copy any grid openGrid reads to a memory-mappable .npy (float32 depths, positive down, nan for no data) and its
+    .json, block by block, so the grid never has to fit in memory. Returns the opened copy.
+    """
+    raster = openGrid(source, **open_kwargs)
+    ny, nx = raster.shape
+    out = np.lib.format.open_memmap(destination, mode="w+", dtype=np.float32, shape=(ny, nx))
+    for r in range(0, ny, rows_per_block):
+        out[r:r + rows_per_block] = raster._clean(raster.depth[r:r + rows_per_block, 0:nx])
+    out.flush()
+    del out
+    with open(os.path.splitext(destination)[0] + ".json", "w") as fh:
+        json.dump({"x0": float(raster.x0), "dx": float(raster.dx), "y0": float(raster.y0), "dy": float(raster.dy),
+                   "source": os.path.abspath(source)}, fh, indent=1)
+    return openGrid(destination)
+
+
+#################################################
+# Simplifying and caching profiles
+
+def simplifyProfile(profile, tolerance=0.05):
+    """
+    The fewest points of a [range, depth] profile whose straight-line segments stay within `tolerance` m (depth)
+    of every dropped point (Douglas-Peucker, with vertical distance). The first and last points are always kept.
+    """
+    n = len(profile)
+    if n <= 2 or tolerance <= 0:
+        return profile
+    r, z = profile[:, 0], profile[:, 1]
+    keep = np.zeros(n, dtype=bool)
+    keep[[0, -1]] = True
+    stack = [(0, n - 1)]
+    while stack:
+        a, b = stack.pop()
+        if b - a < 2:
+            continue
+        chord = z[a] + (z[b] - z[a]) * (r[a + 1:b] - r[a]) / (r[b] - r[a])
+        error = np.abs(z[a + 1:b] - chord)
+        k = int(np.argmax(error))
+        if error[k] > tolerance:
+            m = a + 1 + k
+            keep[m] = True
+            stack.extend(((a, m), (m, b)))
+    return profile[keep]
+
+
+class BathymetryProvider:
+    """
+    Transect profiles from a grid, simplified and cached. Has the same profile() as BathymetryRaster, so it can be
+    used wherever a raster is (e.g. CEA_arrayMode).
+    Profiles are cached in memory (the most recent max_cached) and, if cache_dir is given, as .npy files there,
+    so they survive between sessions and are shared by workers. Cached files are tied to the grid file's size and
+    modification time, so editing the grid invalidates them. A raster given as an object is identified by a hash of
+    its contents; one read through a reader (not an array) only uses the memory cache.
+    """
+
+    def __init__(self, grid, spacing=5.0, extend=10.0, tolerance=0.05, cache_dir=None, max_cached=4096,
+                 **open_kwargs):
+        if isinstance(grid, BathymetryRaster):
+            self.raster = grid
+            self._grid_id = None if cache_dir is None else _rasterHash(grid)
+        else:
+            self.raster = openGrid(grid, **open_kwargs)
+            stat = os.stat(grid)
+            self._grid_id = f"{os.path.abspath(grid)}|{stat.st_size}|{stat.st_mtime_ns}|{sorted(open_kwargs.items())}"
+        self.spacing = spacing
+        self.extend = extend
+        self.tolerance = tolerance
+        self.cache_dir = cache_dir
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+        self.max_cached = max_cached
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def profile(self, start, end, spacing=None, extend=None, tolerance=None):
+        """Simplified [range, depth] profile from start towards end. Defaults come from the provider."""
+        spacing = self.spacing if spacing is None else spacing
+        extend = self.extend if extend is None else extend
+        tolerance = self.tolerance if tolerance is None else tolerance
+        # Positions to the millimetre, so the same instruments always hit the same entry.
+        key = (tuple(np.round(np.asarray(start, dtype=float), 3)), tuple(np.round(np.asarray(end, dtype=float), 3)),
+               float(spacing), float(extend), float(tolerance))
+
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return self._cache[key].copy()
+
+        path = self._cachePath(key)
+        if path and os.path.exists(path):
+            profile = np.load(path)
+            self.hits += 1
+        else:
+            profile = simplifyProfile(self.raster.profile(key[0], key[1], spacing, extend), tolerance)
+            self.misses += 1
+            if path:
+                tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp.npy"
+                np.save(tmp, profile)
+                os.replace(tmp, path)
+
+        with self._lock:
+            self._cache[key] = profile
+            while len(self._cache) > self.max_cached:
+                self._cache.popitem(last=False)
+        return profile.copy()
+
+    def _cachePath(self, key):
+        if not self.cache_dir or self._grid_id is None:
+            return None
+        digest = hashlib.blake2b(repr((self._grid_id, key)).encode(), digest_size=12).hexdigest()
+        return os.path.join(self.cache_dir, f"transect_{digest}.npy")
+
+
+def _rasterHash(raster):
+    """Content hash of an in-memory raster (its placement, nodata handling and depths), or None for a reader."""
+    if not isinstance(raster.depth, np.ndarray):
+        return None
+    h = hashlib.blake2b(digest_size=16)
+    h.update(repr((raster.x0, raster.dx, raster.y0, raster.dy, raster.shape, raster.nodata, raster.elevation,
+                   raster.depth.dtype.str)).encode())
+    # Row blocks, so a memory-mapped grid is hashed without reading it all into memory at once.
+    for i in range(0, raster.shape[0], TILE):
+        h.update(np.ascontiguousarray(raster.depth[i:i + TILE]).tobytes())
+    return f"raster-{h.hexdigest()}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert a bathymetry grid to a memory-mappable .npy.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("convert")
+    p.add_argument("source", help="GeoTIFF, NetCDF or .npz grid")
+    p.add_argument("destination", help=".npy to write (its .json goes next to it)")
+    p.add_argument("--elevation", action="store_true", help="Values are heights (negative below sea level).")
+    p.add_argument("--variable", help="NetCDF variable (default: the first 2-D one).")
+    args = parser.parse_args()
+
+    raster = convertGrid(args.source, args.destination, elevation=args.elevation or None, variable=args.variable)
+    print(f"Wrote {args.destination}: {raster.shape[0]} x {raster.shape[1]} cells, "
+          f"{abs(raster.dx):g} x {abs(raster.dy):g} m")
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 10:03:55 2026
+Complex Environmental Acoustics (CEA) modeling.
+Frank McQuarrie, Skidaway Institute of Oceanography
+
+Purpose of script: Low-level Bellhop file handling. Writes the input files for an environment, reads the results back
+and cleans up, so the Bellhop executable itself can be launched by whoever is scheduling the runs (see CEA_asyncRunner).
+pm.compute_arrivals does all of this in one blocking call; this just breaks it into its steps.
+Nothing here changes the working directory: the files go in the run context's scratch folder (see CEA_runContext)
+under unique names, and Bellhop is started in that folder. solve() and solveMany() are safe to call from threads.
+
+Scripts.
+CEA_automate : current. Runs and saves outputs from propagation modeling.
+CEA_singleExperiment: Run and save a specific model.
+
+CEA_createEnv: Creates an environment for Bellhop to model sound through.
+CEA_ssp: Sets a soundspeed profile. Currently set to create one given stratification strength and depth.
+CEA_surfaceLevels: defines surface waves for the environment.
+
+CEA_rayTracing: Traces (and can plot) sound pathways through the environment.
+CEA_arrivals: Measures signal strength and arrival timing for sound through the environment. Also adds initial power, and given a detection threshold, can define a ray as detectable or not.
+******CEA_bellhop: Writes Bellhop input files, reads results back, and cleans up.
+CEA_asyncRunner: Runs many Bellhop solves at once with concurrency limits, timeouts and retries.
+CEA_runContext: Bellhop executable, scratch and output folders, passed explicitly to every solve.
+CEA_envTemplate: Writes each group's boundary files once and only the changing parts of each run's inputs.
+"""
+
+import os
+import tempfile
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from CEA_lazy import lazyModule
+from CEA_runContext import defaultContext
+import CEA_envTemplate
+pm = lazyModule("arlpy.uwapm")  # Imported on first use (see CEA_lazy).
+
+# Bellhop's location. Full path to the executable, or just its name if it is on your PATH.
+# You need to have previously run the AT makefile to create executables.
+# Kept for older scripts; RunContext.bellhop_exe is what the runners use.
+BELLHOP_EXE = os.environ.get("CEA_BELLHOP", "bellhop.exe")
+
+# Write inputs from per-group templates (see CEA_envTemplate): the .bty/.ati files are written once per
+# scenario x surface and linked into each run. False to have arlpy write every file for every run.
+USE_TEMPLATES = True
+
+# Bellhop run types used by CEA, and the task code written into the .env file for each.
+TASK_CODES = {
+    "arrivals": "A",
+    "rays": "R",
+    "eigenrays": "E",
+}
+
+# arlpy's Bellhop interface. Only its file writers/readers are used here; the executable is launched separately.
+# Made on first use, so importing this module does not import arlpy.
+_model = None
+
+
+def _bellhopModel():
+    global _model
+    if _model is None:
+        _model = pm._Bellhop()
+    return _model
+
+#################################################
+
+def writeInputs(env, task="arrivals", scratch_dir=None):
+    """
+    Write the Bellhop input files (.env, plus .bty/.ati/.ssp as needed) for env into scratch_dir (the system temp
+    folder if None). Returns the full path of the files, without extension; it is unique to this run.
+    """
+    env = pm.check_env2d(env)
+    # Reserve a unique name, then let arlpy write every file of the run next to it.
+    fd, path = tempfile.mkstemp(suffix=".env", prefix="cea_", dir=scratch_dir)
+    os.close(fd)
+    fname_base = path[:-len(".env")]
+    if USE_TEMPLATES and CEA_envTemplate.supported(env):
+        template = CEA_envTemplate.templateFor(env, os.path.dirname(path))
+        template.write(env, TASK_CODES[task], fname_base)
+    else:
+        _bellhopModel()._create_env_file(env, TASK_CODES[task], fname_base=fname_base)
+    return fname_base
+
+
+def bellhopCommand(fname_base, bellhop_exe=BELLHOP_EXE):
+    """
+    Argument list that runs Bellhop on one set of input files. Run it with cwd=os.path.dirname(fname_base):
+    Bellhop is given the bare file name, since it does not cope with long paths.
+    """
+    return [bellhop_exe, os.path.basename(fname_base)]
+
+
+def loadResults(fname_base, task="arrivals"):
+    """
+    Read a finished run. Raises RuntimeError if Bellhop reported a fatal error or wrote no output.
+    """
+    model = _bellhopModel()
+    err = model._check_error(fname_base)
+    if err is not None:
+        raise RuntimeError(err)
+    try:
+        if task == "arrivals":
+            return model._load_arrivals(fname_base)
+        return model._load_rays(fname_base)
+    except FileNotFoundError:
+        raise RuntimeError("Bellhop did not generate expected output file")
+
+
+# Every file Bellhop reads or writes for a run, by extension.
+RUN_FILES = (".env", ".bty", ".ssp", ".ati", ".sbp", ".prt", ".log", ".arr", ".ray", ".shd")
+
+
+def cleanup(fname_base):
+    """Remove every file Bellhop read or wrote for this run."""
+    for ext in RUN_FILES:
+        _bellhopModel()._unlink(fname_base + ext)
+
+#################################################
+
+def solve(env, task="arrivals", context=None, timeout=None):
+    """
+    Run Bellhop on one environment and return the arrivals (or rays) table. Blocking, like pm.compute_arrivals,
+    but thread-safe: the files are unique to this call and the working directory is never changed.
+    """
+    context = context or defaultContext()
+    with CEA_envTemplate.templatesInUse(context.scratch_dir):
+        fname_base = writeInputs(env, task, context.scratch_dir)
+        try:
+            subprocess.run(bellhopCommand(fname_base, context.bellhop_exe), cwd=os.path.dirname(fname_base),
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=timeout)
+            return loadResults(fname_base, task)
+        finally:
+            cleanup(fname_base)
+
+
+def solveMany(envs, task="arrivals", context=None, max_workers=None, timeout=None):
+    """
+    Solve a list of environments on a pool of threads (each one waits on its own Bellhop process).
+    Returns the results in the same order; an exception from any run is raised.
+    """
+    context = context or defaultContext()
+    max_workers = max_workers or os.cpu_count() or 1
+    with CEA_envTemplate.templatesInUse(context.scratch_dir), ThreadPoolExecutor(max_workers=max_workers) as pool:
+        return list(pool.map(lambda env: solve(env, task, context, timeout), envs))
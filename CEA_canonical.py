@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 17:05:43 2026
+Complex Environmental Acoustics (CEA) modeling.
+Frank McQuarrie, Skidaway Institute of Oceanography
+
+Purpose of script: Find sweep rows that would give Bellhop exactly the same inputs, so each is solved once.
+
+LHS draws continuous values, but a lot of that detail never reaches Bellhop:
+    gradient_depth  the SSP is only defined every 2 m (CEA_ssp), so 7.3 m and 6.1 m give the same profile.
+    deltaSS = 0     no stratification, so gradient_depth makes no difference at all.
+    SBL, threshold  only applied after Bellhop (processArrivals), never part of the solve.
+Each row is reduced to its canonical (effective) environment, rows sharing one are grouped, the group is solved once
+and its arrivals are post-processed for every row in it.
+
+Scripts.
+CEA_automate : current. Runs and saves outputs from propagation modeling.
+CEA_singleExperiment: Run and save a specific model.
+
+CEA_createEnv: Creates an environment for Bellhop to model sound through.
+CEA_ssp: Sets a soundspeed profile. Currently set to create one given stratification strength and depth.
+CEA_surfaceLevels: defines surface waves for the environment.
+
+CEA_rayTracing: Traces (and can plot) sound pathways through the environment.
+CEA_arrivals: Measures signal strength and arrival timing for sound through the environment. Also adds initial power, and given a detection threshold, can define a ray as detectable or not.
+******CEA_canonical: Groups sweep rows that share an effective environment so each is only solved once.
+"""
+
+import hashlib
+import numpy as np
+from CEA_lazy import lazyModule
+from CEA_ssp import effective_gradient_depth
+
+pd = lazyModule("pandas")  # Imported on first use (see CEA_lazy).
+
+# Row fields that change what Bellhop sees, in key order. SBL and detectionThreshold are deliberately not here.
+SOLVE_PARAMS = ("scenario", "surface", "deltaSS", "gradient_depth", "bottom_absorption")
+
+# Decimals the continuous parameters are kept to (CEA_automate already rounds its LHS draws to these).
+DECIMALS = {"deltaSS": 2, "bottom_absorption": 2}
+
+#################################################
+
+def canonicalParams(row, depth_range=(0, 22)):
+    """
+    The parameters of row that reach Bellhop, normalized to their effective physical content.
+    """
+    deltaSS = round(float(row["deltaSS"]), DECIMALS["deltaSS"])
+    if deltaSS == 0:
+        gradient_depth = 0.0  # No stratification, so the layer depth does not matter.
+    else:
+        gradient_depth = effective_gradient_depth(float(row["gradient_depth"]), depth_range)
+    return {
+        "scenario": row["scenario"],
+        "surface": row["surface"],
+        "deltaSS": deltaSS,
+        "gradient_depth": gradient_depth,
+        "bottom_absorption": round(float(row["bottom_absorption"]), DECIMALS["bottom_absorption"]),
+    }
+
+
+def canonicalKey(row, depth_range=(0, 22)):
+    """Hashable key; rows with the same key give Bellhop identical inputs."""
+    params = canonicalParams(row, depth_range)
+    return tuple(params[k] for k in SOLVE_PARAMS)
+
+
+def paramsFromKey(key):
+    return dict(zip(SOLVE_PARAMS, key))
+
+
+def groupPlan(plan, depth_range=(0, 22)):
+    """
+    Group the rows of a sample plan by canonical environment. Returns {key: [row indices]}, in first-seen order.
+    """
+    groups = {}
+    for i, row in enumerate(plan):
+        groups.setdefault(canonicalKey(row, depth_range), []).append(i)
+    return groups
+
+
+def dedupReport(groups, verbose=True):
+    """How many solves the grouping saves."""
+    n_rows = sum(len(rows) for rows in groups.values())
+    n_solves = len(groups)
+    report = {
+        "rows": n_rows,
+        "solves": n_solves,
+        "saved": n_rows - n_solves,
+        "saved_pct": 100 * (n_rows - n_solves) / n_rows if n_rows else 0.0,
+    }
+    if verbose:
+        print(f">>> {report['rows']} rows need {report['solves']} Bellhop solves "
+              f"({report['saved']} saved, {report['saved_pct']:.1f}%)")
+    return report
+
+
+#################################################
+# Safety net for environments that did not come from a sample plan (e.g. custom bathymetry or surfaces).
+# Hashes what Bellhop actually reads. Numbers are rounded to the 6 decimals the input files are written with.
+
+def envKey(env):
+    h = hashlib.sha1()
+    for name in sorted(env):
+        h.update(name.encode())
+        h.update(_contentBytes(env[name]))
+    return h.hexdigest()
+
+
+def _contentBytes(value):
+    if isinstance(value, pd.DataFrame):
+        parts = [value.to_numpy(dtype=float), np.asarray(value.index, dtype=float), np.asarray(value.columns, dtype=float)]
+        return b"".join(np.ascontiguousarray(np.round(p, 6)).tobytes() for p in parts)
+    if isinstance(value, (np.ndarray, list, tuple)) or (np.isscalar(value) and not isinstance(value, str)):
+        try:
+            arr = np.asarray(value, dtype=float)
+            return str(arr.shape).encode() + np.ascontiguousarray(np.round(arr, 6)).tobytes()
+        except (TypeError, ValueError):
+            pass
+    return repr(value).encode()
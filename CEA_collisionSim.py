@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 23:59:20 2026
+Complex Environmental Acoustics (CEA) modeling.
+Frank McQuarrie, Skidaway Institute of Oceanography
+
+Purpose of script: Detection rates with many tags transmitting at once.
+One modeled transmission says whether a tag can be heard, but with hundreds of tags on random delays, transmissions
+overlap at the receiver and neither decodes (a collision). Here whole deployments are simulated:
+    channels       what one transmission of a tag group looks like at each receiver: when the first and last
+                   detectable arrivals come in after sending, the loudest level, and whether it is heard at all.
+                   Made from calculateArrivals' arrivals (channelFromArrivals), or given as a table.
+    schedules      every tag transmits after a random delay (uniform between min_delay and max_delay), over the
+                   whole duration. All transmissions of all tags are drawn at once.
+    collisions     a heard transmission occupies the receiver from its first detectable arrival until its last one
+                   plus the length of the pulse train. At each receiver the receptions are sorted by start time, and
+                   one overlaps an earlier one if it starts before the latest end so far (a running maximum), or a
+                   later one if it ends after the next one starts. Overlapping receptions are both lost.
+    detections     receptions with no collision, decoded with the channel's decode probability (1 unless given,
+                   e.g. the decoded fraction from CEA_signalSynthesis).
+Transmissions too weak to trigger the receiver do not collide with anything. There are no per-transmission loops,
+so 10^7 transmissions take seconds.
+
+Scripts.
+CEA_automate : current. Runs and saves outputs from propagation modeling.
+CEA_singleExperiment: Run and save a specific model.
+
+CEA_createEnv: Creates an environment for Bellhop to model sound through.
+CEA_ssp: Sets a soundspeed profile. Currently set to create one given stratification strength and depth.
+CEA_surfaceLevels: defines surface waves for the environment.
+
+CEA_rayTracing: Traces (and can plot) sound pathways through the environment.
+CEA_arrivals: Measures signal strength and arrival timing for sound through the environment. Also adds initial power, and given a detection threshold, can define a ray as detectable or not.
+CEA_signalSynthesis: Sends the tag's pulse train through each run's arrivals and decides whether it decodes.
+******CEA_collisionSim: Simulates many tags on random delays, with collisions at each receiver, for detection rates.
+
+Usage:
+    python CEA_collisionSim.py <channels.csv> [--tags 200] [--hours 24] [--min-delay 60] [--max-delay 180]
+                               [--seed 1] [--out rates.csv]
+"""
+
+import argparse
+import numpy as np
+from CEA_lazy import lazyModule
+from CEA_signalSynthesis import PULSE_TIMES, PULSE_LENGTH
+from CEA_arrivals import arrivalLevels, clippedLevels
+pd = lazyModule("pandas")  # Imported on first use (see CEA_lazy).
+
+TRAIN_DURATION = float(PULSE_TIMES[-1] + PULSE_LENGTH)     # (s) Length of one transmission
+
+CHANNEL_COLUMNS = ["group", "receiver", "First_Arrival_s", "Last_Arrival_s", "Level_dB", "Audible"]
+
+RATE_COLUMNS = ["group", "receiver", "Tags", "Transmissions", "Receptions", "Collisions", "Detections",
+                "Detection_Rate", "Detections_per_Tag_Hour"]
+
+#################################################
+
+def channelFromArrivals(arrivals, SBL=0, detectionThreshold=50, low_power_SL=142):
+    """
+    One transmission at one receiver, from its arrivals: first and last detectable arrival (s after sending),
+    the loudest arrival (dB, clipped at 0) and whether any arrival is detectable.
+    """
+    low_power_dB = clippedLevels(arrivalLevels(arrivals["arrival_amplitude"], arrivals["surface_bounces"], SBL,
+                                               low_power_SL))
+    detectable = low_power_dB >= detectionThreshold
+    times = arrivals["time_of_arrival"].to_numpy(dtype=float)[detectable]
+    return {
+        "First_Arrival_s": times.min() if detectable.any() else np.nan,
+        "Last_Arrival_s": times.max() if detectable.any() else np.nan,
+        "Level_dB": low_power_dB.max() if len(low_power_dB) else 0.0,
+        "Audible": bool(detectable.any()),
+    }
+
+
+def channelTable(arrivals_by_link, **kwargs):
+    """Channel table from {(group, receiver): arrivals}. kwargs go to channelFromArrivals."""
+    rows = [{"group": group, "receiver": receiver, **channelFromArrivals(arrivals, **kwargs)}
+            for (group, receiver), arrivals in arrivals_by_link.items()]
+    return pd.DataFrame(rows, columns=CHANNEL_COLUMNS)
+
+
+def transmissionSchedule(n_tags, duration, min_delay=60, max_delay=180, rng=None):
+    """
+    Send times (s) of every transmission of n_tags tags over duration (s), as (tag, time) arrays sorted by tag.
+    Each tag starts at a random point in its first delay, so the tags are not in step.
+    """
+    rng = np.random.default_rng(rng)
+    per_tag = int(np.ceil(duration / min_delay)) + 1
+    times = np.empty((n_tags, per_tag))
+    times[:, 0] = rng.uniform(0, max_delay, n_tags)
+    times[:, 1:] = rng.uniform(min_delay, max_delay, (n_tags, per_tag - 1))
+    np.cumsum(times, axis=1, out=times)
+    tag, k = np.nonzero(times < duration)
+    return tag, times[tag, k]
+
+
+def collisions(start, end):
+    """Which receptions [start, end) overlap any other, for receptions at one receiver."""
+    order = np.argsort(start, kind="stable")
+    s, e = start[order], end[order]
+    latest_end = np.maximum.accumulate(e)
+    hit = np.zeros(len(s), dtype=bool)
+    hit[1:] = s[1:] < latest_end[:-1]       # starts before an earlier one has ended
+    hit[:-1] |= e[:-1] > s[1:]              # ends after the next one starts
+    collided = np.empty_like(hit)
+    collided[order] = hit
+    return collided
+
+
+def simulate(
+    channels,                   # Channel table (channelTable, or a CSV/DataFrame with CHANNEL_COLUMNS)
+    tags = 200,                 # Number of tags, spread evenly over the groups; or {group: number of tags}
+    hours = 24,
+    min_delay = 60,             # (s) Random delay between a tag's transmissions
+    max_delay = 180,
+    train_duration = TRAIN_DURATION,
+    seed = None
+):
+    """
+    Detection rate of every group at every receiver, one row per channel. Detection_Rate is the fraction of the
+    group's transmissions that were detected at that receiver.
+    """
+    if isinstance(channels, str):
+        channels = pd.read_csv(channels)
+    missing = [c for c in CHANNEL_COLUMNS if c not in channels.columns]
+    if missing:
+        raise ValueError(f"Channel table is missing columns {missing}.")
+    if min_delay <= 0 or max_delay < min_delay:
+        raise ValueError("Need 0 < min_delay <= max_delay.")
+
+    groups = list(dict.fromkeys(channels["group"]))
+    if not isinstance(tags, dict):
+        tags = {g: n for g, n in zip(groups, np.diff(np.linspace(0, tags, len(groups) + 1).round().astype(int)))}
+    counts = np.array([tags.get(g, 0) for g in groups])
+    rng = np.random.default_rng(seed)
+    duration = hours * 3600
+
+    tag, sent = transmissionSchedule(int(counts.sum()), duration, min_delay, max_delay, rng)
+    group_of_tag = np.repeat(np.arange(len(groups)), counts)
+    group = group_of_tag[tag]
+    sent_per_group = np.bincount(group, minlength=len(groups))
+
+    rows = []
+    for receiver, links in channels.groupby("receiver", sort=False):
+        # Per-group channel values at this receiver, looked up per transmission.
+        g = links["group"].map({name: i for i, name in enumerate(groups)}).to_numpy()
+        audible = np.zeros(len(groups), dtype=bool)
+        first, last = np.zeros(len(groups)), np.zeros(len(groups))
+        decode_p = np.ones(len(groups))
+        audible[g] = links["Audible"].astype(bool).to_numpy()
+        first[g] = links["First_Arrival_s"].fillna(0).to_numpy()
+        last[g] = links["Last_Arrival_s"].fillna(0).to_numpy()
+        if "Decode_Probability" in links:
+            decode_p[g] = links["Decode_Probability"].to_numpy()
+
+        heard = audible[group]
+        heard_group = group[heard]
+        start = sent[heard] + first[heard_group]
+        end = sent[heard] + last[heard_group] + train_duration
+        collided = collisions(start, end)
+        detected = ~collided & (rng.random(len(start)) < decode_p[heard_group])
+
+        n_heard = np.bincount(heard_group, minlength=len(groups))
+        n_collided = np.bincount(heard_group, weights=collided, minlength=len(groups)).astype(int)
+        n_detected = np.bincount(heard_group, weights=detected, minlength=len(groups)).astype(int)
+        for i in g:
+            rows.append([groups[i], receiver, counts[i], sent_per_group[i], n_heard[i], n_collided[i],
+                         n_detected[i], n_detected[i] / sent_per_group[i] if sent_per_group[i] else np.nan,
+                         n_detected[i] / (counts[i] * hours) if counts[i] else np.nan])
+    return pd.DataFrame(rows, columns=RATE_COLUMNS)
+
+
+def expectedRate(n_heard_tags, occupancy, mean_delay):
+    """
+    Textbook (Poisson) chance that a heard transmission does not collide: no other heard tag starts within
+    occupancy (s) either side of it, exp(-2 (n - 1) occupancy / mean_delay). A check on simulate().
+    """
+    return np.exp(-2 * (n_heard_tags - 1) * occupancy / mean_delay)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Detection rates of many tags on random delays, with collisions.")
+    parser.add_argument("channels", help="CSV with columns " + ", ".join(CHANNEL_COLUMNS))
+    parser.add_argument("--tags", type=int, default=200)
+    parser.add_argument("--hours", type=float, default=24)
+    parser.add_argument("--min-delay", type=float, default=60)
+    parser.add_argument("--max-delay", type=float, default=180)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--out", help="Save the rates here (CSV).")
+    args = parser.parse_args()
+
+    rates = simulate(args.channels, tags=args.tags, hours=args.hours, min_delay=args.min_delay,
+                     max_delay=args.max_delay, seed=args.seed)
+    print(rates.to_string(index=False))
+    if args.out:
+        rates.to_csv(args.out, index=False)
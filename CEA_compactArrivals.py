@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 18:21:09 2026
+Complex Environmental Acoustics (CEA) modeling.
+Frank McQuarrie, Skidaway Institute of Oceanography
+
+Purpose of script: Keep the per-arrival data of a long sweep in memory, compactly. The arrivals DataFrame from
+calculateArrivals holds object-dtype complex amplitudes, a categorical bin column and several float64 columns per
+arrival, which is far too much to keep for thousands of runs. This keeps only the useful columns, in small dtypes,
+in one set of growing arrays shared by every run:
+    time_of_arrival, angle_of_arrival, low_power_dB   float32
+    surface_bounces, bottom_bounces                   int16
+    arrival_amplitude                                 complex64
+That is 24 bytes per arrival; a 10k-run sweep at ~1000 arrivals per run is about 240 MB.
+Runs are located through one offsets array (the run index), so a run, or a range of runs, is a view with no copy.
+Convert to pandas only when you need it.
+
+Scripts.
+CEA_automate : current. Runs and saves outputs from propagation modeling.
+CEA_singleExperiment: Run and save a specific model.
+
+CEA_createEnv: Creates an environment for Bellhop to model sound through.
+CEA_ssp: Sets a soundspeed profile. Currently set to create one given stratification strength and depth.
+CEA_surfaceLevels: defines surface waves for the environment.
+
+CEA_rayTracing: Traces (and can plot) sound pathways through the environment.
+CEA_arrivals: Measures signal strength and arrival timing for sound through the environment. Also adds initial power, and given a detection threshold, can define a ray as detectable or not.
+******CEA_compactArrivals: Compact, append-only store of per-arrival data for many runs.
+"""
+
+import os
+import json
+import numpy as np
+
+# Columns kept per arrival, and the dtype each is stored in.
+FIELDS = {
+    "time_of_arrival": np.float32,
+    "angle_of_arrival": np.float32,
+    "surface_bounces": np.int16,
+    "bottom_bounces": np.int16,
+    "arrival_amplitude": np.complex64,
+    "low_power_dB": np.float32,
+}
+
+
+class CompactArrivals:
+    """
+    Append-only, columnar arrivals for many runs. Index with an int for one run, or a slice for a range of runs.
+    """
+
+    def __init__(self, capacity=4096, fields=None):
+        self.fields = dict(fields or FIELDS)
+        self._cols = {name: np.empty(capacity, dtype) for name, dtype in self.fields.items()}
+        self._n = 0                                     # arrivals stored
+        self._offsets = np.zeros(65, dtype=np.int64)    # run k is arrivals [offsets[k], offsets[k+1])
+        self._n_runs = 0
+        self.run_ids = []                               # caller's id for each run (e.g. plan row)
+        self.run_meta = []                              # small dict per run (e.g. SBL, threshold)
+        self._readonly = False
+
+    #################################################
+    # Building
+
+    def append(self, arrivals, run_id=None, **meta):
+        """
+        Add one run's arrivals (a DataFrame from calculateArrivals/processArrivals, or a dict of arrays).
+        Columns that are missing are stored as zeros.
+        """
+        if self._readonly:
+            raise ValueError("This is a view of another CompactArrivals; append to the original.")
+        n_new = len(arrivals["time_of_arrival"])
+        self._reserve(self._n + n_new)
+        for name, dtype in self.fields.items():
+            target = self._cols[name][self._n:self._n + n_new]
+            if name in arrivals:
+                values = arrivals[name]
+                values = values.to_numpy() if hasattr(values, "to_numpy") else np.asarray(values)
+                if values.dtype == object:
+                    values = values.astype(complex if np.issubdtype(dtype, np.complexfloating) else float)
+                target[:] = values
+            else:
+                target[:] = 0
+        self._n += n_new
+
+        if self._n_runs + 2 > len(self._offsets):
+            self._offsets = np.concatenate([self._offsets, np.zeros(len(self._offsets), dtype=np.int64)])
+        self._n_runs += 1
+        self._offsets[self._n_runs] = self._n
+        self.run_ids.append(self._n_runs - 1 if run_id is None else run_id)
+        self.run_meta.append(meta)
+
+    def _reserve(self, n):
+        # Capacity doubles, so appends only copy on the rare growth step.
+        capacity = len(next(iter(self._cols.values())))
+        if n <= capacity:
+            return
+        while capacity < n:
+            capacity *= 2
+        for name, col in self._cols.items():
+            grown = np.empty(capacity, dtype=col.dtype)
+            grown[:self._n] = col[:self._n]
+            self._cols[name] = grown
+
+    #################################################
+    # Reading (all views, no copies)
+
+    def __len__(self):
+        return self._n_runs
+
+    @property
+    def n_arrivals(self):
+        return self._n
+
+    @property
+    def offsets(self):
+        return self._offsets[:self._n_runs + 1]
+
+    @property
+    def counts(self):
+        """Number of arrivals in each run."""
+        return np.diff(self.offsets)
+
+    @property
+    def nbytes(self):
+        return sum(col.nbytes for col in self._cols.values()) + self._offsets.nbytes
+
+    def column(self, name):
+        """One column across every run."""
+        return self._cols[name][:self._n]
+
+    def __getitem__(self, k):
+        if isinstance(k, slice):
+            start, stop, step = k.indices(self._n_runs)
+            if step != 1:
+                raise ValueError("Only contiguous ranges of runs can be viewed without a copy.")
+            return self._view(start, stop)
+        k = range(self._n_runs)[k]      # Negative -> from the end; out of range raises IndexError.
+        lo, hi = self._offsets[k], self._offsets[k + 1]
+        return {name: col[lo:hi] for name, col in self._cols.items()}
+
+    def _view(self, start, stop):
+        lo, hi = self._offsets[start], self._offsets[stop]
+        view = CompactArrivals.__new__(CompactArrivals)
+        view.fields = self.fields
+        view._cols = {name: col[lo:hi] for name, col in self._cols.items()}
+        view._n = hi - lo
+        view._offsets = self._offsets[start:stop + 1] - lo
+        view._n_runs = stop - start
+        view.run_ids = self.run_ids[start:stop]
+        view.run_meta = self.run_meta[start:stop]
+        view._readonly = True
+        return view
+
+    def perRun(self, values, reduce="sum"):
+        """
+        Reduce a per-arrival array to one value per run, e.g. perRun(c.column("low_power_dB") >= 50) counts
+        detectable arrivals in every run at once. reduce is "sum" or "mean"; empty runs give 0 / nan.
+        """
+        values = np.asarray(values)
+        counts = self.counts
+        totals = np.zeros(self._n_runs, dtype=np.result_type(values.dtype, np.float64))
+        nonempty = counts > 0
+        if self._n:
+            totals[nonempty] = np.add.reduceat(values, self.offsets[:-1][nonempty])
+        if reduce == "mean":
+            with np.errstate(invalid="ignore", divide="ignore"):
+                return totals / counts
+        return totals
+
+    #################################################
+    # Converting and saving
+
+    def toPandas(self, runs=None):
+        """
+        Build a DataFrame (with a "run" column) for all runs, or an int/slice of them. Only done when asked for.
+        A negative int counts from the end, as in indexing.
+        """
+        import pandas as pd
+        if runs is not None and not isinstance(runs, slice):
+            runs = range(len(self))[runs]      # Negative -> from the end; out of range raises IndexError.
+            runs = slice(runs, runs + 1)
+        source = self if runs is None else self[runs]
+        df = pd.DataFrame({name: source.column(name) for name in source.fields})
+        df.insert(0, "run", np.repeat(np.asarray(source.run_ids, dtype=object), source.counts))
+        return df
+
+    def runTable(self):
+        """Per-run table: id, arrival count and whatever metadata was appended with each run."""
+        import pandas as pd
+        table = pd.DataFrame(self.run_meta)
+        table.insert(0, "run", self.run_ids)
+        table.insert(1, "n_arrivals", self.counts)
+        return table
+
+    def save(self, folder):
+        """One .npy per column, so load() can memory-map them."""
+        os.makedirs(folder, exist_ok=True)
+        for name in self.fields:
+            np.save(os.path.join(folder, f"{name}.npy"), self.column(name))
+        np.save(os.path.join(folder, "offsets.npy"), self.offsets)
+        with open(os.path.join(folder, "runs.json"), "w") as fh:
+            json.dump({"run_ids": self.run_ids, "run_meta": self.run_meta}, fh, default=float)
+
+    @classmethod
+    def load(cls, folder, mmap_mode="r"):
+        """Open a saved store. Memory-mapped (read-only) by default, so nothing is read until it is used."""
+        store = cls.__new__(cls)
+        store.fields = dict(FIELDS)
+        store._cols = {name: np.load(os.path.join(folder, f"{name}.npy"), mmap_mode=mmap_mode) for name in FIELDS}
+        store._offsets = np.load(os.path.join(folder, "offsets.npy"))
+        store._n_runs = len(store._offsets) - 1
+        store._n = int(store._offsets[-1])
+        with open(os.path.join(folder, "runs.json")) as fh:
+            runs = json.load(fh)
+        store.run_ids = runs["run_ids"]
+        store.run_meta = runs["run_meta"]
+        store._readonly = mmap_mode is not None
+        return store
@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 20:41:37 2026
+Complex Environmental Acoustics (CEA) modeling.
+Frank McQuarrie, Skidaway Institute of Oceanography
+
+Purpose of script: Decide how many runs a sweep needs, instead of guessing n_iterations up front.
+Each stratum (scenario x surface) is tracked separately. A stratum has converged once it has at least min_runs runs
+and the 95% confidence interval of every target output is narrower than its target, e.g.
+    Detectable_Fraction     +/- 0.02
+    Avg_Signal_dB           +/- 0.5 dB
+Runs with no arrivals have no detectable fraction or average signal. They still count toward min_runs, and an output
+that never has enough values to give an interval (e.g. a stratum where no run has arrivals) cannot be narrowed by
+more runs, so it does not hold its stratum back; status() reports such strata as degenerate.
+Runs are handed out in batches. Each batch goes to the strata that have not converged, in proportion to how many
+more runs each is estimated to need (CI width shrinks with 1/sqrt(n)), and the sweep ends once every stratum has
+converged or the run budget is spent. Strata that settle quickly stop costing Bellhop time early; noisy ones get it.
+
+Used by CEA_automate when stop_when_converged is True.
+
+Scripts.
+CEA_automate : current. Runs and saves outputs from propagation modeling.
+CEA_singleExperiment: Run and save a specific model.
+
+CEA_createEnv: Creates an environment for Bellhop to model sound through.
+CEA_ssp: Sets a soundspeed profile. Currently set to create one given stratification strength and depth.
+CEA_surfaceLevels: defines surface waves for the environment.
+
+CEA_rayTracing: Traces (and can plot) sound pathways through the environment.
+CEA_arrivals: Measures signal strength and arrival timing for sound through the environment. Also adds initial power, and given a detection threshold, can define a ray as detectable or not.
+******CEA_convergence: Allocates runs to the strata that have not converged, and stops the sweep when all have.
+"""
+
+import math
+from CEA_onlineStats import GroupedAccumulator, DEFAULT_GROUP_BY
+from CEA_lazy import lazyModule
+pd = lazyModule("pandas")  # Imported on first use (see CEA_lazy).
+
+# Target half-width of the confidence interval of each output, per stratum.
+TARGETS = {
+    "Detectable_Fraction": 0.02,    # fraction of arrivals that are detectable
+    "Avg_Signal_dB": 0.5,           # dB
+}
+
+# Runs every stratum gets before its interval is trusted. Small samples can look converged by chance.
+MIN_RUNS = 30
+
+#################################################
+
+class ConvergenceController:
+    """
+    Tracks every stratum's outputs as runs finish (through self.stats, a GroupedAccumulator that runSweep updates)
+    and decides where the next batch of runs goes.
+    """
+
+    def __init__(self, strata, targets=TARGETS, confidence=0.95, min_runs=MIN_RUNS, max_runs=None, stats=None):
+        self.strata = [tuple(s) for s in strata]
+        self.targets = dict(targets)
+        self.confidence = confidence
+        self.min_runs = min_runs
+        self.max_runs = max_runs                   # Total run budget over all strata (None = no limit)
+        self.stats = stats if stats is not None else GroupedAccumulator(metrics=tuple(self.targets))
+        missing = set(self.targets) - set(self.stats.metrics)
+        if missing:
+            raise ValueError(f"stats does not track {sorted(missing)}.")
+        self.n_planned = {s: 0 for s in self.strata}
+
+    #################################################
+    # State of each stratum
+
+    def nRuns(self, stratum):
+        """
+        Runs of this stratum that have finished, including those with no arrivals (failed runs never reach the
+        statistics).
+        """
+        if stratum not in self.stats.groups:
+            return 0
+        return self.stats.runs(stratum)
+
+    def degenerateMetrics(self, stratum):
+        """Targets with too few values for an interval (fewer than 2) after min_runs runs, e.g. no run had arrivals."""
+        if self.nRuns(stratum) < self.min_runs:
+            return []
+        return [m for m in self.targets if self.stats.stats(stratum, m).n < 2]
+
+    def halfWidths(self, stratum):
+        if stratum not in self.stats.groups:
+            return {m: math.nan for m in self.targets}
+        return {m: self.stats.stats(stratum, m).halfWidth(self.confidence) for m in self.targets}
+
+    def isConverged(self, stratum):
+        if self.nRuns(stratum) < self.min_runs:
+            return False
+        degenerate = self.degenerateMetrics(stratum)
+        return all(hw <= self.targets[m] for m, hw in self.halfWidths(stratum).items() if m not in degenerate)
+
+    def runsNeeded(self, stratum):
+        """
+        Estimated further runs until this stratum converges. The half-width scales with 1/sqrt(n), so a stratum at
+        n runs with half-width hw needs about n * (hw / target)^2 runs in total. Where only some runs give a value
+        (the rest had no arrivals), the estimate is scaled up by runs per value.
+        """
+        n = self.nRuns(stratum)
+        if n < self.min_runs:
+            return self.min_runs - n
+        needed = 0
+        degenerate = self.degenerateMetrics(stratum)
+        for metric, hw in self.halfWidths(stratum).items():
+            if metric in degenerate:
+                continue
+            if math.isnan(hw):
+                needed = max(needed, 1)
+            elif hw > self.targets[metric]:
+                n_values = self.stats.stats(stratum, metric).n
+                more_values = math.ceil(n_values * (hw / self.targets[metric]) ** 2) - n_values
+                needed = max(needed, math.ceil(more_values * n / n_values))
+        return needed
+
+    @property
+    def n_total(self):
+        return sum(self.n_planned.values())
+
+    @property
+    def budget_left(self):
+        return math.inf if self.max_runs is None else self.max_runs - self.n_total
+
+    @property
+    def done(self):
+        return self.budget_left <= 0 or all(self.isConverged(s) for s in self.strata)
+
+    #################################################
+    # Allocation
+
+    def allocate(self, batch_size):
+        """
+        Split the next batch over the strata that have not converged, in proportion to the runs each still needs
+        (never more than it needs). Returns {stratum: runs}.
+        """
+        batch_size = int(min(batch_size, self.budget_left))
+        needs = {s: self.runsNeeded(s) for s in self.strata if not self.isConverged(s)}
+        needs = {s: n for s, n in needs.items() if n > 0}
+        total = sum(needs.values())
+        if batch_size <= 0 or total == 0:
+            return {}
+        if total <= batch_size:
+            return needs
+
+        # Largest remainder, so the shares add up to exactly batch_size.
+        shares = {s: batch_size * n / total for s, n in needs.items()}
+        allocation = {s: int(share) for s, share in shares.items()}
+        leftover = batch_size - sum(allocation.values())
+        for s in sorted(shares, key=lambda s: shares[s] - allocation[s], reverse=True)[:leftover]:
+            allocation[s] += 1
+        return {s: k for s, k in allocation.items() if k > 0}
+
+    def nextPlan(self, batch_size, buildPlan):
+        """
+        Rows for the next batch. buildPlan(n, scenario, surface) draws n rows for one stratum (e.g. an LHS plan).
+        """
+        plan = []
+        for (scenario, surface), k in self.allocate(batch_size).items():
+            plan.extend(buildPlan(k, scenario, surface))
+            self.n_planned[(scenario, surface)] += k
+        return plan
+
+    def status(self):
+        """One row per stratum: finished runs, CI half-widths, whether it has converged, and any degenerate outputs."""
+        rows = []
+        for s in self.strata:
+            row = dict(zip(DEFAULT_GROUP_BY, s))
+            row["runs"] = self.nRuns(s)
+            row["planned"] = self.n_planned[s]
+            for metric, hw in self.halfWidths(s).items():
+                row[f"{metric}_halfwidth"] = hw
+            row["converged"] = self.isConverged(s)
+            row["degenerate"] = ", ".join(self.degenerateMetrics(s))
+            rows.append(row)
+        return pd.DataFrame(rows)
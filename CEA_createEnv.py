@@ -18,21 +18,18 @@ CEA_rayTracing: Traces (and can plot) sound pathways through the environment.
 CEA_arrivals: Measures signal strength and arrival timing for sound through the environment. Also adds initial power, and given a detection threshold, can define a ray as detectable or not.
 """
 
-import arlpy.uwapm as pm
-import os
+from CEA_lazy import lazyModule
 import CEA_surfaceLevels
 import CEA_bathymetry
 from CEA_ssp import build_stratified_ssp
-
-# Script Directory
-os.chdir(r"pathHere")
+pm = lazyModule("arlpy.uwapm")  # Imported on first use (see CEA_lazy).
 
 #################################################
 
 def createEnv(
-    surface_type = "F",         # Categorical, set in "CAE_surfaceLevels"
-    scenario = "F",             # Categorical, set here and in "CAE_bathymetry"
-    ssp_type = "exampleMar",    # Sound speed profile (m/s), set in "CAE_ssp" 
+    surface_type = "F",         # Categorical, set in "CEA_surfaceLevels"
+    scenario = "F",             # Categorical, set here and in "CEA_bathymetry"
+    ssp_type = "exampleMar",    # Sound speed profile (m/s), set in "CEA_ssp" 
     signalRange    = 2000,      # Range (m) to cutoff propagation
     frequency=69000,            # Frequency (Hz) of sound to model. 69 kHz for telemetry.
     nBeams = 1000,              # Number of beams to model. 1000 for basic models.
@@ -44,7 +41,8 @@ def createEnv(
     SBL = 0,                    # Surface bubble loss (SBL), capped at 15 dB. Calculated in UWAPL Handbook and McQuarrie et al 2025.
     detectionThreshold = 50,    # Det. threshold (dB) representing background noise. Range from 30 (very quiet) to 75 (extremely loud)
     deltaSS = 4,                # Strength of sound speed (m/s) stratification.
-    gradient_depth = 6          # Depth (m) of sound speed stratification.
+    gradient_depth = 6,         # Depth (m) of sound speed stratification.
+    surface_interp = "curvilinear"  # Surface interpolation: "curvilinear", or "linear" for cheap screening runs (see CEA_fidelity)
 ):
  
 #    Create an underwater environment with the given parameters.
@@ -61,17 +59,47 @@ def createEnv(
 #    Returns:
 #        Configured environment object.
 ###############
-# 
+# Geometry (bathymetry, surface, SSP) does not depend on frequency or the bottom's properties, so it is built
+# separately. CEA_multiFrequency builds it once and re-uses it for every frequency.
+    geometry = buildGeometry(surface_type=surface_type, scenario=scenario, signalRange=signalRange,
+                             tx_depth=tx_depth, rx_depth=rx_depth, deltaSS=deltaSS, gradient_depth=gradient_depth)
+    env = envFromGeometry(geometry, frequency=frequency, nBeams=nBeams, bottom_soundspeed=bottom_soundspeed,
+                          bottom_density=bottom_density, bottom_absorption=bottom_absorption,
+                          surface_interp=surface_interp)
+
+###########   
+# Surface bubble loss (SBL), used in CEA_Arrivals to estimate attenuation.
+# Some examples below, please see UWAPL Acoustics Handbook or McQuarrie et al 2025 for more explanation of calculation.
+#        SBL = 0 #dB Represents calm seas at 10deg angle
+#        SBL = 4.42 #dB Represents 6 m/s wind at 10deg angle
+#        SBL = 13.12 #dB Represents 12 m/s wind at 10deg angle
+    SBL = SBL
+    detectionThreshold = detectionThreshold
+
+    return env, geometry["topDescrip"], geometry["sspDescrip"], geometry["botDescrip"], geometry["bottom"], \
+        geometry["soundspeed"], geometry["signalRange"], SBL, geometry["tx_depth"], geometry["rx_depth"], detectionThreshold
+
+
+#################################################
+# Frequency-independent part of the environment: bathymetry, range, instrument depths, surface and SSP.
+def buildGeometry(
+    surface_type = "F",         # Categorical, set in "CEA_surfaceLevels"
+    scenario = "F",             # Categorical, set here and in "CEA_bathymetry"
+    signalRange = 2000,         # Range (m) to cutoff propagation
+    tx_depth = None,            # Depth (m) of transmitter
+    rx_depth = None,            # Depth (m) of receiver
+    deltaSS = 4,                # Strength of sound speed (m/s) stratification.
+    gradient_depth = 6          # Depth (m) of sound speed stratification.
+):
 # Generate dynamic SSP from deltaSS
-    soundspeed = build_stratified_ssp(deltaSS=deltaSS, gradient_depth=gradient_depth)
-    sspDescrip = f"Stratified (Δc = {deltaSS:.1f} m/s, z={gradient_depth}m)"
+    soundspeed, sspDescrip = buildSSP(deltaSS=deltaSS, gradient_depth=gradient_depth)
 ###########
 # Modeled scenarios,  given instrument depths, range, and bathymetry.
 # This is designed for McQuarrie's 6/2025 dissertation, but format should be intuitive.
 
     if scenario == "FS17toSTSNew1Flat":
         depth = 20
-        bottom = CAE_bathymetry.FS17toSTSNew1Flat(depth=depth)
+        bottom = CEA_bathymetry.FS17toSTSNew1Flat(depth=depth)
         botDescrip  = "FS17toSTSNew1Flat"
         signalRange = 668
         rx_range = signalRange
@@ -80,7 +108,7 @@ def createEnv(
         
     elif scenario == "FS17toSTSNew1Real":
         depth = 20
-        bottom = CAE_bathymetry.FS17toSTSNew1Real(depth=depth)
+        bottom = CEA_bathymetry.FS17toSTSNew1Real(depth=depth)
         botDescrip  = "FS17toSTSNew1Real"
         signalRange = 668
         rx_range = signalRange   
@@ -90,7 +118,7 @@ def createEnv(
     
     elif scenario == "STSNew1toFS17Flat":
         depth = 20
-        bottom = CAE_bathymetry.STSNew1toFS17Flat(depth=depth)
+        bottom = CEA_bathymetry.STSNew1toFS17Flat(depth=depth)
         botDescrip  = "STSNew1toFS17Flat"
         signalRange = 668
         rx_range = signalRange         
@@ -100,7 +128,7 @@ def createEnv(
 
     elif scenario == "STSNew1toFS17Real":
         depth = 20
-        bottom = CAE_bathymetry.STSNew1toFS17Real(depth=depth)
+        bottom = CEA_bathymetry.STSNew1toFS17Real(depth=depth)
         botDescrip  = "STSNew1toFS17Real"
         signalRange = 668
         rx_range = signalRange              
@@ -109,7 +137,7 @@ def createEnv(
         
     elif scenario == "STSNew1toFS17Linear":
         depth = 20
-        bottom = CAE_bathymetry.STSNew1toFS17Linear(depth=depth)
+        bottom = CEA_bathymetry.STSNew1toFS17Linear(depth=depth)
         botDescrip  = "STSNew1toFS17Linear"
         signalRange = 668
         rx_range = signalRange              
@@ -118,7 +146,7 @@ def createEnv(
 
     elif scenario == "FS17toSTSNew1Linear":
         depth = 20
-        bottom = CAE_bathymetry.FS17toSTSNew1Linear(depth=depth)
+        bottom = CEA_bathymetry.FS17toSTSNew1Linear(depth=depth)
         botDescrip  = "FS17toSTSNew1Linear" 
         signalRange = 668
         rx_range = signalRange 
@@ -128,7 +156,7 @@ def createEnv(
        
     elif scenario == "STSNew1toSURT20Flat":
         depth = 20
-        bottom = CAE_bathymetry.STSNew1toSURT20Flat(depth=depth)
+        bottom = CEA_bathymetry.STSNew1toSURT20Flat(depth=depth)
         botDescrip  = "STSNew1toSURT20Flat" 
         signalRange = 530
         rx_range = signalRange  
@@ -137,7 +165,7 @@ def createEnv(
 
     elif scenario == "STSNew1toSURT20Linear":
         depth = 20
-        bottom = CAE_bathymetry.STSNew1toSURT20Linear(depth=depth)
+        bottom = CEA_bathymetry.STSNew1toSURT20Linear(depth=depth)
         botDescrip  = "STSNew1toSURT20Linear" 
         signalRange = 530
         rx_range = signalRange    
@@ -146,7 +174,7 @@ def createEnv(
 
     elif scenario == "STSNew1toSURT20Real":
         depth = 20
-        bottom = CAE_bathymetry.STSNew1toSURT20Real(depth=depth)
+        bottom = CEA_bathymetry.STSNew1toSURT20Real(depth=depth)
         botDescrip  = "STSNew1toSURT20Real" 
         signalRange = 530
         rx_range = signalRange 
@@ -155,7 +183,7 @@ def createEnv(
 
     elif scenario == "SURT20toSTSNew1Flat":
         depth = 20
-        bottom = CAE_bathymetry.SURT20toSTSNew1Flat(depth=depth)
+        bottom = CEA_bathymetry.SURT20toSTSNew1Flat(depth=depth)
         botDescrip  = "SURT20toSTSNew1Flat" 
         signalRange = 530
         rx_range = signalRange 
@@ -164,7 +192,7 @@ def createEnv(
 
     elif scenario == "SURT20toSTSNew1Linear":
         depth = 20
-        bottom = CAE_bathymetry.SURT20toSTSNew1Linear(depth=depth)
+        bottom = CEA_bathymetry.SURT20toSTSNew1Linear(depth=depth)
         botDescrip  = "SURT20toSTSNew1Linear" 
         signalRange = 530
         rx_range = signalRange  
@@ -173,7 +201,7 @@ def createEnv(
 
     elif scenario == "SURT20toSTSNew1Real":
         depth = 20
-        bottom = CAE_bathymetry.SURT20toSTSNew1Real(depth=depth)
+        bottom = CEA_bathymetry.SURT20toSTSNew1Real(depth=depth)
         botDescrip  = "SURT20toSTSNew1Real" 
         signalRange = 530
         rx_range = signalRange 
@@ -182,7 +210,7 @@ def createEnv(
 
     elif scenario == "simple2k":
         depth = 20
-        bottom = CAE_bathymetry.simple2k(depth=depth)
+        bottom = CEA_bathymetry.simple2k(depth=depth)
         botDescrip = "Simplified"
         signalRange = 1999
         rx_range = signalRange
@@ -191,7 +219,7 @@ def createEnv(
         
     elif scenario == "simple1800":
         depth = 20
-        bottom = CAE_bathymetry.simple1800(depth=depth)
+        bottom = CEA_bathymetry.simple1800(depth=depth)
         botDescrip = "Simplified"
         signalRange = 1800
         rx_range = signalRange
@@ -199,55 +227,78 @@ def createEnv(
         tx_depth = tx_depth if tx_depth is not None else 15  
         
     else:
-        raise ValueError(f"Invalid scenario '{scenario}'. Must be a given scenarios. Check CAE_createEnv.")
+        raise ValueError(f"Invalid scenario '{scenario}'. Must be a given scenarios. Check CEA_createEnv.")
  
 ###########
 # Setting the surface types for the model. Builds a flat environment, little waves or big waves.
-# Done in CAE_surfaceLevels
+# Done in CEA_surfaceLevels
 
 ## Used for examples, 2 kilometers.        
     if surface_type == "flat_surface":
-        surface = CAE_surfaceLevels.flat_surface(signalRange)
+        surface = CEA_surfaceLevels.flat_surface(signalRange)
         topDescrip = "Flat"
     elif surface_type == "mid_waves":
-        surface = CAE_surfaceLevels.mid_waves(signalRange)
+        surface = CEA_surfaceLevels.mid_waves(signalRange)
         topDescrip = "Mid"
     elif surface_type == "rough_waves":
-        surface = CAE_surfaceLevels.rough_waves(signalRange)
+        surface = CEA_surfaceLevels.rough_waves(signalRange)
         topDescrip = "Rough"
 
     else:
        raise ValueError(f"Invalid surface_type '{surface_type}'. Must be a preset condition.")
 
-###########   
-# Surface bubble loss (SBL), used in CAE_Arrivals to estimate attenuation.
-# Some examples below, please see UWAPL Acoustics Handbook or McQuarrie et al 2025 for more explanation of calculation.
-#        SBL = 0 #dB Represents calm seas at 10deg angle
-#        SBL = 4.42 #dB Represents 6 m/s wind at 10deg angle
-#        SBL = 13.12 #dB Represents 12 m/s wind at 10deg angle
-    SBL = SBL,
-    detectionThreshold = detectionThreshold
-      
-###########    
+    return {
+        "bottom": bottom,
+        "surface": surface,
+        "soundspeed": soundspeed,
+        "topDescrip": topDescrip,
+        "sspDescrip": sspDescrip,
+        "botDescrip": botDescrip,
+        "signalRange": signalRange,
+        "rx_range": rx_range,
+        "tx_depth": tx_depth,
+        "rx_depth": rx_depth,
+    }
+
+
+# Stratified SSP and its description. Cheap, so it is rebuilt per run rather than shared (see CEA_sharedAssets).
+# depth_range and range_steps only need changing for transects deeper than 22 m or longer than 2100 m (CEA_arrayMode).
+def buildSSP(deltaSS=4, gradient_depth=6, depth_range=(0, 22), range_steps=(-10, 0, 2100)):
+    soundspeed = build_stratified_ssp(deltaSS=deltaSS, gradient_depth=gradient_depth, depth_range=depth_range,
+                                      range_steps=list(range_steps))
+    sspDescrip = f"Stratified (Δc = {deltaSS:.1f} m/s, z={gradient_depth}m)"
+    return soundspeed, sspDescrip
+
+
+#################################################
+# Puts a geometry together with the frequency and bottom properties to make the Bellhop environment.
+def envFromGeometry(
+    geometry,                   # From buildGeometry
+    frequency=69000,            # Frequency (Hz) of sound to model. 69 kHz for telemetry.
+    nBeams = 1000,              # Number of beams to model. 1000 for basic models.
+    bottom_soundspeed=1800,     # Sound speed (m/s) at the bottom
+    bottom_density=1600,        # Density (g/m^3) at the bottom
+    bottom_absorption=0,        # Bottom Absorption (dB/lambda) at the bottom, loss per wavelength
+    surface_interp='curvilinear'    # Surface interpolation between points; "linear" is cheaper (see CEA_fidelity)
+):
     # Create the environment
     env = pm.create_env2d(
         frequency=frequency,
-        rx_range=rx_range,
-        rx_depth=rx_depth,
-        depth=bottom,
-        soundspeed=soundspeed,
+        rx_range=geometry["rx_range"],
+        rx_depth=geometry["rx_depth"],
+        depth=geometry["bottom"],
+        soundspeed=geometry["soundspeed"],
         soundspeed_interp = "linear",        #Interpolates SSP linearly for the sound environment; highly advise this especially in shallow waters and using something like glider data. You don't want random curves introduced through spline fit.
         bottom_soundspeed=bottom_soundspeed,
         bottom_density=bottom_density,
         bottom_absorption=bottom_absorption,
-        tx_depth=tx_depth,
-        surface=surface,
-        surface_interp='curvilinear',
+        tx_depth=geometry["tx_depth"],
+        surface=geometry["surface"],
+        surface_interp=surface_interp,
         nbeams=nBeams,
         max_angle = 60,                     # Fan of the beam angles. Can be changed, -60 and 60 were chosen to balance coverage and efficiency.
         min_angle = -60
     )
 
-    return env, topDescrip, sspDescrip, botDescrip, bottom, soundspeed, signalRange, SBL, tx_depth, rx_depth, detectionThreshold
-
+    return env
 
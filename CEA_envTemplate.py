@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 23:24:37 2026
+Complex Environmental Acoustics (CEA) modeling.
+Frank McQuarrie, Skidaway Institute of Oceanography
+
+Purpose of script: Write Bellhop's input files without redoing the parts that never change within a group.
+arlpy writes every input file from scratch for every run, one system call per line. Within a scenario x surface
+group, though, the bathymetry (.bty) and surface (.ati, ~1300 lines) files are identical from run to run, and only
+the SSP and the bottom parameters in the .env file change. Here each group gets an EnvTemplate:
+    .bty/.ati   written once per group into the scratch folder, and hard-linked (or symlinked, or as a last resort
+                copied) to each run's file names.
+    .env        the unchanging lines are formatted once; each run only formats its SSP and bottom lines, and the
+                file is written in one go. The range-dependent SSP (.ssp) is written per run, in one go too.
+The files are byte-for-byte what arlpy would write. CEA_bellhop.writeInputs uses this for every run it can
+(anything but a tx_directionality beam pattern) and falls back to arlpy otherwise.
+
+Groups are recognized by content (a hash of the geometry, instruments and beams), so callers need not say which
+group a run belongs to. Solves hold their scratch folder's templates with templatesInUse; when the last one using
+the folder finishes (the end of a sweep), its templates and boundary files are cleared, so they do not pile up over
+many sweeps or surface ensembles. A run whose boundary file was cleared by another process writes it again.
+
+Scripts.
+CEA_automate : current. Runs and saves outputs from propagation modeling.
+CEA_singleExperiment: Run and save a specific model.
+
+CEA_createEnv: Creates an environment for Bellhop to model sound through.
+CEA_ssp: Sets a soundspeed profile. Currently set to create one given stratification strength and depth.
+CEA_surfaceLevels: defines surface waves for the environment.
+
+CEA_rayTracing: Traces (and can plot) sound pathways through the environment.
+CEA_arrivals: Measures signal strength and arrival timing for sound through the environment. Also adds initial power, and given a detection threshold, can define a ray as detectable or not.
+CEA_bellhop: Writes Bellhop input files, reads results back, and cleans up.
+******CEA_envTemplate: Writes each group's boundary files once and only the changing parts of each run's inputs.
+"""
+
+import os
+import glob
+import uuid
+import shutil
+import hashlib
+import threading
+from contextlib import contextmanager
+import numpy as np
+from CEA_lazy import lazyModule
+pd = lazyModule("pandas")  # Imported on first use (see CEA_lazy).
+
+# Env entries that are the same for every run of a group. Everything else (the SSP and bottom properties) is per run.
+GROUP_KEYS = ("name", "frequency", "soundspeed_interp", "surface", "surface_interp", "depth", "depth_interp",
+              "bottom_roughness", "tx_depth", "rx_depth", "rx_range", "min_angle", "max_angle", "nbeams")
+
+GROUP_PREFIX = "cea_group_"
+
+_templates = {}                 # (scratch folder, group key) -> EnvTemplate
+_users = {}                     # scratch folder -> solves holding its templates (templatesInUse)
+_lock = threading.Lock()
+
+#################################################
+
+class EnvTemplate:
+    """
+    The unchanging part of a group's Bellhop inputs. Made from any env of the group; write() then produces the
+    input files of any other env of the same group.
+    """
+
+    def __init__(self, env, folder, key=None):
+        self.key = key or groupKey(env)
+        self.folder = folder
+
+        # Boundary files, shared by every run of the group.
+        self.ati = None
+        if env["surface"] is not None:
+            self.ati = os.path.join(folder, f"{GROUP_PREFIX}{self.key}.ati")
+            _writeShared(self.ati, _boundaryText(env["surface"], env["surface_interp"]))
+        self.bty = None
+        if np.size(env["depth"]) > 1:
+            self.bty = os.path.join(folder, f"{GROUP_PREFIX}{self.key}.bty")
+            _writeShared(self.bty, _boundaryText(env["depth"], env["depth_interp"]))
+
+        # .env lines that do not depend on the SSP or the bottom.
+        self.head = f"'{env['name']}'\n{env['frequency']:0.6f}\n1\n"
+        self.receivers = _arrayText(env["tx_depth"]) + _arrayText(env["rx_depth"]) + _arrayText(env["rx_range"] / 1000)
+        self.beams = "%d\n%0.6f %0.6f /\n" % (env["nbeams"], env["min_angle"], env["max_angle"])
+        self.top_option = "'%cVWT'\n" if self.ati is None else "'%cVWT*'\n"
+        self.bottom_option = ("'A' " if self.bty is None else "'A*' ") + f"{env['bottom_roughness']:0.6f}\n"
+        self.spline = env["soundspeed_interp"] == "spline"
+        self.depth = env["depth"] if self.bty is None else None
+        self.bathymetry_max = None if self.bty is None else np.max(env["depth"][:, 1])
+        self.max_range_km = 1.01 * np.max(env["rx_range"]) / 1000
+
+    def write(self, env, taskcode, fname_base):
+        """Write the input files of env (which must belong to this group) under fname_base."""
+        svp = env["soundspeed"]
+        svp_depth = 0.0
+        svp_interp = "S" if self.spline else "C"
+        if isinstance(svp, pd.DataFrame):
+            svp_depth = svp.index[-1]
+            if len(svp.columns) > 1:
+                svp_interp = "Q"
+            else:
+                svp = np.hstack((np.array([svp.index]).T, np.asarray(svp)))
+        max_depth = self.depth if self.bty is None else max(self.bathymetry_max, svp_depth)
+
+        parts = [self.head, self.top_option % svp_interp, f"1 0.0 {max_depth:0.6f}\n"]
+        if np.size(svp) == 1:
+            parts.append(f"0.0 {svp:0.6f} /\n{max_depth:0.6f} {svp:0.6f} /\n")
+        elif svp_interp == "Q":
+            parts.extend(f"{d:0.6f} {c:0.6f} /\n" for d, c in zip(svp.index, svp.iloc[:, 0]))
+            _writeText(fname_base + ".ssp", _sspText(svp))
+        else:
+            parts.extend(f"{d:0.6f} {c:0.6f} /\n" for d, c in zip(svp[:, 0], svp[:, 1]))
+        parts.append(self.bottom_option)
+        parts.append(f"{max_depth:0.6f} {env['bottom_soundspeed']:0.6f} 0.0 "
+                     f"{env['bottom_density'] / 1000:0.6f} {env['bottom_absorption']:0.6f} /\n")
+        parts.append(self.receivers)
+        parts.append(f"'{taskcode}'\n")
+        parts.append(self.beams)
+        parts.append(f"0.0 {1.01 * max_depth:0.6f} {self.max_range_km:0.6f}\n")
+        _writeText(fname_base + ".env", "".join(parts))
+
+        if self.ati is not None:
+            _linkShared(self.ati, fname_base + ".ati", env["surface"], env["surface_interp"])
+        if self.bty is not None:
+            _linkShared(self.bty, fname_base + ".bty", env["depth"], env["depth_interp"])
+        return fname_base
+
+
+def supported(env):
+    """Whether an env can be written from a template (beam patterns are left to arlpy)."""
+    return env["tx_directionality"] is None
+
+
+def groupKey(env):
+    """Hash of the env entries shared by a group. Envs with equal keys can share a template."""
+    h = hashlib.blake2b(digest_size=10)
+    for k in GROUP_KEYS:
+        value = np.asarray(env[k]) if env[k] is not None else None
+        if value is not None and value.dtype.kind in "iuf":
+            h.update(repr(value.shape).encode())
+            h.update(np.ascontiguousarray(value, dtype=float).tobytes())
+        else:
+            h.update(repr(env[k]).encode())
+        h.update(b"|")
+    return h.hexdigest()
+
+
+def templateFor(env, folder):
+    """The template of env's group in folder, made (and its boundary files written) the first time it is needed."""
+    key = groupKey(env)
+    with _lock:
+        template = _templates.get((folder, key))
+        if template is None:
+            template = _templates[(folder, key)] = EnvTemplate(env, folder, key)
+    return template
+
+
+def clearTemplates(folder=None):
+    """Forget the templates (of one scratch folder, or all) and remove their shared boundary files."""
+    with _lock:
+        for f, key in [k for k in _templates if folder is None or k[0] == folder]:
+            del _templates[(f, key)]
+            for path in glob.glob(os.path.join(f, f"{GROUP_PREFIX}{key}.*")):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass                # Another process sharing the folder got there first.
+
+
+@contextmanager
+def templatesInUse(folder):
+    """
+    Keep folder's templates while the block runs. Blocks may nest or overlap (threads, several sweeps); when the
+    last one ends, the folder's templates are cleared.
+    """
+    with _lock:
+        _users[folder] = _users.get(folder, 0) + 1
+    try:
+        yield
+    finally:
+        with _lock:
+            _users[folder] -= 1
+            last = _users[folder] == 0
+            if last:
+                del _users[folder]
+        if last:
+            clearTemplates(folder)
+
+#################################################
+# File writing. Same number formats as arlpy's writers.
+
+def _boundaryText(points, interp):
+    lines = [f"'{'C' if interp == 'curvilinear' else 'L'}'", str(points.shape[0])]
+    lines.extend(f"{r / 1000:0.6f} {z:0.6f}" for r, z in points)
+    return "\n".join(lines) + "\n"
+
+
+def _sspText(svp):
+    values = svp.to_numpy()
+    lines = [str(svp.shape[1]), " ".join(f"{r / 1000:0.6f}" for r in svp.columns)]
+    lines.extend(" ".join(f"{c:0.6f}" for c in row) for row in values)
+    return "\n".join(lines) + "\n"
+
+
+def _arrayText(a):
+    if np.size(a) == 1:
+        return f"1\n{float(a):0.6f} /\n"
+    return f"{np.size(a)}\n" + "".join(f"{x:0.6f} " for x in a) + "/\n"
+
+
+def _writeText(path, text):
+    with open(path, "w", newline="\n") as fh:
+        fh.write(text)
+
+
+def _writeShared(path, text):
+    """Write a group file once. Written under a temporary name and renamed, as other workers may share the folder."""
+    if os.path.exists(path):
+        return
+    tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+    _writeText(tmp, text)
+    os.replace(tmp, path)
+
+
+def _linkShared(src, dst, points, interp):
+    """Link a group file to a run's name, writing it again if it has been cleared (by another process)."""
+    try:
+        _link(src, dst)
+    except FileNotFoundError:
+        _writeShared(src, _boundaryText(points, interp))
+        _link(src, dst)
+
+
+def _link(src, dst):
+    """Give a run its own name for a shared file: hard link, else symlink, else a copy."""
+    try:
+        os.link(src, dst)
+    except FileNotFoundError:
+        raise
+    except OSError:
+        try:
+            os.symlink(src, dst)
+        except OSError:
+            shutil.copyfile(src, dst)
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 23:59:52 2026
+Complex Environmental Acoustics (CEA) modeling.
+Frank McQuarrie, Skidaway Institute of Oceanography
+
+Purpose of script: Cheap solves first, full solves only where they can change the answer.
+Every sweep row used to get the same 1000-beam, curvilinear-surface Bellhop run, even rows whose outcome is obvious
+(a calm, quiet day where every arrival is detectable; a 75 dB threshold with 15 dB SBL where none is). Fidelity tiers
+are tried in order:
+    screen   100 beams, straight-line surface interpolation, and the surface simplified to the fewest points within
+             10 cm. Roughly ten times cheaper than a full solve.
+    full     the usual 1000 beams and curvilinear surface.
+A row's result is kept at the first tier where its detectable fraction falls outside that tier's escalation band,
+i.e. where it is clearly (nearly) all detectable or all undetectable. Otherwise it is solved again at the next tier.
+The last tier's result is always kept. Rows whose screen found no arrivals at all are escalated too. Each result
+records the tier that produced it (the Fidelity column of modelOutputs). Arrival counts grow with the number of beams,
+so a kept screen result's counts are scaled to the last tier's beams (countScale); fractions and levels are unchanged.
+
+CEA_automate's fidelity_tiers picks the tiers: SCREEN_THEN_FULL, or (FULL,) (the default) for every row at full
+fidelity, as before.
+
+Scripts.
+CEA_automate : current. Runs and saves outputs from propagation modeling.
+CEA_singleExperiment: Run and save a specific model.
+
+CEA_createEnv: Creates an environment for Bellhop to model sound through.
+CEA_ssp: Sets a soundspeed profile. Currently set to create one given stratification strength and depth.
+CEA_surfaceLevels: defines surface waves for the environment.
+
+CEA_rayTracing: Traces (and can plot) sound pathways through the environment.
+CEA_arrivals: Measures signal strength and arrival timing for sound through the environment. Also adds initial power, and given a detection threshold, can define a ray as detectable or not.
+******CEA_fidelity: Solve tiers (cheap screen, then full Bellhop) and when a row is escalated from one to the next.
+"""
+
+import math
+from dataclasses import dataclass
+from CEA_createEnv import createEnv, envFromGeometry
+from CEA_bathymetryGrid import simplifyProfile
+
+
+@dataclass(frozen=True)
+class FidelityTier:
+    name: str                           # Recorded with each result this tier produces
+    nBeams: int = 1000
+    surface_interp: str = "curvilinear"
+    surface_tolerance: float = 0.0      # (m) Simplify the surface to within this; 0 keeps every point.
+    escalation_band: tuple = None       # (low, high) detectable fractions that go on to the next tier
+
+    def escalates(self, detectable_fraction):
+        """Whether a result at this tier should be solved again at the next one."""
+        if self.escalation_band is None:
+            return False
+        if detectable_fraction is None or math.isnan(detectable_fraction):
+            return True
+        low, high = self.escalation_band
+        return low <= detectable_fraction <= high
+
+
+SCREEN = FidelityTier("screen", nBeams=100, surface_interp="linear", surface_tolerance=0.1,
+                      escalation_band=(0.05, 0.95))
+FULL = FidelityTier("full")
+
+SCREEN_THEN_FULL = (SCREEN, FULL)
+
+#################################################
+
+def createTierEnv(tier, **kwargs):
+    """createEnv (same arguments and return values) at the tier's beams, surface interpolation and simplification."""
+    outputs = createEnv(nBeams=tier.nBeams, surface_interp=tier.surface_interp, **kwargs)
+    _simplifySurface(tier, outputs[0])
+    return outputs
+
+
+def tierEnvFromGeometry(tier, geometry, **kwargs):
+    """envFromGeometry at the tier's beams, surface interpolation and simplification (e.g. for shared geometries)."""
+    env = envFromGeometry(geometry, nBeams=tier.nBeams, surface_interp=tier.surface_interp, **kwargs)
+    _simplifySurface(tier, env)
+    return env
+
+
+def _simplifySurface(tier, env):
+    if tier.surface_tolerance > 0 and env["surface"] is not None:
+        env["surface"] = simplifyProfile(env["surface"], tier.surface_tolerance)
+
+
+def countScale(tier, tiers):
+    """Factor that puts arrival counts from tier on the scale of the last of tiers (the ratio of their beams)."""
+    return tiers[-1].nBeams / tier.nBeams
+
+
+def checkTiers(tiers):
+    """Tiers must be non-empty, with unique names, and the last one must keep every result."""
+    if not tiers:
+        raise ValueError("At least one fidelity tier is needed.")
+    if len({t.name for t in tiers}) != len(tiers):
+        raise ValueError(f"Fidelity tier names must be unique: {[t.name for t in tiers]}.")
+    if tiers[-1].escalation_band is not None:
+        raise ValueError(f"The last tier ('{tiers[-1].name}') has nowhere to escalate to; give it no escalation_band.")
+    return tuple(tiers)
@@ -0,0 +1,233 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 09:12:40 2026
+Complex Environmental Acoustics (CEA) modeling.
+Frank McQuarrie, Skidaway Institute of Oceanography
+
+Purpose of script: Headless, batched rendering of ray and arrival diagnostics. Sweeps stash the ray/arrival data
+for a sampled subset of runs, and figures are drawn with matplotlib's Agg backend in a separate process, so visual QA
+does not slow down the solve loop or need a display.
+
+Scripts.
+CEA_automate : current. Runs and saves outputs from propagation modeling.
+CEA_singleExperiment: Run and save a specific model.
+
+CEA_createEnv: Creates an environment for Bellhop to model sound through.
+CEA_ssp: Sets a soundspeed profile. Currently set to create one given stratification strength and depth.
+CEA_surfaceLevels: defines surface waves for the environment.
+
+CEA_rayTracing: Traces (and can plot) sound pathways through the environment.
+CEA_arrivals: Measures signal strength and arrival timing for sound through the environment. Also adds initial power, and given a detection threshold, can define a ray as detectable or not.
+******CEA_gallery: Stashes diagnostics from sampled runs and renders them (PNG/SVG) into a gallery folder.
+
+Can also be run on its own to (re)render everything already stashed:
+    python CEA_gallery.py <stash_dir> <gallery_dir> --format png svg --workers 4
+"""
+
+import os
+import pickle
+import random
+import argparse
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+# Columns kept from the arrivals table. Everything else is dropped so stashes stay small.
+ARRIVAL_COLUMNS = ["time_of_arrival", "angle_of_arrival", "surface_bounces", "bottom_bounces", "low_power_dB"]
+
+#################################################
+# STASHING: cheap, done inside the solve loop.
+
+def stashRun(stash_dir, run_id, arrivals=None, rays=None, env=None, meta=None):
+    """
+    Save the data needed to draw one run's diagnostics. Returns the path of the stash file.
+    """
+    os.makedirs(stash_dir, exist_ok=True)
+
+    record = {"run_id": run_id, "meta": dict(meta or {})}
+
+    if arrivals is not None:
+        keep = [c for c in ARRIVAL_COLUMNS if c in arrivals.columns]
+        record["arrivals"] = {c: arrivals[c].to_numpy() for c in keep}
+
+    # Rays are stored as plain arrays (range, depth) plus their bounce counts, no pandas needed to draw them.
+    if rays is not None:
+        record["rays"] = [np.asarray(r, dtype=np.float32) for r in rays["ray"]]
+        record["ray_surface_bounces"] = rays["surface_bounces"].to_numpy() if "surface_bounces" in rays else None
+        record["ray_bottom_bounces"] = rays["bottom_bounces"].to_numpy() if "bottom_bounces" in rays else None
+
+    # Boundaries for context behind the rays.
+    if env is not None:
+        record["bottom"] = np.asarray(env["depth"])
+        record["surface"] = None if env.get("surface") is None else np.asarray(env["surface"])
+        record["tx_depth"] = env.get("tx_depth")
+        record["rx_depth"] = env.get("rx_depth")
+        record["rx_range"] = env.get("rx_range")
+
+    path = os.path.join(stash_dir, f"{run_id}.pkl")
+    with open(path, "wb") as fh:
+        pickle.dump(record, fh, protocol=pickle.HIGHEST_PROTOCOL)
+    return path
+
+
+#################################################
+# RENDERING: done off the solve loop, in a worker process.
+
+def renderRun(stash_path, gallery_dir, formats=("png",), dpi=110):
+    """
+    Draw one stashed run (rays on the left, arrivals on the right) and save it in each requested format.
+    """
+    # Agg has to be selected before pyplot is imported; this runs in the worker so the parent's backend is untouched.
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    with open(stash_path, "rb") as fh:
+        record = pickle.load(fh)
+    meta = record["meta"]
+    run_id = record["run_id"]
+
+    fig, (ax_rays, ax_arr) = plt.subplots(1, 2, figsize=(13, 4.5), gridspec_kw={"width_ratios": [3, 2]})
+
+# Ray plot. Colored by bottom bounces: direct paths dark, heavily bottom-interacting paths pale.
+    rays = record.get("rays")
+    if rays:
+        bottom_bounces = record.get("ray_bottom_bounces")
+        max_bb = max(1, int(np.max(bottom_bounces))) if bottom_bounces is not None else 1
+        cmap = plt.get_cmap("viridis")
+        for k, ray in enumerate(rays):
+            shade = 0.0 if bottom_bounces is None else bottom_bounces[k] / max_bb
+            ax_rays.plot(ray[:, 0], ray[:, 1], color=cmap(shade), linewidth=0.4, alpha=0.6)
+    else:
+        ax_rays.text(0.5, 0.5, "No rays stashed", transform=ax_rays.transAxes, ha="center")
+
+    if record.get("bottom") is not None and np.size(record["bottom"]) > 1:
+        ax_rays.plot(record["bottom"][:, 0], record["bottom"][:, 1], color="saddlebrown", linewidth=2)
+    if record.get("surface") is not None:
+        ax_rays.plot(record["surface"][:, 0], record["surface"][:, 1], color="steelblue", linewidth=1)
+    if record.get("rx_range") is not None:
+        ax_rays.plot([0], [record["tx_depth"]], "r^")
+        ax_rays.plot([record["rx_range"]], [record["rx_depth"]], "ks")
+    ax_rays.invert_yaxis()
+    ax_rays.set_xlabel("Range (m)")
+    ax_rays.set_ylabel("Depth (m)")
+    ax_rays.set_title(f"Rays: {meta.get('topDescrip', '')}, {meta.get('botDescrip', '')}", fontsize=9)
+
+# Arrival plot. Received level (dB) against time, with the detection threshold.
+    arrivals = record.get("arrivals")
+    if arrivals and "low_power_dB" in arrivals:
+        t = arrivals["time_of_arrival"]
+        dB = arrivals["low_power_dB"]
+        ax_arr.vlines(t, ymin=np.minimum(dB.min(), 0), ymax=dB, color="0.4", linewidth=0.6)
+        ax_arr.plot(t, dB, "o", markersize=2, color="k")
+    else:
+        ax_arr.text(0.5, 0.5, "No arrivals stashed", transform=ax_arr.transAxes, ha="center")
+    if meta.get("detectionThreshold") is not None:
+        ax_arr.axhline(y=meta["detectionThreshold"], color="r", linestyle="--", label="Detection Threshold")
+        ax_arr.legend(loc="upper right", fontsize=8)
+    ax_arr.set_xlabel("Time of arrival (s)")
+    ax_arr.set_ylabel("Signal Strength (dB)")
+    ax_arr.set_title(f"Arrivals: {meta.get('sspDescrip', '')}, SBL {meta.get('SBL', '')} dB", fontsize=9)
+
+    fig.suptitle(run_id, fontsize=10)
+    fig.tight_layout()
+
+    os.makedirs(gallery_dir, exist_ok=True)
+    saved = []
+    for fmt in formats:
+        path = os.path.join(gallery_dir, f"{run_id}.{fmt}")
+        fig.savefig(path, dpi=dpi)
+        saved.append(path)
+    plt.close(fig)
+    return saved
+
+
+def renderGallery(stash_dir, gallery_dir, formats=("png",), max_workers=None, skip_existing=True):
+    """
+    Batch-render every stashed run in stash_dir, in parallel. Already rendered runs are skipped.
+    """
+    stashes = sorted(f for f in os.listdir(stash_dir) if f.endswith(".pkl"))
+    todo = []
+    for f in stashes:
+        run_id = f[:-4]
+        done = all(os.path.exists(os.path.join(gallery_dir, f"{run_id}.{fmt}")) for fmt in formats)
+        if not (skip_existing and done):
+            todo.append(os.path.join(stash_dir, f))
+
+    saved = []
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = [pool.submit(renderRun, path, gallery_dir, tuple(formats)) for path in todo]
+        for fut in futures:
+            try:
+                saved.extend(fut.result())
+            except Exception as e:
+                print(f" Gallery render failed: {e}")
+    return saved
+
+
+#################################################
+# USED INSIDE A SWEEP
+# Samples runs, stashes them, and hands rendering to a background process. The solve loop never waits on a figure.
+
+class GalleryRenderer:
+    def __init__(self, stash_dir, gallery_dir, sample_fraction=0.01, formats=("png",), max_workers=1, seed=None):
+        self.stash_dir = stash_dir
+        self.gallery_dir = gallery_dir
+        self.sample_fraction = sample_fraction
+        self.formats = tuple(formats)
+        self._rng = random.Random(seed)
+        self._pool = ProcessPoolExecutor(max_workers=max_workers) if sample_fraction > 0 else None
+        self._futures = []
+        self.failed = []
+
+    def sample(self):
+        """Decide whether the current run goes in the gallery."""
+        return self._pool is not None and self._rng.random() < self.sample_fraction
+
+    def submit(self, run_id, arrivals=None, rays=None, env=None, meta=None):
+        path = stashRun(self.stash_dir, run_id, arrivals=arrivals, rays=rays, env=env, meta=meta)
+        future = self._pool.submit(renderRun, path, self.gallery_dir, self.formats)
+        future.run_id = run_id
+        self._futures.append(future)
+        # Drop finished futures so a long sweep does not hold on to them, but report any that failed first.
+        self._collect()
+        return path
+
+    def _collect(self):
+        """Check finished renders, report the ones that failed, and keep only those still running."""
+        pending = []
+        for fut in self._futures:
+            if not fut.done():
+                pending.append(fut)
+                continue
+            try:
+                fut.result()
+            except Exception as e:
+                print(f" Gallery render failed for {fut.run_id}: {e}")
+                self.failed.append((fut.run_id, e))
+        self._futures = pending
+
+    def close(self, wait=True):
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait)
+            self._pool = None
+            self._collect()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close(wait=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Render stashed CEA diagnostics into a gallery.")
+    parser.add_argument("stash_dir")
+    parser.add_argument("gallery_dir")
+    parser.add_argument("--format", nargs="+", default=["png"], choices=["png", "svg"])
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--force", action="store_true", help="Re-render runs that already have figures.")
+    args = parser.parse_args()
+
+    saved = renderGallery(args.stash_dir, args.gallery_dir, formats=args.format,
+                          max_workers=args.workers, skip_existing=not args.force)
+    print(f"Rendered {len(saved)} figures into {args.gallery_dir}")
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 18:47:30 2026
+Complex Environmental Acoustics (CEA) modeling.
+Frank McQuarrie, Skidaway Institute of Oceanography
+
+Purpose of script: Keep start-up fast by only importing the heavy libraries when they are first used.
+pandas, scipy.stats, matplotlib and arlpy.uwapm (which brings in Bokeh and matplotlib with it) take a couple of
+seconds to import between them. Most runs only need some of them, and short jobs (a worker, a merge, a status check)
+may need none, so the CEA modules import them through lazyModule:
+    pd = lazyModule("pandas")       # nothing is imported here
+    pd.DataFrame(...)               # pandas is imported now, once; afterwards pd is plain pandas
+
+Set the environment variable CEA_EAGER_IMPORTS=1 to import everything up front as before (e.g. to compare start-up
+times with CEA_startupBenchmark, or to surface a missing dependency at start-up rather than mid-run).
+
+Scripts.
+CEA_automate : current. Runs and saves outputs from propagation modeling.
+CEA_singleExperiment: Run and save a specific model.
+
+CEA_createEnv: Creates an environment for Bellhop to model sound through.
+CEA_ssp: Sets a soundspeed profile. Currently set to create one given stratification strength and depth.
+CEA_surfaceLevels: defines surface waves for the environment.
+
+CEA_rayTracing: Traces (and can plot) sound pathways through the environment.
+CEA_arrivals: Measures signal strength and arrival timing for sound through the environment. Also adds initial power, and given a detection threshold, can define a ray as detectable or not.
+******CEA_lazy: Imports heavy libraries on first use instead of at start-up.
+"""
+
+import os
+import sys
+import types
+import importlib
+
+EAGER_IMPORTS = os.environ.get("CEA_EAGER_IMPORTS", "0") not in ("", "0")
+
+
+class _LazyModule(types.ModuleType):
+    """
+    Stands in for a module until one of its attributes is used. Then the real module is imported (through the normal
+    import system, so it is cached in sys.modules and shared) and its attributes are copied onto this object, so
+    later lookups are ordinary attribute lookups with no extra cost.
+    """
+
+    def __init__(self, name):
+        super().__init__(name)
+        self.__dict__["_lazy_loaded"] = False
+
+    def __getattr__(self, attr):
+        # Only called for attributes not found normally: before loading, or later for anything the module itself
+        # resolves on demand (its own __getattr__), which is passed straight through.
+        module = importlib.import_module(self.__name__)
+        if not self.__dict__["_lazy_loaded"]:
+            self.__dict__.update(module.__dict__)
+            self.__dict__["_lazy_loaded"] = True
+        return getattr(module, attr)
+
+    def __dir__(self):
+        return dir(importlib.import_module(self.__name__))
+
+    def __repr__(self):
+        state = "loaded" if self.__dict__["_lazy_loaded"] else "not loaded yet"
+        return f"<lazy module '{self.__name__}' ({state})>"
+
+
+def lazyModule(name):
+    """
+    Module name, imported the first time it is used. Already-imported modules are returned as they are.
+    """
+    if EAGER_IMPORTS or name in sys.modules:
+        return importlib.import_module(name)
+    return _LazyModule(name)
+
+
+def isLoaded(name):
+    """True once the real module has been imported (by anyone)."""
+    return name in sys.modules
@@ -0,0 +1,308 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 22:58:14 2026
+Complex Environmental Acoustics (CEA) modeling.
+Frank McQuarrie, Skidaway Institute of Oceanography
+
+Purpose of script: Answer "will FS17 hear STSNew1 tonight?" in well under a millisecond, from tables built once offline.
+For each scenario x surface, the builder solves every point of a grid over
+    SBL x detectionThreshold x deltaSS x gradient_depth x bottom_absorption
+and saves the outputs as N-D arrays (.npy, memory-mapped when read). A query interpolates between the grid points
+(multilinear), so it costs the same whatever the table size, and needs neither Bellhop nor pandas.
+
+Building is cheaper than the grid size suggests. SBL and the threshold are only applied after Bellhop, so each
+deltaSS x gradient_depth x bottom_absorption point is solved once (and points Bellhop cannot tell apart share a solve,
+see CEA_canonical); the SBL x threshold slice is then computed from its arrivals in one go, exactly as
+processArrivals would for each pair.
+The SSP only changes at its 2 m grid depths (CEA_ssp), so gradient_depth is looked up as a step (the grid depth at or
+below it), not interpolated. Values outside the grid are clamped to its edges.
+
+Outputs, and the axes each depends on:
+    Detectable_Fraction     all five
+    Avg_Signal_dB           not detectionThreshold
+    N_Arrivals              deltaSS, gradient_depth, bottom_absorption
+
+Scripts.
+CEA_automate : current. Runs and saves outputs from propagation modeling.
+CEA_singleExperiment: Run and save a specific model.
+
+CEA_createEnv: Creates an environment for Bellhop to model sound through.
+CEA_ssp: Sets a soundspeed profile. Currently set to create one given stratification strength and depth.
+CEA_surfaceLevels: defines surface waves for the environment.
+
+CEA_rayTracing: Traces (and can plot) sound pathways through the environment.
+CEA_arrivals: Measures signal strength and arrival timing for sound through the environment. Also adds initial power, and given a detection threshold, can define a ray as detectable or not.
+******CEA_lookupTables: Precomputed N-D detectability tables per scenario x surface, with fast interpolated queries.
+
+Usage:
+    python CEA_lookupTables.py build <folder> [--scenarios ...] [--surfaces ...] [--concurrency N]
+    python CEA_lookupTables.py query <folder> <scenario> <surface> SBL=8 detectionThreshold=55 deltaSS=4 gradient_depth=6 bottom_absorption=1
+"""
+
+import os
+import json
+import argparse
+import datetime
+import itertools
+import numpy as np
+
+# Grid axes, in the order of the table dimensions.
+AXES = ("SBL", "detectionThreshold", "deltaSS", "gradient_depth", "bottom_absorption")
+
+# Default grid of each axis. Covers CEA_automate's param_bounds; gradient_depth at every SSP grid depth in them.
+GRIDS = {
+    "SBL": np.arange(0, 16, 1.0),                   # dB
+    "detectionThreshold": np.arange(30, 76, 1.0),   # dB
+    "deltaSS": np.arange(0, 11, 1.0),               # m/s
+    "gradient_depth": np.arange(4, 13, 2.0),        # m
+    "bottom_absorption": np.arange(0, 5.5, 0.5),    # dB/lambda
+}
+
+# Axes looked up as steps (the grid value at or below the query) instead of interpolated.
+STEP_AXES = ("gradient_depth",)
+
+# Outputs saved, and the axes each depends on.
+OUTPUTS = {
+    "Detectable_Fraction": AXES,
+    "Avg_Signal_dB": ("SBL", "deltaSS", "gradient_depth", "bottom_absorption"),
+    "N_Arrivals": ("deltaSS", "gradient_depth", "bottom_absorption"),
+}
+
+MANIFEST = "table.json"
+
+#################################################
+# QUERYING
+
+class LookupTable:
+    """
+    The tables of one scenario x surface. Opening one only reads its small manifest; the arrays are memory-mapped.
+    """
+
+    def __init__(self, folder):
+        self.folder = folder
+        with open(os.path.join(folder, MANIFEST)) as fh:
+            self.manifest = json.load(fh)
+        self.scenario = self.manifest["scenario"]
+        self.surface = self.manifest["surface"]
+        self.grids = {name: np.asarray(values, dtype=float) for name, values in self.manifest["grids"].items()}
+        self.outputs = {name: tuple(axes) for name, axes in self.manifest["outputs"].items()}
+        self._arrays = {name: np.load(os.path.join(folder, f"{name}.npy"), mmap_mode="r") for name in self.outputs}
+
+    def query(self, output="Detectable_Fraction", **conditions):
+        """
+        Interpolated value of one output. Conditions are given by axis name, as numbers or arrays (broadcast
+        together, for many queries at once); ones the output does not depend on are ignored.
+        """
+        if output not in self.outputs:
+            raise ValueError(f"Invalid output '{output}'. Must be one of {list(self.outputs)}.")
+        axes = self.outputs[output]
+        missing = [a for a in axes if a not in conditions]
+        if missing:
+            raise ValueError(f"{output} needs values for {missing}.")
+        return interpolate(self._arrays[output], [self.grids[a] for a in axes], [conditions[a] for a in axes],
+                           step=[a in STEP_AXES for a in axes])
+
+    def detectability(self, **conditions):
+        """Every output for one set of conditions, as {output: value}."""
+        return {name: self.query(name, **conditions) for name in self.outputs}
+
+    def __repr__(self):
+        shape = " x ".join(str(len(self.grids[a])) for a in AXES)
+        return f"LookupTable({self.scenario}, {self.surface}, {shape})"
+
+
+def interpolate(values, grids, points, step=None):
+    """
+    Multilinear interpolation of an N-D array on a rectilinear grid. points holds one value (or array) per axis;
+    points outside the grid are clamped to its edges. Axes flagged in step take the grid value at or below the point.
+    Returns a float for scalar points, else an array of their broadcast shape.
+    """
+    step = step or [False] * len(grids)
+    points = np.broadcast_arrays(*[np.asarray(p, dtype=float) for p in points])
+    shape = points[0].shape
+
+    # Lower corner and fractional position along each axis.
+    lower, fraction = [], []
+    for grid, p, is_step in zip(grids, points, step):
+        p = np.clip(p.ravel(), grid[0], grid[-1])
+        if len(grid) == 1:
+            i = np.zeros(p.shape, dtype=np.intp)
+            f = np.zeros(p.shape)
+        else:
+            i = np.clip(np.searchsorted(grid, p, side="right") - 1, 0, len(grid) - 2)
+            f = (p - grid[i]) / (grid[i + 1] - grid[i])
+            if is_step:
+                f = (f >= 1).astype(float)      # Only the top edge of the grid reaches the upper value.
+        lower.append(i)
+        fraction.append(f)
+
+    # One point: read the 2 x 2 x ... block around it in one slice, and blend it down one axis at a time.
+    if shape == ():
+        block = np.asarray(values[tuple(slice(int(i[0]), int(i[0]) + 2) for i in lower)], dtype=float)
+        for f in fraction:
+            f = f[0]
+            if block.shape[0] == 1 or f == 0:
+                block = block[0]
+            elif f == 1:
+                block = block[1]
+            else:
+                block = block[0] * (1 - f) + block[1] * f
+        return float(block)
+
+    # Weighted sum over the 2^N corners around each point. Corners with no weight are skipped, so a missing
+    # (nan) grid value only matters next to the points that actually use it.
+    result = np.zeros(lower[0].shape)
+    for corner in itertools.product((0, 1), repeat=len(grids)):
+        weight = np.ones(result.shape)
+        index = []
+        for c, i, f, grid in zip(corner, lower, fraction, grids):
+            weight *= f if c else 1 - f
+            index.append(np.minimum(i + c, len(grid) - 1))
+        used = weight > 0
+        if used.any():
+            result[used] += weight[used] * values[tuple(ix[used] for ix in index)]
+
+    return result.reshape(shape)
+
+
+def tableName(scenario, surface):
+    return f"{scenario}__{surface}"
+
+
+def openTables(folder):
+    """Every table built in folder, as {(scenario, surface): LookupTable}."""
+    tables = {}
+    for name in sorted(os.listdir(folder)):
+        if os.path.exists(os.path.join(folder, name, MANIFEST)):
+            table = LookupTable(os.path.join(folder, name))
+            tables[(table.scenario, table.surface)] = table
+    return tables
+
+#################################################
+# BUILDING
+
+def tabulateArrivals(arrivals, sbl_grid, threshold_grid, low_power_SL=142):
+    """Detectable fraction (SBL x threshold) and average signal (SBL) of one solve's arrivals, for every grid value."""
+    from CEA_arrivals import arrivalLevels, clippedLevels  # Only needed to build, like buildTable's imports.
+    n = len(arrivals)
+    if n == 0:
+        return np.full((len(sbl_grid), len(threshold_grid)), np.nan), np.full(len(sbl_grid), np.nan), 0
+
+    # One row of levels per SBL value.
+    low_power_dB = arrivalLevels(arrivals["arrival_amplitude"], arrivals["surface_bounces"],
+                                 np.asarray(sbl_grid, dtype=float)[:, None], low_power_SL)
+    avg_low_dB = low_power_dB.mean(axis=1)
+    clipped = np.sort(clippedLevels(low_power_dB), axis=1)
+    # Arrivals at or above each threshold: everything from the first sorted value >= threshold on.
+    detectable = np.stack([n - np.searchsorted(row, threshold_grid, side="left") for row in clipped])
+    return detectable / n, avg_low_dB, n
+
+
+def buildTable(scenario, surface, folder, grids=GRIDS, low_power_SL=142, concurrency=None, timeout=600, retries=1,
+               context=None):
+    """
+    Solve the grid for one scenario x surface and save its table in folder/<scenario>__<surface>.
+    Grid points whose solve failed are nan. Returns the opened LookupTable.
+    """
+    # Only needed to build, so querying never imports them (or pandas/arlpy through them).
+    from CEA_createEnv import createEnv
+    from CEA_asyncRunner import runJobs
+    from CEA_canonical import groupPlan, paramsFromKey
+
+    grids = {a: np.asarray(grids[a], dtype=float) for a in AXES}
+    shape = tuple(len(grids[a]) for a in AXES)
+    tables = {name: np.full(tuple(shape[AXES.index(a)] for a in axes), np.nan, dtype=np.float32)
+              for name, axes in OUTPUTS.items()}
+
+    # One row per environment grid point; rows Bellhop cannot tell apart share one solve.
+    cells = list(itertools.product(*(range(len(grids[a])) for a in AXES[2:])))
+    rows = [{"scenario": scenario, "surface": surface,
+             **{a: grids[a][i] for a, i in zip(AXES[2:], cell)}} for cell in cells]
+    groups = groupPlan(rows)
+    print(f">>> {scenario} x {surface}: {len(rows)} grid points need {len(groups)} Bellhop solves")
+
+    def jobs():
+        for key in groups:
+            params = paramsFromKey(key)
+            try:
+                env = createEnv(surface_type=surface, scenario=scenario, bottom_absorption=params["bottom_absorption"],
+                                deltaSS=params["deltaSS"], gradient_depth=params["gradient_depth"])[0]
+            except Exception as e:
+                print(f" SKIPPING environment {key} (createEnv error): {e}")
+                continue
+            yield key, env
+
+    n_solved = 0
+
+    def on_result(key, arrivals, error):
+        nonlocal n_solved
+        if error is not None:
+            print(f" SKIPPING environment {key} (Bellhop error): {error}")
+            return
+        fraction, avg_low_dB, n = tabulateArrivals(arrivals, grids["SBL"], grids["detectionThreshold"], low_power_SL)
+        for i in groups[key]:
+            d, g, b = cells[i]
+            tables["Detectable_Fraction"][:, :, d, g, b] = fraction
+            tables["Avg_Signal_dB"][:, d, g, b] = avg_low_dB
+            tables["N_Arrivals"][d, g, b] = n
+        n_solved += 1
+
+    runJobs(jobs(), on_result, concurrency=concurrency, timeout=timeout, retries=retries, context=context)
+
+    # The manifest is written last, so a half-written table is never opened.
+    path = os.path.join(folder, tableName(scenario, surface))
+    if os.path.exists(os.path.join(path, MANIFEST)):
+        os.remove(os.path.join(path, MANIFEST))
+    os.makedirs(path, exist_ok=True)
+    for name, table in tables.items():
+        np.save(os.path.join(path, f"{name}.npy"), table)
+    manifest = {
+        "scenario": scenario,
+        "surface": surface,
+        "grids": {a: grids[a].tolist() for a in AXES},
+        "outputs": {name: list(axes) for name, axes in OUTPUTS.items()},
+        "low_power_SL": low_power_SL,
+        "n_solves": len(groups),
+        "n_failed": len(groups) - n_solved,
+        "built": datetime.datetime.now().isoformat(timespec="seconds"),
+    }
+    tmp = os.path.join(path, MANIFEST + ".tmp")
+    with open(tmp, "w") as fh:
+        json.dump(manifest, fh, indent=1)
+    os.replace(tmp, os.path.join(path, MANIFEST))
+    print(f" SAVED {path} ({len(groups) - n_solved} failed solves)")
+    return LookupTable(path)
+
+
+def buildTables(scenarios, surface_types, folder, grids=GRIDS, **solve_kwargs):
+    """buildTable for every scenario x surface. Returns {(scenario, surface): LookupTable}."""
+    return {(scenario, surface): buildTable(scenario, surface, folder, grids, **solve_kwargs)
+            for scenario in scenarios for surface in surface_types}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or query detectability lookup tables.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("build", help="Solve the grids and save the tables.")
+    p.add_argument("folder")
+    p.add_argument("--scenarios", nargs="+", help="Default: every scenario in CEA_automate.")
+    p.add_argument("--surfaces", nargs="+", help="Default: every surface type in CEA_automate.")
+    p.add_argument("--concurrency", type=int)
+
+    p = sub.add_parser("query", help="Look up one set of conditions.")
+    p.add_argument("folder")
+    p.add_argument("scenario")
+    p.add_argument("surface")
+    p.add_argument("conditions", nargs="+", help="axis=value, e.g. SBL=8")
+
+    args = parser.parse_args()
+    if args.command == "build":
+        import CEA_automate
+        buildTables(args.scenarios or CEA_automate.scenarios, args.surfaces or CEA_automate.surface_types,
+                    args.folder, concurrency=args.concurrency, context=CEA_automate.run_context)
+    else:
+        conditions = {k: float(v) for k, v in (c.split("=", 1) for c in args.conditions)}
+        table = LookupTable(os.path.join(args.folder, tableName(args.scenario, args.surface)))
+        for name, value in table.detectability(**conditions).items():
+            print(f"{name:>20}: {value:.4g}")
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 15:02:31 2026
+Complex Environmental Acoustics (CEA) modeling.
+Frank McQuarrie, Skidaway Institute of Oceanography
+
+Purpose of script: Model one environment at several frequencies at once, e.g. 69 vs 180 kHz tags, or a band around
+69 kHz for band-averaged loss. The geometry (bathymetry, surface, SSP) is built once and shared; only the frequency
+changes between solves, and those solves run in parallel through CEA_asyncRunner.
+Output is one table: a row per frequency plus a "broadband" row averaged across them.
+
+Scripts.
+CEA_automate : current. Runs and saves outputs from propagation modeling.
+CEA_singleExperiment: Run and save a specific model.
+
+CEA_createEnv: Creates an environment for Bellhop to model sound through.
+CEA_ssp: Sets a soundspeed profile. Currently set to create one given stratification strength and depth.
+CEA_surfaceLevels: defines surface waves for the environment.
+
+CEA_rayTracing: Traces (and can plot) sound pathways through the environment.
+CEA_arrivals: Measures signal strength and arrival timing for sound through the environment. Also adds initial power, and given a detection threshold, can define a ray as detectable or not.
+******CEA_multiFrequency: Solves one geometry over a list of frequencies and averages across the band.
+"""
+
+import numpy as np
+from CEA_lazy import lazyModule
+from CEA_createEnv import buildGeometry, envFromGeometry
+from CEA_arrivals import processArrivals
+from CEA_asyncRunner import runJobs
+
+pd = lazyModule("pandas")  # Imported on first use (see CEA_lazy).
+
+
+def runFrequencyBand(
+    frequencies,                # List of frequencies (Hz). e.g. [69000, 180000] or np.linspace(63000, 75000, 7)
+    surface_type = "flat_surface",
+    scenario = "STSNew1toFS17Real",
+    SBL = 0,                    # Surface bubble loss (dB)
+    detectionThreshold = 50,    # Det. threshold (dB) representing background noise.
+    deltaSS = 4,                # Strength of sound speed (m/s) stratification.
+    gradient_depth = 6,         # Depth (m) of sound speed stratification.
+    nBeams = 1000,
+    bottom_soundspeed = 1800,
+    bottom_density = 1600,
+    bottom_absorption = 0,
+    source_levels = None,       # Optional {frequency: source level (dB)}. Defaults to the 142 dB low power VR2 source.
+    concurrency = None,         # Bellhop processes at once; defaults to one per core.
+    timeout = 600,
+    retries = 1,
+    context = None              # RunContext: Bellhop's location and scratch folder (see CEA_runContext).
+):
+    """
+    Solve one environment at every frequency. Returns a DataFrame with one row per frequency and a broadband row.
+    """
+    # Everything that does not depend on frequency is built once.
+    geometry = buildGeometry(surface_type=surface_type, scenario=scenario, deltaSS=deltaSS,
+                             gradient_depth=gradient_depth)
+
+    def jobs():
+        for f in frequencies:
+            yield float(f), envFromGeometry(geometry, frequency=f, nBeams=nBeams,
+                                            bottom_soundspeed=bottom_soundspeed, bottom_density=bottom_density,
+                                            bottom_absorption=bottom_absorption)
+
+    rows = {}
+
+    def on_result(f, arrivals, error):
+        if error is not None:
+            print(f" SKIPPING {f:.0f} Hz (Bellhop error): {error}")
+            return
+        SL = (source_levels or {}).get(f, 142)
+        arrivals, binned_countsLow, low_power_dB_hist, confidence_interval, \
+        X_detectable, Y_undetectable, avg_low_dB, ci_lower_lp, ci_upper_lp, \
+        nonBottomArrivals = processArrivals(arrivals, detectionThreshold, SBL, low_power_SL=SL)
+        n = X_detectable + Y_undetectable
+        rows[f] = {
+            "Frequency_Hz": f,
+            "Detectable": int(X_detectable),
+            "Undetectable": int(Y_undetectable),
+            "Detectable_Fraction": X_detectable / n if n else np.nan,
+            "Avg_Signal_dB": avg_low_dB,
+            "CI_Lower_dB": ci_lower_lp,
+            "CI_Upper_dB": ci_upper_lp,
+            "NonBottom_Arrivals": int(nonBottomArrivals),
+        }
+
+    runJobs(jobs(), on_result, concurrency=concurrency, timeout=timeout, retries=retries, context=context)
+
+    results = pd.DataFrame([rows[f] for f in sorted(rows)])
+    if results.empty:
+        return results
+
+# Broadband row. Signal levels are averaged as power, not in dB; fractions and counts are plain means.
+    broadband = {
+        "Frequency_Hz": "broadband",
+        "Detectable": results["Detectable"].mean(),
+        "Undetectable": results["Undetectable"].mean(),
+        "Detectable_Fraction": results["Detectable_Fraction"].mean(),
+        "Avg_Signal_dB": 10 * np.log10(np.mean(10 ** (results["Avg_Signal_dB"] / 10))),
+        "CI_Lower_dB": np.nan,
+        "CI_Upper_dB": np.nan,
+        "NonBottom_Arrivals": results["NonBottom_Arrivals"].mean(),
+    }
+    results = pd.concat([results, pd.DataFrame([broadband])], ignore_index=True)
+
+    # Same environment on every row, so the table can be saved or stacked with other runs as-is.
+    results.insert(0, "Scenario", scenario)
+    results.insert(1, "topDescrip", geometry["topDescrip"])
+    results.insert(2, "SBL", SBL)
+    results.insert(3, "deltaSS", deltaSS)
+    results.insert(4, "gradient_depth", gradient_depth)
+    results.insert(5, "Detection_Threshold", detectionThreshold)
+    results.insert(6, "Bottom_Absorption", bottom_absorption)
+    return results
+
+
+if __name__ == "__main__":
+    # 69 kHz vs 180 kHz tags, same water.
+    results = runFrequencyBand([69000, 180000], surface_type="mid_waves", scenario="STSNew1toFS17Real",
+                               SBL=4.42, detectionThreshold=50)
+    print(results)
@@ -0,0 +1,343 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 19:58:05 2026
+Complex Environmental Acoustics (CEA) modeling.
+Frank McQuarrie, Skidaway Institute of Oceanography
+
+Purpose of script: Sweep-level statistics that update as each run finishes, instead of reloading the whole
+modelOutputs CSV into pandas afterwards. Nothing here keeps the individual runs:
+    RunningStats        count, mean, variance (Welford), min and max of one value, with a t confidence interval.
+    HistogramSketch     counts in fixed dB bins (the binned_countsLow bins), summed over runs, with approximate quantiles.
+    GroupedAccumulator  one set of the above per group of sweep parameters, e.g. per scenario x surface.
+Every one of them can be merged with another (Chan et al.'s parallel update for the variance), so workers or nodes
+can each keep their own and combine them at the end, or at any time. They save to / load from small JSON files,
+so a running sweep can write a snapshot that is read from another process while it runs.
+
+Scripts.
+CEA_automate : current. Runs and saves outputs from propagation modeling.
+CEA_singleExperiment: Run and save a specific model.
+
+CEA_createEnv: Creates an environment for Bellhop to model sound through.
+CEA_ssp: Sets a soundspeed profile. Currently set to create one given stratification strength and depth.
+CEA_surfaceLevels: defines surface waves for the environment.
+
+CEA_rayTracing: Traces (and can plot) sound pathways through the environment.
+CEA_arrivals: Measures signal strength and arrival timing for sound through the environment. Also adds initial power, and given a detection threshold, can define a ray as detectable or not.
+******CEA_onlineStats: Mergeable running statistics and histograms for sweep outputs, updated as runs finish.
+
+Usage:
+    python CEA_onlineStats.py <snapshot.json> [<snapshot.json> ...]      (merge and print snapshots)
+"""
+
+import os
+import json
+import math
+import argparse
+import numpy as np
+from CEA_lazy import lazyModule
+# Imported on first use (see CEA_lazy).
+pd = lazyModule("pandas")
+st = lazyModule("scipy.stats")
+
+# dB bin edges of binned_countsLow in CEA_arrivals.processArrivals.
+DB_BINS = np.arange(0, 100, 10)
+
+# Per-run outputs tracked by default, and the sweep parameters they are grouped by.
+DEFAULT_METRICS = ("Avg_Signal_dB", "Detectable_Fraction")
+DEFAULT_GROUP_BY = ("scenario", "surface")
+
+#################################################
+
+class RunningStats:
+    """
+    Count, mean and variance of a stream of values, one pass, no values kept. NaNs are ignored.
+    """
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0          # Sum of squared differences from the mean
+        self.min = math.inf
+        self.max = -math.inf
+
+    def update(self, x):
+        """Add one value (Welford's update)."""
+        x = float(x)
+        if math.isnan(x):
+            return
+        self.n += 1
+        delta = x - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (x - self.mean)
+        self.min = min(self.min, x)
+        self.max = max(self.max, x)
+
+    def updateMany(self, values):
+        """Add an array of values at once, e.g. every arrival of one run."""
+        values = np.asarray(values, dtype=float).ravel()
+        values = values[~np.isnan(values)]
+        if len(values):
+            batch = RunningStats()
+            batch.n = len(values)
+            batch.mean = float(values.mean())
+            batch.m2 = float(((values - batch.mean) ** 2).sum())
+            batch.min = float(values.min())
+            batch.max = float(values.max())
+            self.merge(batch)
+
+    @classmethod
+    def fromValues(cls, values):
+        stats = cls()
+        stats.updateMany(values)
+        return stats
+
+    def merge(self, other):
+        """Combine with stats kept elsewhere (another worker or node). Exact, in any order."""
+        if other.n == 0:
+            return self
+        if self.n == 0:
+            self.n, self.mean, self.m2, self.min, self.max = other.n, other.mean, other.m2, other.min, other.max
+            return self
+        n = self.n + other.n
+        delta = other.mean - self.mean
+        self.mean += delta * other.n / n
+        self.m2 += other.m2 + delta ** 2 * self.n * other.n / n
+        self.n = n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    @property
+    def variance(self):
+        return self.m2 / (self.n - 1) if self.n > 1 else math.nan
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance) if self.n > 1 else math.nan
+
+    @property
+    def sem(self):
+        return self.std / math.sqrt(self.n) if self.n > 1 else math.nan
+
+    def ci(self, confidence=0.95):
+        """t confidence interval of the mean, as in processArrivals. (nan, nan) until there are two values."""
+        if self.n < 2:
+            return (math.nan, math.nan)
+        margin = st.t.ppf(1 - (1 - confidence) / 2, self.n - 1) * self.sem
+        return (self.mean - margin, self.mean + margin)
+
+    def halfWidth(self, confidence=0.95):
+        """Half the width of the confidence interval."""
+        lower, upper = self.ci(confidence)
+        return (upper - lower) / 2
+
+    def toDict(self):
+        return {"n": self.n, "mean": self.mean, "m2": self.m2,
+                "min": self.min if self.n else None, "max": self.max if self.n else None}
+
+    @classmethod
+    def fromDict(cls, d):
+        stats = cls()
+        stats.n, stats.mean, stats.m2 = d["n"], d["mean"], d["m2"]
+        stats.min = d["min"] if d["min"] is not None else math.inf
+        stats.max = d["max"] if d["max"] is not None else -math.inf
+        return stats
+
+    def __repr__(self):
+        return f"RunningStats(n={self.n}, mean={self.mean:.3f}, std={self.std:.3f})"
+
+
+class HistogramSketch:
+    """
+    Counts in fixed bins, summed over runs. Bins are right-closed with the first one including its left edge,
+    like pd.cut(..., include_lowest=True) in processArrivals; values outside the edges are not counted.
+    """
+
+    def __init__(self, edges=DB_BINS):
+        self.edges = np.asarray(edges, dtype=float)
+        self.counts = np.zeros(len(self.edges) - 1, dtype=np.int64)
+
+    def add(self, binned_counts):
+        """Add one run's binned counts (binned_countsLow from processArrivals, or an array of counts)."""
+        counts = binned_counts.to_numpy() if hasattr(binned_counts, "to_numpy") else np.asarray(binned_counts)
+        if len(counts) != len(self.counts):
+            raise ValueError(f"Expected {len(self.counts)} bins, got {len(counts)}.")
+        self.counts += counts.astype(np.int64)
+
+    def addValues(self, values):
+        """Bin raw values (e.g. the clipped low_power_dB of every arrival) and add them."""
+        values = np.asarray(values, dtype=float).ravel()
+        idx = np.searchsorted(self.edges, values, side="left") - 1
+        idx[values == self.edges[0]] = 0
+        inside = (idx >= 0) & (idx < len(self.counts))
+        self.counts += np.bincount(idx[inside], minlength=len(self.counts))
+
+    def merge(self, other):
+        if not np.array_equal(self.edges, other.edges):
+            raise ValueError("Histograms with different bins cannot be merged.")
+        self.counts += other.counts
+        return self
+
+    @property
+    def total(self):
+        return int(self.counts.sum())
+
+    @property
+    def centers(self):
+        return (self.edges[:-1] + self.edges[1:]) / 2
+
+    def quantile(self, q):
+        """Approximate quantile, assuming values are spread evenly within each bin."""
+        if self.total == 0:
+            return math.nan
+        cumulative = np.concatenate([[0], np.cumsum(self.counts)]) / self.total
+        return float(np.interp(q, cumulative, self.edges))
+
+    def toDict(self):
+        return {"edges": self.edges.tolist(), "counts": self.counts.tolist()}
+
+    @classmethod
+    def fromDict(cls, d):
+        sketch = cls(d["edges"])
+        sketch.counts = np.asarray(d["counts"], dtype=np.int64)
+        return sketch
+
+
+#################################################
+
+class GroupedAccumulator:
+    """
+    RunningStats of each metric, and a HistogramSketch of the binned counts, for every group of sweep parameters.
+    Update it from each finished run; query it at any time with table().
+    """
+
+    def __init__(self, by=DEFAULT_GROUP_BY, metrics=DEFAULT_METRICS, edges=DB_BINS):
+        self.by = tuple(by)
+        self.metrics = tuple(metrics)
+        self.edges = np.asarray(edges, dtype=float)
+        self.groups = {}        # group key -> {"stats": {metric: RunningStats}, "hist": HistogramSketch, "runs": n}
+        self.n_updates = 0
+
+    def _group(self, key):
+        if key not in self.groups:
+            self.groups[key] = {"stats": {m: RunningStats() for m in self.metrics}, "hist": HistogramSketch(self.edges),
+                                "runs": 0}
+        return self.groups[key]
+
+    def keyFor(self, row):
+        return tuple(row[k] for k in self.by)
+
+    def update(self, row, outputs, binned_counts=None):
+        """
+        Add one run. row holds the sweep parameters (at least those in `by`), outputs the run's metric values;
+        metrics missing from outputs are skipped. binned_counts is the run's binned_countsLow, if any.
+        The run counts toward the group's runs even when its metrics are NaN (e.g. a run with no arrivals).
+        """
+        group = self._group(self.keyFor(row))
+        group["runs"] += 1
+        for metric in self.metrics:
+            if metric in outputs:
+                group["stats"][metric].update(outputs[metric])
+        if binned_counts is not None:
+            group["hist"].add(binned_counts)
+        self.n_updates += 1
+
+    def runs(self, key):
+        """Runs added to this group, including those whose metrics were all NaN."""
+        return self.groups[tuple(key)]["runs"]
+
+    def stats(self, key, metric):
+        return self.groups[tuple(key)]["stats"][metric]
+
+    def histogram(self, key):
+        return self.groups[tuple(key)]["hist"]
+
+    def merge(self, other):
+        """Combine with an accumulator from another worker or node (same grouping and metrics)."""
+        if other.by != self.by or other.metrics != self.metrics:
+            raise ValueError("Accumulators with different groupings or metrics cannot be merged.")
+        for key, theirs in other.groups.items():
+            ours = self._group(key)
+            for metric in self.metrics:
+                ours["stats"][metric].merge(theirs["stats"][metric])
+            ours["hist"].merge(theirs["hist"])
+            ours["runs"] += theirs["runs"]
+        self.n_updates += other.n_updates
+        return self
+
+    def table(self, confidence=0.95):
+        """One row per group: n, mean, std and confidence interval of each metric, plus the median dB from the histogram."""
+        rows = []
+        for key, group in self.groups.items():
+            row = dict(zip(self.by, key))
+            row["Runs"] = group["runs"]
+            for metric, s in group["stats"].items():
+                lower, upper = s.ci(confidence)
+                row.update({f"{metric}_n": s.n, f"{metric}_mean": s.mean if s.n else math.nan, f"{metric}_std": s.std,
+                            f"{metric}_ci_lower": lower, f"{metric}_ci_upper": upper})
+            row["Arrivals_binned"] = group["hist"].total
+            row["Median_Arrival_dB"] = group["hist"].quantile(0.5)
+            rows.append(row)
+        return pd.DataFrame(rows)
+
+    #################################################
+    # Snapshots
+
+    def toDict(self):
+        return {
+            "by": list(self.by),
+            "metrics": list(self.metrics),
+            "edges": self.edges.tolist(),
+            "n_updates": self.n_updates,
+            "groups": [{"key": list(key),
+                        "stats": {m: s.toDict() for m, s in g["stats"].items()},
+                        "hist": g["hist"].toDict(), "runs": g["runs"]} for key, g in self.groups.items()],
+        }
+
+    @classmethod
+    def fromDict(cls, d):
+        acc = cls(by=d["by"], metrics=d["metrics"], edges=d["edges"])
+        acc.n_updates = d["n_updates"]
+        for g in d["groups"]:
+            stats = {m: RunningStats.fromDict(s) for m, s in g["stats"].items()}
+            # Snapshots from before runs were counted: the most values any metric has.
+            runs = g.get("runs", max((s.n for s in stats.values()), default=0))
+            acc.groups[tuple(g["key"])] = {"stats": stats, "hist": HistogramSketch.fromDict(g["hist"]), "runs": runs}
+        return acc
+
+    def save(self, path):
+        """Write a snapshot. Written to a temporary file and renamed, so a reader never sees half a file."""
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as fh:
+            json.dump(self.toDict(), fh, default=_jsonDefault)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as fh:
+            return cls.fromDict(json.load(fh))
+
+
+def _jsonDefault(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def mergeSnapshots(paths):
+    """Load and merge snapshots written by several workers or nodes."""
+    merged = None
+    for path in paths:
+        acc = GroupedAccumulator.load(path)
+        merged = acc if merged is None else merged.merge(acc)
+    return merged
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Merge and print sweep statistics snapshots.")
+    parser.add_argument("snapshots", nargs="+")
+    args = parser.parse_args()
+
+    merged = mergeSnapshots(args.snapshots)
+    print(f"{merged.n_updates} runs in {len(merged.groups)} groups")
+    print(merged.table().to_string(index=False))
@@ -0,0 +1,268 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 00:00:31 2026
+Complex Environmental Acoustics (CEA) modeling.
+Frank McQuarrie, Skidaway Institute of Oceanography
+
+Purpose of script: Find a broken sweep configuration before it runs, not hours into it.
+A typo in a scenario name, an SSP that does not reach the bottom or a transect whose bathymetry stops short used to
+show up only when the sweep reached that row, as a createEnv ValueError or a Bellhop error. The dry run here
+takes the full sample plan and, without running Bellhop:
+    rows          checks every row's parameters: scenario and surface are strings, the rest finite numbers,
+                  inside param_bounds.
+    environments  builds every distinct environment (one per canonical group, see CEA_canonical, at every fidelity
+                  tier, see CEA_fidelity), several processes at once, and checks what Bellhop needs:
+                      ranges strictly increasing (bathymetry, surface, SSP depths and SSP ranges)
+                      surface and bathymetry reaching the receiver, and signalRange + 5 m
+                      the SSP spanning the highest wave crest to the deepest point, and Bellhop's box in range
+                      (out to 1.01 x rx_range)
+                      transmitter and receiver in the water column
+    estimate      the number of Bellhop solves and the wall time they will take. With screening tiers it is a range:
+                  from every row settled by the first tier, to every row escalated to the last.
+Problems are errors (the run would fail, or give wrong results) or warnings (it runs, but check it); e.g. bathymetry
+or a surface ending short of signalRange + 5 m is a warning, as Bellhop keeps the last depth beyond it. Each problem
+is reported once, with the surfaces, tiers and rows it affects. CEA_automate runs this before its sweep and stops
+on errors (preflight_first).
+
+Scripts.
+CEA_automate : current. Runs and saves outputs from propagation modeling.
+CEA_singleExperiment: Run and save a specific model.
+
+CEA_createEnv: Creates an environment for Bellhop to model sound through.
+CEA_ssp: Sets a soundspeed profile. Currently set to create one given stratification strength and depth.
+CEA_surfaceLevels: defines surface waves for the environment.
+
+CEA_rayTracing: Traces (and can plot) sound pathways through the environment.
+CEA_arrivals: Measures signal strength and arrival timing for sound through the environment. Also adds initial power, and given a detection threshold, can define a ray as detectable or not.
+CEA_fidelity: Solve tiers (cheap screen, then full Bellhop) and when a row is escalated from one to the next.
+******CEA_preflight: Dry run of a sweep: checks every row and environment without Bellhop, and estimates the cost.
+
+Usage:
+    python CEA_preflight.py [--iterations 1000] [--screen] [--seconds-per-solve 20] [--workers 8]
+"""
+
+import os
+import math
+import numbers
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from CEA_lazy import lazyModule
+from CEA_canonical import groupPlan, paramsFromKey
+from CEA_fidelity import FULL, createTierEnv, checkTiers
+pd = lazyModule("pandas")  # Imported on first use (see CEA_lazy).
+
+SOLVE_SECONDS = 20          # (s) One full-fidelity (1000 beam) solve. Time one of yours and pass it in.
+SURFACE_MARGIN = 5          # (m) Surfaces are built to signalRange + 5 m (CEA_surfaceLevels).
+BOX_FACTOR = 1.01           # Bellhop's box reaches 1.01 x the furthest receiver (as written to the .env file).
+
+NUMERIC_PARAMS = ("bottom_absorption", "SBL", "detectionThreshold", "deltaSS", "gradient_depth")
+TEXT_PARAMS = ("scenario", "surface")
+
+PROBLEM_COLUMNS = ["severity", "scenario", "surfaces", "tiers", "rows", "problem"]
+
+#################################################
+# Checks. Each returns a list of (severity, message).
+
+def checkRow(row, param_bounds=None):
+    """Parameter types (and bounds, if given) of one plan row."""
+    problems = []
+    for name in TEXT_PARAMS:
+        if not isinstance(row.get(name), str):
+            problems.append(("error", f"{name} is {row.get(name)!r}, not a name"))
+    for name in NUMERIC_PARAMS:
+        value = row.get(name)
+        if isinstance(value, bool) or not isinstance(value, numbers.Real) or not math.isfinite(value):
+            problems.append(("error", f"{name} is {value!r}, not a finite number"))
+        elif param_bounds and name in param_bounds:
+            low, high = param_bounds[name]
+            if not low <= value <= high:
+                problems.append(("warning", f"{name} = {value} is outside its bounds ({low}, {high})"))
+    return problems
+
+
+def _increasing(values):
+    return bool(np.all(np.diff(np.asarray(values, dtype=float)) > 0))
+
+
+def checkEnv(env, signalRange):
+    """What Bellhop needs of a built environment (and what it would silently work around)."""
+    problems = []
+    rx_range = float(np.max(env["rx_range"]))
+    box = BOX_FACTOR * rx_range
+    wanted = signalRange + SURFACE_MARGIN
+
+    def coverage(name, end):
+        if end < rx_range:
+            return [("error", f"{name} ends at {end:g} m, before the receiver ({rx_range:g} m)")]
+        if end < wanted:
+            return [("warning", f"{name} ends at {end:g} m, short of signalRange + {SURFACE_MARGIN} ({wanted:g} m); "
+                                f"Bellhop keeps its last depth beyond it")]
+        return []
+
+    bottom = np.asarray(env["depth"], dtype=float)
+    if bottom.ndim == 2:
+        if not _increasing(bottom[:, 0]):
+            problems.append(("error", "bathymetry ranges are not strictly increasing"))
+        problems.extend(coverage("bathymetry", bottom[-1, 0]))
+        deepest = bottom[:, 1].max()
+        bottom_at = lambda r: np.interp(r, bottom[:, 0], bottom[:, 1])
+    else:
+        deepest = float(bottom)
+        bottom_at = lambda r: deepest
+
+    surface = env["surface"]
+    crest = 0.0
+    if surface is not None:
+        surface = np.asarray(surface, dtype=float)
+        crest = min(0.0, surface[:, 1].min())
+        if not _increasing(surface[:, 0]):
+            problems.append(("error", "surface ranges are not strictly increasing"))
+        problems.extend(coverage("surface", surface[-1, 0]))
+        if bottom.ndim == 2 and np.any(surface[:, 1] >= bottom_at(surface[:, 0])):
+            problems.append(("error", "surface reaches the bottom"))
+
+    ssp = env["soundspeed"]
+    if isinstance(ssp, pd.DataFrame):
+        depths = np.asarray(ssp.index, dtype=float)
+        if not _increasing(depths):
+            problems.append(("error", "SSP depths are not strictly increasing"))
+        if depths[0] > crest:
+            problems.append(("error", f"SSP starts at {depths[0]:g} m, below the highest wave crest ({crest:g} m)"))
+        if depths[-1] < deepest:
+            problems.append(("error", f"SSP ends at {depths[-1]:g} m, above the deepest point ({deepest:g} m)"))
+        if len(ssp.columns) > 1:
+            ranges = np.asarray(ssp.columns, dtype=float)
+            if not _increasing(ranges):
+                problems.append(("error", "SSP ranges are not strictly increasing"))
+            if ranges[0] > 0 or ranges[-1] < box:
+                problems.append(("error", f"SSP covers {ranges[0]:g} to {ranges[-1]:g} m in range, not the whole "
+                                          f"box (0 to {box:g} m)"))
+        if not np.all(np.isfinite(ssp.to_numpy(dtype=float))):
+            problems.append(("error", "SSP has missing sound speeds"))
+
+    for name, depth, at in (("transmitter", env["tx_depth"], 0.0), ("receiver", env["rx_depth"], rx_range)):
+        depth = float(np.max(depth))
+        if not 0 < depth < bottom_at(at):
+            problems.append(("error", f"{name} at {depth:g} m is outside the water column "
+                                      f"(0 to {float(bottom_at(at)):g} m)"))
+    return problems
+
+
+def checkGroup(key, tiers):
+    """Build one canonical group's environment at every tier and check it. Runs in a worker process."""
+    params = paramsFromKey(key)
+    problems = []
+    for tier in tiers:
+        try:
+            outputs = createTierEnv(tier, surface_type=params["surface"], scenario=params["scenario"],
+                                    bottom_absorption=params["bottom_absorption"], deltaSS=params["deltaSS"],
+                                    gradient_depth=params["gradient_depth"])
+        except Exception as e:
+            problems.append((tier.name, "error", f"createEnv failed: {type(e).__name__}: {e}"))
+            continue
+        env, signalRange = outputs[0], outputs[6]
+        problems.extend((tier.name, severity, message) for severity, message in checkEnv(env, signalRange))
+    return key, problems
+
+#################################################
+
+def preflight(plan, tiers=(FULL,), param_bounds=None, concurrency=None, seconds_per_solve=SOLVE_SECONDS,
+              workers=None, verbose=True):
+    """
+    Dry run of plan. Returns (summary, problems): a dict with the counts and cost estimate, and a table with one row
+    per problem found (deduplicated over rows that share an environment).
+    concurrency is the number of Bellhop processes the sweep will run at once, for the wall time estimate.
+    workers is the number of processes used to build the environments here (1 builds them in this process).
+    """
+    tiers = checkTiers(tiers)
+    concurrency = concurrency or os.cpu_count()
+    records = []
+
+    valid = []
+    for i, row in enumerate(plan):
+        row_problems = checkRow(row, param_bounds)
+        for severity, message in row_problems:
+            records.append([severity, row.get("scenario"), row.get("surface"), "", [i], message])
+        if not any(severity == "error" for severity, _ in row_problems):
+            valid.append(i)
+
+    groups = groupPlan([plan[i] for i in valid])
+    groups = {key: [valid[j] for j in rows] for key, rows in groups.items()}
+    keys = list(groups)
+    if workers == 1 or len(keys) < 2:
+        results = [checkGroup(key, tiers) for key in keys]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(checkGroup, keys, [tiers] * len(keys),
+                                    chunksize=max(1, len(keys) // (4 * (workers or os.cpu_count())))))
+    broken = set()
+    for key, group_problems in results:
+        params = paramsFromKey(key)
+        for tier_name, severity, message in group_problems:
+            records.append([severity, params["scenario"], params["surface"], tier_name, groups[key], message])
+            if severity == "error":
+                broken.add(key)
+
+    # One line per distinct problem of a scenario, with every surface, tier and row it affects.
+    problems = pd.DataFrame(records, columns=PROBLEM_COLUMNS)
+    if len(problems):
+        joined = lambda values: ", ".join(str(v) for v in dict.fromkeys(values) if v != "")
+        problems["scenario"] = problems["scenario"].astype(str)
+        problems = (problems.groupby(["severity", "scenario", "problem"], sort=False)
+                    .agg(surfaces=("surfaces", joined), tiers=("tiers", joined),
+                         rows=("rows", lambda rows: sorted(set(sum(rows, [])))))
+                    .reset_index()[PROBLEM_COLUMNS])
+        problems = problems.sort_values("severity", kind="stable", ignore_index=True)
+
+    # Cost: every group at the first tier; at most every group again at each later tier. Solve time scales with beams.
+    solves = len(groups) - len(broken)
+    per_tier = [solves * seconds_per_solve * tier.nBeams / FULL.nBeams for tier in tiers]
+    summary = {
+        "rows": len(plan),
+        "valid_rows": len(valid) - sum(len(groups[k]) for k in broken),
+        "min_solves": solves,
+        "max_solves": solves * len(tiers),
+        "errors": int((problems["severity"] == "error").sum()) if len(problems) else 0,
+        "warnings": int((problems["severity"] == "warning").sum()) if len(problems) else 0,
+        "min_wall_s": per_tier[0] / concurrency,
+        "max_wall_s": sum(per_tier) / concurrency,
+    }
+    if verbose:
+        printReport(summary, problems, concurrency)
+    return summary, problems
+
+
+def printReport(summary, problems, concurrency):
+    if summary["min_solves"] == summary["max_solves"]:
+        solves = f"{summary['min_solves']} Bellhop solves"
+        hours = f"{summary['max_wall_s'] / 3600:.2f} h"
+    else:
+        solves = f"{summary['min_solves']} to {summary['max_solves']} Bellhop solves (depending on escalation)"
+        hours = f"{summary['min_wall_s'] / 3600:.2f} to {summary['max_wall_s'] / 3600:.2f} h"
+    print(f">>> Preflight: {summary['rows']} rows, {summary['valid_rows']} runnable, {solves}")
+    print(f">>> Estimated wall time, {concurrency} Bellhop runs at a time: {hours}")
+    for p in problems.itertuples(index=False):
+        rows = p.rows if len(p.rows) <= 5 else p.rows[:5] + ["..."]
+        where = p.scenario + (f" ({p.surfaces})" if p.surfaces else "") + (f" [{p.tiers}]" if p.tiers else "")
+        print(f" {p.severity.upper():7s} {where}: {p.problem} (rows {rows}, {len(p.rows)} in all)")
+    print(f">>> {summary['errors']} errors, {summary['warnings']} warnings")
+
+
+if __name__ == "__main__":
+    import CEA_automate
+    from CEA_fidelity import SCREEN_THEN_FULL
+
+    parser = argparse.ArgumentParser(description="Dry run of CEA_automate's sweep: check every row and environment.")
+    parser.add_argument("--iterations", type=int, default=CEA_automate.n_iterations)
+    parser.add_argument("--screen", action="store_true", help="Plan for screening tiers (SCREEN_THEN_FULL).")
+    parser.add_argument("--seconds-per-solve", type=float, default=SOLVE_SECONDS)
+    parser.add_argument("--concurrency", type=int, default=CEA_automate.concurrency)
+    parser.add_argument("--workers", type=int)
+    args = parser.parse_args()
+
+    summary, problems = preflight(CEA_automate.buildSamplePlan(args.iterations),
+                                  tiers=SCREEN_THEN_FULL if args.screen else CEA_automate.fidelity_tiers,
+                                  param_bounds=CEA_automate.param_bounds, concurrency=args.concurrency,
+                                  seconds_per_solve=args.seconds_per_solve, workers=args.workers)
+    raise SystemExit(1 if summary["errors"] else 0)
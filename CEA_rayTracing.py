@@ -17,24 +17,28 @@ CEA_surfaceLevels: defines surface waves for the environment.
 *******CEA_rayTracing: Traces (and can plot) sound pathways through the environment.
 CEA_arrivals: Measures signal strength and arrival timing for sound through the environment. Also adds initial power, and given a detection threshold, can define a ray as detectable or not.
 """
-import os
-import arlpy.uwapm as pm
+from CEA_lazy import lazyModule
+from CEA_bellhop import solve
+pm = lazyModule("arlpy.uwapm")  # Imported on first use (see CEA_lazy).
 #import arlpy.plot as plt
 #import numpy as np
 #import pandas as pd
 
-def rayTracing(signalRange,topDescrip,botDescrip,sspDescrip,env):
+def rayTracing(signalRange,topDescrip,botDescrip,sspDescrip,env,plot=True,context=None):
     
-    #Bellhop's location. Need to have already created using makefile.
-    os.chdir(r"C:\path\executables")
+    #Bellhop's location comes from context (CEA_runContext). Need to have already created using makefile.
     # ALL RAYS
-    rays = pm.compute_rays(env)
+    rays = solve(env, "rays", context)
     # ONLY RAYS BETWEEN TRANSMITTER AND RECEIVER.
 #    #rays = pm.compute_eigenrays(env)
 
-    pm.plot_rays(rays, env=env,
-                width=900,
-                 title= f"Ray Tracing: 69 kHz,{topDescrip}, {botDescrip}, {sspDescrip} Environment") 
+    # Interactive (Bokeh) plot. Turn off for sweeps; sampled runs are drawn headless by CEA_gallery instead.
+    if plot:
+        pm.plot_rays(rays, env=env,
+                    width=900,
+                     title= f"Ray Tracing: 69 kHz,{topDescrip}, {botDescrip}, {sspDescrip} Environment") 
+
+    return rays
     
 ###############################
 # BDA, QUANTIFYING RAY DISTANCE TRAVELED
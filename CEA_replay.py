@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 16:14:52 2026
+Complex Environmental Acoustics (CEA) modeling.
+Frank McQuarrie, Skidaway Institute of Oceanography
+
+Purpose of script: Replay a deployment. Takes a time-indexed log of measured wind, background noise and
+stratification (e.g. hourly met station + glider records) and turns it into a detectability time series.
+
+Each timestep is mapped onto createEnv's parameters:
+    wind speed      -> SBL (UWAPL handbook values, capped at 15 dB) and surface type (flat/mid/rough)
+    noise           -> detection threshold
+    deltaSS, depth  -> stratified SSP
+SBL and the detection threshold are only used after Bellhop (in processArrivals), so they never need a new solve.
+Only the surface type and stratification change what Bellhop sees, and timesteps that land on the same
+(canonical, see CEA_canonical) environment share one solve. A year of hourly data comes down to the number of distinct environments, not 8,760.
+
+Scripts.
+CEA_automate : current. Runs and saves outputs from propagation modeling.
+CEA_singleExperiment: Run and save a specific model.
+
+CEA_createEnv: Creates an environment for Bellhop to model sound through.
+CEA_ssp: Sets a soundspeed profile. Currently set to create one given stratification strength and depth.
+CEA_surfaceLevels: defines surface waves for the environment.
+
+CEA_rayTracing: Traces (and can plot) sound pathways through the environment.
+CEA_arrivals: Measures signal strength and arrival timing for sound through the environment. Also adds initial power, and given a detection threshold, can define a ray as detectable or not.
+******CEA_replay: Replays a measured environmental log through the model as a detectability time series.
+
+Usage:
+    python CEA_replay.py <log.csv> <output.csv> --scenario STSNew1toFS17Real
+"""
+
+import argparse
+import numpy as np
+from CEA_lazy import lazyModule
+from CEA_createEnv import createEnv
+from CEA_arrivals import processArrivals
+from CEA_asyncRunner import runJobs
+from CEA_canonical import groupPlan, paramsFromKey
+
+pd = lazyModule("pandas")  # Imported on first use (see CEA_lazy).
+
+# Column names in the log. Change these to match your files.
+LOG_COLUMNS = {
+    "time": "timestamp",
+    "wind": "wind_speed",           # m/s, at 10 m
+    "noise": "noise_dB",            # Background noise (dB), used directly as the detection threshold
+    "deltaSS": "deltaSS",           # m/s, glider stratification strength
+    "gradient_depth": "gradient_depth",  # m, glider stratification depth
+}
+
+# Wind (m/s) to SBL (dB), from the UWAPL handbook values at a 10 degree angle (see CEA_createEnv).
+# Linear between the points and capped at 15 dB.
+SBL_WIND = [0, 6, 12, 13.3]
+SBL_DB = [0, 4.42, 13.12, 15]
+
+# Wind (m/s) where the surface changes from flat to mid waves, and from mid to rough waves.
+SURFACE_WIND_BREAKS = (4, 9)
+SURFACE_TYPES = ("flat_surface", "mid_waves", "rough_waves")
+
+# Resolution that stratification is rounded to before environments are compared. Differences smaller than this
+# are below what the glider measures, and would otherwise make every hour a "new" environment.
+RESOLUTION = {"deltaSS": 0.1, "gradient_depth": 0.5}
+
+#################################################
+
+def loadLog(log_file, columns=LOG_COLUMNS):
+    """
+    Read the log, index it by time, and fill gaps (e.g. hours between glider profiles) by interpolating in time.
+    """
+    log = pd.read_csv(log_file, parse_dates=[columns["time"]])
+    log = log.set_index(columns["time"]).sort_index()
+    numeric = [columns[k] for k in ("wind", "noise", "deltaSS", "gradient_depth")]
+    log[numeric] = log[numeric].interpolate(method="time", limit_direction="both")
+    return log
+
+
+def mapEnvironment(log, columns=LOG_COLUMNS, resolution=RESOLUTION, threshold_offset=0):
+    """
+    Map every timestep onto createEnv's parameters. Vectorized over the whole log.
+    """
+    wind = log[columns["wind"]].to_numpy(dtype=float)
+    params = pd.DataFrame(index=log.index)
+    params["wind_speed"] = wind
+    params["SBL"] = np.round(np.interp(wind, SBL_WIND, SBL_DB), 2)
+    params["surface"] = np.array(SURFACE_TYPES)[np.digitize(wind, SURFACE_WIND_BREAKS)]
+    params["detectionThreshold"] = np.round(log[columns["noise"]].to_numpy(dtype=float) + threshold_offset, 1)
+    for name in ("deltaSS", "gradient_depth"):
+        step = resolution[name]
+        params[name] = np.round(np.round(log[columns[name]].to_numpy(dtype=float) / step) * step, 3)
+    return params
+
+
+def runReplay(log_file, scenario, bottom_absorption=0, columns=LOG_COLUMNS, resolution=RESOLUTION,
+              threshold_offset=0, concurrency=None, timeout=600, retries=1, context=None):
+    """
+    Replay the log for one scenario. Returns a DataFrame indexed by time with the inputs and detectability.
+    context (a RunContext) says where Bellhop is and where its files go.
+    """
+    log = loadLog(log_file, columns)
+    params = mapEnvironment(log, columns, resolution, threshold_offset)
+
+# Timesteps that give Bellhop identical inputs share one solve (see CEA_canonical).
+    rows = params.assign(scenario=scenario, bottom_absorption=bottom_absorption).to_dict("records")
+    groups = groupPlan(rows)
+    print(f">>> {len(params)} timesteps, {len(groups)} distinct environments to solve")
+
+    def jobs():
+        for key in groups:
+            canonical = paramsFromKey(key)
+            try:
+                env = createEnv(surface_type=canonical["surface"], scenario=scenario,
+                                bottom_absorption=canonical["bottom_absorption"], deltaSS=canonical["deltaSS"],
+                                gradient_depth=canonical["gradient_depth"])[0]
+            except Exception as e:
+                print(f" SKIPPING environment {key} (createEnv error): {e}")
+                continue
+            yield key, env
+
+    n = len(params)
+    detectable = np.full(n, np.nan)
+    undetectable = np.full(n, np.nan)
+    avg_dB = np.full(n, np.nan)
+    solve_id = np.full(n, -1)
+    solved = []
+
+# Each finished solve is post-processed for every timestep that uses it, then dropped.
+    def on_result(key, arrivals, error):
+        if error is not None:
+            print(f" SKIPPING environment {key} (Bellhop error): {error}")
+            return
+        solved.append(key)
+        for j in groups[key]:
+            _, _, _, _, X_detectable, Y_undetectable, avg_low_dB, _, _, _ = processArrivals(
+                arrivals, params["detectionThreshold"].iat[j], params["SBL"].iat[j], verbose=False)
+            detectable[j] = X_detectable
+            undetectable[j] = Y_undetectable
+            avg_dB[j] = avg_low_dB
+            solve_id[j] = len(solved) - 1
+
+    runJobs(jobs(), on_result, concurrency=concurrency, timeout=timeout, retries=retries, context=context)
+
+    series = params.copy()
+    series["Scenario"] = scenario
+    series["Bottom_Absorption"] = bottom_absorption
+    series["Detectable"] = detectable
+    series["Undetectable"] = undetectable
+    series["Detectable_Fraction"] = detectable / (detectable + undetectable)
+    series["Avg_Signal_dB"] = np.round(avg_dB, 1)
+    series["Solve_ID"] = solve_id
+    print(f" COMPLETED replay: {n} timesteps from {len(solved)} Bellhop solves")
+    return series
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay a measured environmental log as a detectability time series.")
+    parser.add_argument("log_file")
+    parser.add_argument("output_file")
+    parser.add_argument("--scenario", required=True)
+    parser.add_argument("--bottom-absorption", type=float, default=0)
+    parser.add_argument("--concurrency", type=int, default=None)
+    args = parser.parse_args()
+
+    series = runReplay(args.log_file, args.scenario, bottom_absorption=args.bottom_absorption,
+                       concurrency=args.concurrency)
+    series.to_csv(args.output_file)
@@ -0,0 +1,361 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 21:18:26 2026
+Complex Environmental Acoustics (CEA) modeling.
+Frank McQuarrie, Skidaway Institute of Oceanography
+
+Purpose of script: One queryable index over every sweep's outputs, instead of loading all the modelOutputs /
+binnedAmplitudes CSVs into pandas and filtering. The rows are loaded once into a local SQLite file with indexes on
+the scenario, the surface and each continuous parameter. Queries are turned into SQL, so the filtering happens in
+SQLite using the indexes, and only the columns asked for are read:
+
+    index = ResultIndex("results.sqlite")
+    index.ingest("modelOutputs.csv", "binnedAmplitudes.csv")      # once per file; unchanged files are skipped
+    df = index.query(["SBL", "deltaSS", "Avg_Signal_dB"],
+                     scenario="STSNew1toFS17Real", surface="Rough", SBL=(">", 10), deltaSS=("<", 2))
+
+A condition is a value (equal to), a list (any of), an (operator, value) pair with <, <=, >, >=, = or !=, or a
+(low, high) pair (an inclusive range; None for an open end). Every condition must hold. For several on one column,
+where is a list of (column, condition) or (column, operator, value) tuples:
+
+    df = index.query(["SBL"], where=[("SBL", ">", 5), ("SBL", "<", 10)], deltaSS=(2, 4))
+
+Keep the index file on a local disk; SQLite's locking is not reliable over NFS (see CEA_workQueue).
+
+Scripts.
+CEA_automate : current. Runs and saves outputs from propagation modeling.
+CEA_singleExperiment: Run and save a specific model.
+
+CEA_createEnv: Creates an environment for Bellhop to model sound through.
+CEA_ssp: Sets a soundspeed profile. Currently set to create one given stratification strength and depth.
+CEA_surfaceLevels: defines surface waves for the environment.
+
+CEA_rayTracing: Traces (and can plot) sound pathways through the environment.
+CEA_arrivals: Measures signal strength and arrival timing for sound through the environment. Also adds initial power, and given a detection threshold, can define a ray as detectable or not.
+******CEA_resultIndex: Indexes stored sweep outputs in SQLite and answers filtered queries without loading them all.
+
+Usage:
+    python CEA_resultIndex.py ingest <index.sqlite> <modelOutputs.csv> [<binnedAmplitudes.csv>]
+    python CEA_resultIndex.py query  <index.sqlite> "scenario=STSNew1toFS17Real" "surface=Rough" "SBL>10" "deltaSS<2"
+"""
+
+import os
+import re
+import csv
+import sqlite3
+import argparse
+from contextlib import contextmanager
+from CEA_lazy import lazyModule
+pd = lazyModule("pandas")  # Imported on first use (see CEA_lazy).
+
+# Columns of a modelOutputs file (see CEA_automate.initOutputFiles), and their SQLite types.
+RUN_COLUMNS = {
+    "Timestamp": "TEXT",
+    "Scenario": "TEXT",
+    "topDescrip": "TEXT",
+    "SBL": "REAL",
+    "deltaSS": "REAL",
+    "gradient_depth": "REAL",
+    "Detection_Threshold": "REAL",
+    "Bottom_Absorption": "REAL",
+    "Detectable": "INTEGER",
+    "Undetectable": "INTEGER",
+    "Avg_Signal_dB": "REAL",
+    "Fidelity": "TEXT",
+}
+
+# Histogram columns of a binnedAmplitudes file.
+BIN_COLUMNS = [f"Bin_{center}" for center in range(0, 100, 10)]
+
+# Indexed columns. Scenario and surface are usually in every query, so they lead a combined index as well.
+INDEXED = ("Scenario", "topDescrip", "SBL", "deltaSS", "gradient_depth", "Detection_Threshold", "Bottom_Absorption",
+           "Avg_Signal_dB")
+
+# Friendlier names accepted by query().
+ALIASES = {
+    "scenario": "Scenario",
+    "surface": "topDescrip",
+    "detectionThreshold": "Detection_Threshold",
+    "bottom_absorption": "Bottom_Absorption",
+}
+
+OPERATORS = ("<", "<=", ">", ">=", "=", "!=")
+
+# Rows handed to SQLite at a time while ingesting.
+INGEST_BATCH = 50000
+
+# Files at least this big (bytes, ~200k rows) are bulk loaded: the indexes are dropped and rebuilt afterwards, which
+# is much faster than updating them row by row.
+BULK_BYTES = 20e6
+
+#################################################
+
+class ResultIndex:
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self._createTables()
+
+    def _createTables(self):
+        columns = ", ".join(f'"{c}" {t}' for c, t in RUN_COLUMNS.items())
+        bins = ", ".join(f'"{c}" INTEGER' for c in BIN_COLUMNS)
+        self.conn.executescript(f"""
+            CREATE TABLE IF NOT EXISTS sources (
+                source_id INTEGER PRIMARY KEY, path TEXT UNIQUE, size INTEGER, mtime REAL, n_rows INTEGER);
+            CREATE TABLE IF NOT EXISTS runs (
+                run_id INTEGER PRIMARY KEY, source_id INTEGER, row_number INTEGER, {columns});
+            CREATE TABLE IF NOT EXISTS bins (run_id INTEGER PRIMARY KEY, {bins});
+        """)
+        # Index files made before a column was added (e.g. Fidelity) get it, empty for the rows already in them.
+        existing = {row[1] for row in self.conn.execute("PRAGMA table_info(runs)")}
+        for c, t in RUN_COLUMNS.items():
+            if c not in existing:
+                self.conn.execute(f'ALTER TABLE runs ADD COLUMN "{c}" {t}')
+        self._createIndexes()
+
+    def _createIndexes(self):
+        self.conn.execute('CREATE INDEX IF NOT EXISTS idx_runs_stratum ON runs ("Scenario", "topDescrip")')
+        for column in INDEXED:
+            self.conn.execute(f'CREATE INDEX IF NOT EXISTS "idx_runs_{column}" ON runs ("{column}")')
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    #################################################
+    # Loading
+
+    def ingest(self, output_file, output_file2=None, replace=False):
+        """
+        Add one modelOutputs file (and the binnedAmplitudes file written alongside it, whose rows are in the same
+        order). A file already ingested and unchanged since is skipped; a changed one is re-loaded.
+        Returns the number of rows added.
+        """
+        if os.path.getsize(output_file) >= BULK_BYTES:
+            with self._bulkLoad():
+                return self._ingestOne(output_file, output_file2, replace)
+        n_rows = self._ingestOne(output_file, output_file2, replace)
+        self.conn.execute("PRAGMA optimize")
+        return n_rows
+
+    def ingestMany(self, files, replace=False):
+        """
+        Add many files at once, rebuilding the indexes only once. files is a list of modelOutputs paths, or of
+        (modelOutputs, binnedAmplitudes) pairs. Returns the number of rows added.
+        """
+        with self._bulkLoad():
+            return sum(self._ingestOne(*((f, None) if isinstance(f, str) else f), replace) for f in files)
+
+    @contextmanager
+    def _bulkLoad(self):
+        indexes = self.conn.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND name LIKE 'idx_runs%'").fetchall()
+        for (name,) in indexes:
+            self.conn.execute(f'DROP INDEX "{name}"')
+        self.conn.execute("PRAGMA synchronous = OFF")
+        try:
+            yield
+        finally:
+            self.conn.execute("PRAGMA synchronous = NORMAL")
+            self._createIndexes()
+            self.conn.execute("ANALYZE")  # Lets SQLite pick the most selective index for each query.
+            self.conn.commit()
+
+    def _ingestOne(self, output_file, output_file2, replace):
+        path = os.path.abspath(output_file)
+        stat = os.stat(path)
+        known = self.conn.execute("SELECT source_id, size, mtime FROM sources WHERE path = ?", (path,)).fetchone()
+        if known is not None:
+            if known[1] == stat.st_size and known[2] == stat.st_mtime and not replace:
+                return 0
+            self._dropSource(known[0])
+
+        cur = self.conn.execute("INSERT INTO sources (path, size, mtime, n_rows) VALUES (?, ?, ?, 0)",
+                                (path, stat.st_size, stat.st_mtime))
+        source_id = cur.lastrowid
+        first_id = (self.conn.execute("SELECT MAX(run_id) FROM runs").fetchone()[0] or 0) + 1
+
+        quoted = ", ".join(f'"{c}"' for c in RUN_COLUMNS)
+        run_sql = f'INSERT INTO runs (run_id, source_id, row_number, {quoted}) VALUES ({", ".join("?" * (len(RUN_COLUMNS) + 3))})'
+        n_rows = 0
+        with open(path, newline="") as fh:
+            reader = csv.DictReader(fh)
+            batch = []
+            for k, row in enumerate(reader):
+                batch.append((first_id + k, source_id, k) + tuple(_convert(row.get(c), t) for c, t in RUN_COLUMNS.items()))
+                if len(batch) >= INGEST_BATCH:
+                    self.conn.executemany(run_sql, batch)
+                    n_rows += len(batch)
+                    batch = []
+            self.conn.executemany(run_sql, batch)
+            n_rows += len(batch)
+
+        if output_file2 is not None:
+            bin_sql = f'INSERT INTO bins (run_id, {", ".join(BIN_COLUMNS)}) VALUES ({", ".join("?" * (len(BIN_COLUMNS) + 1))})'
+            with open(output_file2, newline="") as fh:
+                reader = csv.DictReader(fh)
+                batch = []
+                for k, row in enumerate(reader):
+                    if k >= n_rows:
+                        break
+                    batch.append((first_id + k,) + tuple(_convert(row.get(c), "INTEGER") for c in BIN_COLUMNS))
+                    if len(batch) >= INGEST_BATCH:
+                        self.conn.executemany(bin_sql, batch)
+                        batch = []
+                self.conn.executemany(bin_sql, batch)
+
+        self.conn.execute("UPDATE sources SET n_rows = ? WHERE source_id = ?", (n_rows, source_id))
+        self.conn.commit()
+        return n_rows
+
+    def _dropSource(self, source_id):
+        self.conn.execute("DELETE FROM bins WHERE run_id IN (SELECT run_id FROM runs WHERE source_id = ?)", (source_id,))
+        self.conn.execute("DELETE FROM runs WHERE source_id = ?", (source_id,))
+        self.conn.execute("DELETE FROM sources WHERE source_id = ?", (source_id,))
+
+    def sources(self):
+        return pd.read_sql("SELECT path, n_rows, size, mtime FROM sources ORDER BY source_id", self.conn)
+
+    #################################################
+    # Querying
+
+    def query(self, columns=None, where=None, limit=None, order_by=None, **filters):
+        """
+        Rows matching every condition (in where, a {column: condition} dict or a list of condition tuples, and/or as
+        keyword arguments), with only the requested columns. Bin_* columns can be asked for too. Returns a DataFrame.
+        """
+        sql, params = self._select(columns, _conditions(where, filters), limit, order_by)
+        return pd.read_sql(sql, self.conn, params=params)
+
+    def count(self, where=None, **filters):
+        conditions = _conditions(where, filters)
+        sql, params = self._whereClause(conditions)
+        names = [name for name, _ in conditions]
+        return self.conn.execute(f"SELECT COUNT(*) FROM runs {_join(names)} {sql}", params).fetchone()[0]
+
+    def explain(self, columns=None, where=None, **filters):
+        """SQLite's query plan, to check that a query is using an index."""
+        sql, params = self._select(columns, _conditions(where, filters), None, None)
+        return [row[-1] for row in self.conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+
+    def _select(self, columns, conditions, limit, order_by):
+        columns = [_column(c) for c in (columns or list(RUN_COLUMNS))]
+        join = _join(columns + [name for name, _ in conditions] + ([order_by] if order_by else []))
+        select = ", ".join(_qualified(c) for c in columns)
+        where_sql, params = self._whereClause(conditions)
+        sql = f"SELECT {select} FROM runs {join} {where_sql}"
+        if order_by:
+            sql += f" ORDER BY {_qualified(order_by)}"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        return sql, params
+
+    def _whereClause(self, conditions):
+        clauses, params = [], []
+        for name, condition in conditions:
+            column = _qualified(name)
+            if isinstance(condition, (list, set)):
+                values = list(condition)
+                clauses.append(f"{column} IN ({', '.join('?' * len(values))})")
+                params.extend(values)
+            elif isinstance(condition, tuple) and len(condition) == 2 and condition[0] in OPERATORS:
+                clauses.append(f"{column} {condition[0]} ?")
+                params.append(condition[1])
+            elif isinstance(condition, tuple) and len(condition) == 2:
+                for op, bound in zip((">=", "<="), condition):
+                    if bound is not None:
+                        clauses.append(f"{column} {op} ?")
+                        params.append(bound)
+            else:
+                clauses.append(f"{column} = ?")
+                params.append(condition)
+        return ("WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+
+def _conditions(where, filters):
+    """where (a dict or a list of tuples) and the keyword filters as one list of (column, condition) pairs."""
+    items = where.items() if isinstance(where, dict) else (where or [])
+    pairs = []
+    for item in items:
+        if len(item) == 3:
+            name, op, value = item
+            if op not in OPERATORS:
+                raise ValueError(f"Unknown operator '{op}' for '{name}'. Use one of {list(OPERATORS)}.")
+            item = (name, (op, value))
+        pairs.append(tuple(item))
+    return pairs + list(filters.items())
+
+
+def _column(name):
+    column = ALIASES.get(name, name)
+    if column not in RUN_COLUMNS and column not in BIN_COLUMNS:
+        raise ValueError(f"Unknown column '{name}'.")
+    return column
+
+
+def _qualified(name):
+    """The column with its table: bins for the Bin_* columns, runs for the rest."""
+    column = _column(name)
+    return f'bins."{column}"' if column in BIN_COLUMNS else f'runs."{column}"'
+
+
+def _join(names):
+    """The join to the bins table, if any of the columns named (selected, filtered or sorted on) is in it."""
+    if any(_column(n) in BIN_COLUMNS for n in names):
+        return "LEFT JOIN bins ON bins.run_id = runs.run_id"
+    return ""
+
+
+def _convert(value, sql_type):
+    if value is None or value == "":
+        return None
+    if sql_type == "REAL":
+        return float(value)
+    if sql_type == "INTEGER":
+        return int(float(value))
+    return value
+
+
+def parseCondition(text):
+    """'SBL>10' -> ('SBL', ('>', 10.0)). Values that are not numbers are kept as text."""
+    match = re.fullmatch(r"\s*(\w+)\s*(<=|>=|!=|<|>|=)\s*(.+?)\s*", text)
+    if match is None:
+        raise ValueError(f"Cannot read condition '{text}'. Use e.g. SBL>10 or scenario=STSNew1toFS17Real.")
+    name, op, value = match.groups()
+    try:
+        value = float(value)
+    except ValueError:
+        pass
+    return name, (op, value)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Index sweep outputs in SQLite and query them.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("ingest", help="Add a modelOutputs file (and its binnedAmplitudes file) to the index.")
+    p.add_argument("db")
+    p.add_argument("output_file")
+    p.add_argument("output_file2", nargs="?", default=None)
+
+    p = sub.add_parser("query", help="Print the rows matching every condition.")
+    p.add_argument("db")
+    p.add_argument("conditions", nargs="*")
+    p.add_argument("--columns", nargs="+", default=None)
+    p.add_argument("--limit", type=int, default=None)
+
+    args = parser.parse_args()
+
+    with ResultIndex(args.db) as index:
+        if args.command == "ingest":
+            print(f"Added {index.ingest(args.output_file, args.output_file2)} rows")
+        elif args.command == "query":
+            where = [parseCondition(c) for c in args.conditions]
+            print(index.query(args.columns, where=where, limit=args.limit).to_string(index=False))
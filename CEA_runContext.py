@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 22:31:05 2026
+Complex Environmental Acoustics (CEA) modeling.
+Frank McQuarrie, Skidaway Institute of Oceanography
+
+Purpose of script: Where things are, passed explicitly instead of through the process's working directory.
+The scripts used to os.chdir() to the Bellhop folder before each solve so Bellhop could be found, and to the script
+folder on import. The working directory belongs to the whole process, so that made it unsafe to run more than one
+solve at a time from one process (threads, or the async runner). A RunContext holds the three locations instead:
+    bellhop_exe   Bellhop executable (full path, or a name on your PATH). Resolved to a full path.
+    scratch_dir   Where each run's input/output files are written. Every run gets its own unique file names.
+    output_dir    Where results (CSVs, figures) are saved.
+and is handed to every function that needs one. Nothing changes directory; Bellhop itself is started with its
+working directory set to scratch_dir, which only affects that Bellhop process.
+
+Defaults come from the environment variables CEA_BELLHOP, CEA_SCRATCH and CEA_OUTPUT, then bellhop.exe on the PATH,
+the system temp folder and the current folder.
+
+Scripts.
+CEA_automate : current. Runs and saves outputs from propagation modeling.
+CEA_singleExperiment: Run and save a specific model.
+
+CEA_createEnv: Creates an environment for Bellhop to model sound through.
+CEA_ssp: Sets a soundspeed profile. Currently set to create one given stratification strength and depth.
+CEA_surfaceLevels: defines surface waves for the environment.
+
+CEA_rayTracing: Traces (and can plot) sound pathways through the environment.
+CEA_arrivals: Measures signal strength and arrival timing for sound through the environment. Also adds initial power, and given a detection threshold, can define a ray as detectable or not.
+******CEA_runContext: Bellhop executable, scratch and output folders, passed explicitly to every solve.
+"""
+
+import os
+import shutil
+import tempfile
+from dataclasses import dataclass, replace
+
+DEFAULT_BELLHOP = os.environ.get("CEA_BELLHOP", "bellhop.exe")
+DEFAULT_SCRATCH = os.environ.get("CEA_SCRATCH") or tempfile.gettempdir()
+DEFAULT_OUTPUT = os.environ.get("CEA_OUTPUT", ".")
+
+
+@dataclass(frozen=True)
+class RunContext:
+    bellhop_exe: str = DEFAULT_BELLHOP
+    scratch_dir: str = DEFAULT_SCRATCH
+    output_dir: str = DEFAULT_OUTPUT
+
+    def __post_init__(self):
+        # Absolute paths, so nothing depends on the working directory after this point.
+        object.__setattr__(self, "bellhop_exe", _resolveExecutable(self.bellhop_exe))
+        object.__setattr__(self, "scratch_dir", os.path.abspath(self.scratch_dir))
+        object.__setattr__(self, "output_dir", os.path.abspath(self.output_dir))
+
+    def outputPath(self, *parts):
+        """Path of a file in output_dir (folders are created as needed)."""
+        path = os.path.join(self.output_dir, *parts)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return path
+
+    def makeDirs(self):
+        os.makedirs(self.scratch_dir, exist_ok=True)
+        os.makedirs(self.output_dir, exist_ok=True)
+        return self
+
+    def replace(self, **changes):
+        return replace(self, **changes)
+
+
+def _resolveExecutable(exe):
+    """Full path of exe: as given if it is a path, otherwise looked up on the PATH."""
+    if os.path.dirname(exe):
+        return os.path.abspath(exe)
+    found = shutil.which(exe)
+    # Not found (yet): keep the name, and let launching Bellhop report it clearly.
+    return found if found else exe
+
+
+def defaultContext():
+    """The context used when none is given."""
+    return RunContext().makeDirs()
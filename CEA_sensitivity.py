@@ -0,0 +1,260 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 21:52:40 2026
+Complex Environmental Acoustics (CEA) modeling.
+Frank McQuarrie, Skidaway Institute of Oceanography
+
+Purpose of script: Which parameter drives detectability? The LHS sweep in CEA_automate covers the five parameters
+(bottom_absorption, SBL, detectionThreshold, deltaSS, gradient_depth) but cannot split the variance of the outputs
+between them. This runs a sensitivity design over param_bounds for each scenario (and surface) and reports:
+    Sobol (Saltelli design)   first-order (S1) and total-order (ST) indices, with bootstrap confidence intervals.
+                              N * (k + 2) runs for k = 5 parameters.
+    Morris (elementary effects)  mu* (overall influence) and sigma (non-linearity / interactions), with bootstrap
+                              confidence intervals on mu*. r * (k + 1) runs; a cheap screen before Sobol.
+
+Both designs are solved through the same path as a sweep (CEA_canonical + CEA_asyncRunner), so rows that give
+Bellhop identical inputs share one solve. That saves a lot here: SBL and detectionThreshold are only applied after
+Bellhop, so the Saltelli matrices that only swap those two columns need no new solves at all, and gradient_depth
+is snapped to the 2 m SSP grid.
+
+Scripts.
+CEA_automate : current. Runs and saves outputs from propagation modeling.
+CEA_singleExperiment: Run and save a specific model.
+
+CEA_createEnv: Creates an environment for Bellhop to model sound through.
+CEA_ssp: Sets a soundspeed profile. Currently set to create one given stratification strength and depth.
+CEA_surfaceLevels: defines surface waves for the environment.
+
+CEA_rayTracing: Traces (and can plot) sound pathways through the environment.
+CEA_arrivals: Measures signal strength and arrival timing for sound through the environment. Also adds initial power, and given a detection threshold, can define a ray as detectable or not.
+******CEA_sensitivity: Sobol and Morris sensitivity indices of the model outputs, per scenario.
+
+Usage:
+    python CEA_sensitivity.py sobol  <report.csv> --n-base 256 --scenarios STSNew1toFS17Real FS17toSTSNew1Real
+    python CEA_sensitivity.py morris <report.csv> --trajectories 20
+"""
+
+import argparse
+import numpy as np
+from CEA_createEnv import createEnv
+from CEA_arrivals import processArrivals
+from CEA_asyncRunner import runJobs
+from CEA_canonical import groupPlan, paramsFromKey
+from CEA_lazy import lazyModule
+# Imported on first use (see CEA_lazy).
+pd = lazyModule("pandas")
+qmc = lazyModule("scipy.stats.qmc")
+
+# Outputs the indices are computed for.
+OUTPUTS = ("Detectable_Fraction", "Avg_Signal_dB")
+
+# Bootstrap resamples for the confidence intervals.
+N_BOOTSTRAP = 1000
+
+#################################################
+# DESIGNS (in the unit cube; scaled to param_bounds by toPlan)
+
+def saltelliDesign(n_base, k, seed=None):
+    """
+    Saltelli's design: A and B (n_base x k, from one scrambled Sobol sequence of 2k dimensions), and for each
+    parameter i the matrix AB_i, which is A with column i taken from B. Returns (A, B, AB) with AB of shape (k, n_base, k).
+    n_base should be a power of 2 for the Sobol sequence to stay balanced.
+    """
+    base = qmc.Sobol(d=2 * k, scramble=True, seed=seed).random(n_base)
+    A, B = base[:, :k], base[:, k:]
+    AB = np.repeat(A[np.newaxis], k, axis=0)
+    AB[np.arange(k), :, np.arange(k)] = B.T
+    return A, B, AB
+
+
+def morrisDesign(n_trajectories, k, levels=4, seed=None):
+    """
+    Morris' one-at-a-time trajectories on a grid of `levels` levels. Each trajectory is k + 1 points; from one point
+    to the next exactly one parameter moves by delta. Returns (points, steps, delta): points has shape
+    (n_trajectories, k + 1, k), and steps[t, j] is the parameter changed between point j and j + 1 of trajectory t.
+    """
+    rng = np.random.default_rng(seed)
+    delta = levels / (2 * (levels - 1))
+    starts = rng.integers(0, levels // 2, size=(n_trajectories, k)) / (levels - 1)
+    steps = np.argsort(rng.random((n_trajectories, k)), axis=1)        # random order of parameters
+    signs = rng.choice([-1, 1], size=(n_trajectories, k))              # random direction of each move
+
+    # Start from the point where every move ends inside [0, 1], then apply the moves one at a time.
+    first = np.where(signs > 0, starts, starts + delta)
+    moves = np.zeros((n_trajectories, k + 1, k))
+    t = np.arange(n_trajectories)[:, np.newaxis]
+    moves[t, np.arange(1, k + 1)[np.newaxis, :], steps] = (signs[t, steps] * delta)
+    points = first[:, np.newaxis, :] + np.cumsum(moves, axis=1)
+    return points, steps, delta
+
+
+def toPlan(unit_rows, scenario, surface, param_bounds):
+    """Scale rows of the unit cube to param_bounds and make them sweep rows (as in CEA_automate.buildSamplePlan)."""
+    names = list(param_bounds)
+    low = np.array([param_bounds[p][0] for p in names])
+    high = np.array([param_bounds[p][1] for p in names])
+    values = low + np.asarray(unit_rows) * (high - low)
+    return [dict(zip(names, map(float, row)), scenario=scenario, surface=surface) for row in values]
+
+
+#################################################
+# SOLVING
+
+def evaluatePlan(plan, concurrency=None, timeout=600, retries=1, context=None):
+    """
+    The outputs of every row of a plan, as {output: array}. Rows sharing a canonical environment share one solve.
+    Rows whose solve failed are nan. context (a RunContext) says where Bellhop is and where its files go.
+    """
+    groups = groupPlan(plan)
+    print(f">>> {len(plan)} design points need {len(groups)} Bellhop solves")
+
+    def jobs():
+        for key in groups:
+            params = paramsFromKey(key)
+            try:
+                env = createEnv(surface_type=params["surface"], scenario=params["scenario"],
+                                bottom_absorption=params["bottom_absorption"], deltaSS=params["deltaSS"],
+                                gradient_depth=params["gradient_depth"])[0]
+            except Exception as e:
+                print(f" SKIPPING environment {key} (createEnv error): {e}")
+                continue
+            yield key, env
+
+    outputs = {name: np.full(len(plan), np.nan) for name in OUTPUTS}
+
+    def on_result(key, arrivals, error):
+        if error is not None:
+            print(f" SKIPPING environment {key} (Bellhop error): {error}")
+            return
+        for i in groups[key]:
+            _, _, _, _, X_detectable, Y_undetectable, avg_low_dB, _, _, _ = processArrivals(
+                arrivals, plan[i]["detectionThreshold"], plan[i]["SBL"], verbose=False)
+            n = X_detectable + Y_undetectable
+            outputs["Detectable_Fraction"][i] = X_detectable / n if n else np.nan
+            outputs["Avg_Signal_dB"][i] = avg_low_dB
+
+    runJobs(jobs(), on_result, concurrency=concurrency, timeout=timeout, retries=retries, context=context)
+    return outputs
+
+
+#################################################
+# INDICES (vectorized over bootstrap resamples)
+
+def sobolIndices(yA, yB, yAB, n_bootstrap=N_BOOTSTRAP, confidence=0.95, seed=None):
+    """
+    First-order (Saltelli 2010) and total-order (Jansen) indices from the outputs of A (n), B (n) and AB (k x n).
+    Design points with a nan output are dropped. Returns {"S1", "ST", "S1_ci", "ST_ci"}; the CIs are (k, 2) arrays.
+    """
+    ok = np.isfinite(yA) & np.isfinite(yB) & np.all(np.isfinite(yAB), axis=0)
+    yA, yB, yAB = yA[ok], yB[ok], yAB[:, ok]
+    n = len(yA)
+    rng = np.random.default_rng(seed)
+    # Row 0 is the full sample, the rest are bootstrap resamples of the design points.
+    idx = np.vstack([np.arange(n), rng.integers(0, n, size=(n_bootstrap, n))])
+
+    a, b, ab = yA[idx], yB[idx], yAB[:, idx]                 # (m, n), (m, n), (k, m, n)
+    var = np.var(np.concatenate([a, b], axis=1), axis=1)      # (m,)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        S1 = np.mean(b * (ab - a), axis=2) / var               # (k, m)
+        ST = 0.5 * np.mean((a - ab) ** 2, axis=2) / var
+    tail = 100 * (1 - confidence) / 2
+    return {
+        "S1": S1[:, 0],
+        "ST": ST[:, 0],
+        "S1_ci": np.nanpercentile(S1[:, 1:], [tail, 100 - tail], axis=1).T,
+        "ST_ci": np.nanpercentile(ST[:, 1:], [tail, 100 - tail], axis=1).T,
+        "n": n,
+    }
+
+
+def morrisIndices(y, steps, points, delta, n_bootstrap=N_BOOTSTRAP, confidence=0.95, seed=None):
+    """
+    Elementary effects from the outputs y (n_trajectories x (k + 1)). Returns {"mu", "mu_star", "sigma", "mu_star_ci"}.
+    Trajectories with a nan output are dropped.
+    """
+    n_traj, k = steps.shape
+    ok = np.all(np.isfinite(y), axis=1)
+    y, steps, points = y[ok], steps[ok], points[ok]
+    # Which way parameter steps[t, j] moved between point j and j + 1.
+    t = np.arange(len(y))[:, np.newaxis]
+    direction = np.sign(points[t, np.arange(1, k + 1), steps] - points[t, np.arange(k), steps])
+    effects = np.empty((len(y), k))
+    effects[t, steps] = np.diff(y, axis=1) * direction / delta
+
+    rng = np.random.default_rng(seed)
+    idx = rng.integers(0, len(y), size=(n_bootstrap, len(y)))
+    boot_mu_star = np.mean(np.abs(effects[idx]), axis=1)       # (n_bootstrap, k)
+    tail = 100 * (1 - confidence) / 2
+    return {
+        "mu": effects.mean(axis=0),
+        "mu_star": np.abs(effects).mean(axis=0),
+        "sigma": effects.std(axis=0, ddof=1) if len(y) > 1 else np.full(k, np.nan),
+        "mu_star_ci": np.percentile(boot_mu_star, [tail, 100 - tail], axis=0).T,
+        "n": len(y),
+    }
+
+
+#################################################
+# REPORTS
+
+def runSobol(scenarios, surface_types, param_bounds, n_base=256, seed=None, **solve_kwargs):
+    """Sobol indices of every output for every scenario x surface. Returns a long DataFrame."""
+    names = list(param_bounds)
+    k = len(names)
+    rows = []
+    for scenario in scenarios:
+        for surface in surface_types:
+            A, B, AB = saltelliDesign(n_base, k, seed=seed)
+            unit = np.vstack([A, B, AB.reshape(-1, k)])
+            out = evaluatePlan(toPlan(unit, scenario, surface, param_bounds), **solve_kwargs)
+            for output in OUTPUTS:
+                y = out[output]
+                idx = sobolIndices(y[:n_base], y[n_base:2 * n_base], y[2 * n_base:].reshape(k, n_base), seed=seed)
+                for i, name in enumerate(names):
+                    rows.append({"Scenario": scenario, "Surface": surface, "Output": output, "Parameter": name,
+                                 "S1": idx["S1"][i], "S1_ci_lower": idx["S1_ci"][i, 0], "S1_ci_upper": idx["S1_ci"][i, 1],
+                                 "ST": idx["ST"][i], "ST_ci_lower": idx["ST_ci"][i, 0], "ST_ci_upper": idx["ST_ci"][i, 1],
+                                 "N": idx["n"]})
+    return pd.DataFrame(rows)
+
+
+def runMorris(scenarios, surface_types, param_bounds, n_trajectories=20, levels=4, seed=None, **solve_kwargs):
+    """Morris screening of every output for every scenario x surface. Returns a long DataFrame."""
+    names = list(param_bounds)
+    k = len(names)
+    rows = []
+    for scenario in scenarios:
+        for surface in surface_types:
+            points, steps, delta = morrisDesign(n_trajectories, k, levels=levels, seed=seed)
+            out = evaluatePlan(toPlan(points.reshape(-1, k), scenario, surface, param_bounds), **solve_kwargs)
+            for output in OUTPUTS:
+                idx = morrisIndices(out[output].reshape(n_trajectories, k + 1), steps, points, delta, seed=seed)
+                for i, name in enumerate(names):
+                    rows.append({"Scenario": scenario, "Surface": surface, "Output": output, "Parameter": name,
+                                 "mu": idx["mu"][i], "mu_star": idx["mu_star"][i], "sigma": idx["sigma"][i],
+                                 "mu_star_ci_lower": idx["mu_star_ci"][i, 0], "mu_star_ci_upper": idx["mu_star_ci"][i, 1],
+                                 "Trajectories": idx["n"]})
+    return pd.DataFrame(rows)
+
+
+if __name__ == "__main__":
+    from CEA_automate import scenarios, surface_types, param_bounds, concurrency
+
+    parser = argparse.ArgumentParser(description="Sobol or Morris sensitivity of the model outputs, per scenario.")
+    parser.add_argument("method", choices=("sobol", "morris"))
+    parser.add_argument("report_file")
+    parser.add_argument("--scenarios", nargs="+", default=scenarios)
+    parser.add_argument("--surfaces", nargs="+", default=surface_types)
+    parser.add_argument("--n-base", type=int, default=256, help="Sobol: base sample size (a power of 2).")
+    parser.add_argument("--trajectories", type=int, default=20, help="Morris: number of trajectories.")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    if args.method == "sobol":
+        report = runSobol(args.scenarios, args.surfaces, param_bounds, n_base=args.n_base, seed=args.seed,
+                          concurrency=concurrency)
+    else:
+        report = runMorris(args.scenarios, args.surfaces, param_bounds, n_trajectories=args.trajectories,
+                           seed=args.seed, concurrency=concurrency)
+    report.to_csv(args.report_file, index=False)
+    print(report.to_string(index=False))
@@ -0,0 +1,246 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 19:26:48 2026
+Complex Environmental Acoustics (CEA) modeling.
+Frank McQuarrie, Skidaway Institute of Oceanography
+
+Purpose of script: Build every scenario x surface geometry once, and share it with worker processes without copying.
+The bathymetry (CEA_bathymetry) and surface (CEA_surfaceLevels, ~signalRange x 2 per scenario) arrays are the same
+for every run of a scenario, but a multi-process sweep would rebuild or pickle them for every task. Here the parent
+builds them once and packs them into one block of memory that workers attach to read-only, by name:
+    backend "shm"   multiprocessing.shared_memory. Fastest; one machine only.
+    backend "npy"   a memory-mapped .npy file. Works across nodes on a shared filesystem. CEA_workQueue publishes
+                    each plan's geometries this way into the queue folder, and its workers build every run's
+                    environment from them (runSweep's assets) instead of rebuilding the geometry per group.
+A task then only carries a few scalars (scenario, surface, deltaSS, gradient_depth, ...), and worker memory stays
+flat as cores are added, since every worker maps the same pages.
+The stratified SSP is a 13 x 3 table built from two of those scalars, so it is built in the worker, not shared.
+
+    with AssetStore(scenarios, surface_types) as store:
+        with ProcessPoolExecutor(initializer=initWorker, initargs=(store.handle,)) as pool:
+            pool.map(myTask, rows)      # in myTask: env = workerAssets().env(row["scenario"], row["surface"], ...)
+
+Scripts.
+CEA_automate : current. Runs and saves outputs from propagation modeling.
+CEA_singleExperiment: Run and save a specific model.
+
+CEA_createEnv: Creates an environment for Bellhop to model sound through.
+CEA_ssp: Sets a soundspeed profile. Currently set to create one given stratification strength and depth.
+CEA_surfaceLevels: defines surface waves for the environment.
+
+CEA_rayTracing: Traces (and can plot) sound pathways through the environment.
+CEA_arrivals: Measures signal strength and arrival timing for sound through the environment. Also adds initial power, and given a detection threshold, can define a ray as detectable or not.
+******CEA_sharedAssets: Builds scenario geometries once and shares them read-only with worker processes.
+"""
+
+import os
+import uuid
+import numpy as np
+from multiprocessing import shared_memory
+from CEA_createEnv import buildGeometry, buildSSP, envFromGeometry
+
+# Geometry values that are the same for every run of a scenario x surface, and are kept in the (small) manifest.
+SCALAR_KEYS = ("topDescrip", "botDescrip", "signalRange", "rx_range", "tx_depth", "rx_depth")
+
+#################################################
+# PARENT: build and publish
+
+class AssetStore:
+    """
+    Builds the geometries and owns the shared block. Pass store.handle (small and picklable) to the workers.
+    Closing the store frees the shared memory, so keep it open until the workers are done.
+    """
+
+    def __init__(self, scenarios, surface_types, backend="shm", folder=None, tx_depth=None, rx_depth=None):
+        if backend not in ("shm", "npy"):
+            raise ValueError(f"Invalid backend '{backend}'. Must be 'shm' or 'npy'.")
+        arrays, entries = _buildAll(scenarios, surface_types, tx_depth, rx_depth)
+
+        # One flat float64 block; each array is a contiguous slice of it.
+        layout = {}
+        size = 0
+        for name, arr in arrays.items():
+            layout[name] = (size, arr.shape)
+            size += arr.size
+
+        self._shm = None
+        if backend == "shm":
+            self._shm = shared_memory.SharedMemory(create=True, size=max(size, 1) * 8, name=f"cea_{uuid.uuid4().hex[:16]}")
+            block = np.ndarray((size,), dtype=np.float64, buffer=self._shm.buf)
+            location = self._shm.name
+        else:
+            folder = folder or "."
+            os.makedirs(folder, exist_ok=True)
+            location = os.path.abspath(os.path.join(folder, "scenarioAssets.npy"))
+            block = np.lib.format.open_memmap(location, mode="w+", dtype=np.float64, shape=(size,))
+
+        for name, arr in arrays.items():
+            offset, shape = layout[name]
+            block[offset:offset + arr.size] = arr.ravel()
+        if backend == "npy":
+            block.flush()
+        del block  # Drop our view, so the shared memory can be closed later.
+
+        self.handle = {
+            "backend": backend,
+            "location": location,
+            "size": size,
+            "layout": {name: [offset, list(shape)] for name, (offset, shape) in layout.items()},
+            "entries": entries,
+        }
+
+    @property
+    def nbytes(self):
+        return self.handle["size"] * 8
+
+    def close(self):
+        """Free the shared memory (the .npy file of the "npy" backend is left for the caller)."""
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _buildAll(scenarios, surface_types, tx_depth, rx_depth):
+    """
+    Every geometry, with each distinct array stored once: the bottom per scenario, the surface per scenario x surface
+    (a surface spans its scenario's range). Returns ({array name: array}, {entry key: entry}).
+    """
+    arrays = {}
+    entries = {}
+    for scenario in scenarios:
+        for surface_type in surface_types:
+            geometry = buildGeometry(surface_type=surface_type, scenario=scenario, tx_depth=tx_depth, rx_depth=rx_depth)
+            bottom_name = f"bottom/{scenario}"
+            surface_name = f"surface/{scenario}/{surface_type}"
+            arrays.setdefault(bottom_name, np.asarray(geometry["bottom"], dtype=np.float64))
+            arrays[surface_name] = np.asarray(geometry["surface"], dtype=np.float64)
+            entry = {k: _plain(geometry[k]) for k in SCALAR_KEYS}
+            entry["bottom"] = bottom_name
+            entry["surface"] = surface_name
+            entries[_entryKey(scenario, surface_type)] = entry
+    return arrays, entries
+
+
+def _entryKey(scenario, surface_type):
+    return f"{scenario}|{surface_type}"
+
+
+def _plain(value):
+    return value.item() if isinstance(value, np.generic) else value
+
+
+#################################################
+# WORKER: attach and use
+
+class ScenarioAssets:
+    """
+    A worker's read-only view of a published AssetStore. Use attachAssets() rather than making these directly,
+    so each process attaches only once.
+    """
+
+    def __init__(self, handle):
+        self.handle = handle
+        self._shm = None
+        if handle["backend"] == "shm":
+            self._shm = _attachSharedMemory(handle["location"])
+            block = np.ndarray((handle["size"],), dtype=np.float64, buffer=self._shm.buf)
+            block.flags.writeable = False
+        else:
+            block = np.load(handle["location"], mmap_mode="r")
+        self._arrays = {name: block[offset:offset + int(np.prod(shape))].reshape(shape)
+                        for name, (offset, shape) in handle["layout"].items()}
+
+    def geometry(self, scenario, surface_type, deltaSS=4, gradient_depth=6):
+        """
+        Same dict as CEA_createEnv.buildGeometry, with the bottom and surface as read-only views of the shared block.
+        """
+        try:
+            entry = self.handle["entries"][_entryKey(scenario, surface_type)]
+        except KeyError:
+            raise ValueError(f"Scenario '{scenario}' with surface '{surface_type}' was not published to this store.")
+        soundspeed, sspDescrip = buildSSP(deltaSS=deltaSS, gradient_depth=gradient_depth)
+        geometry = {k: entry[k] for k in SCALAR_KEYS}
+        geometry["bottom"] = self._arrays[entry["bottom"]]
+        geometry["surface"] = self._arrays[entry["surface"]]
+        geometry["soundspeed"] = soundspeed
+        geometry["sspDescrip"] = sspDescrip
+        return geometry
+
+    def published(self, scenario, surface_type):
+        """Whether this scenario x surface is in the store."""
+        return _entryKey(scenario, surface_type) in self.handle["entries"]
+
+    def env(self, scenario, surface_type, deltaSS=4, gradient_depth=6, **env_kwargs):
+        """Bellhop environment for one run. env_kwargs go to envFromGeometry (frequency, nBeams, bottom_*)."""
+        return envFromGeometry(self.geometry(scenario, surface_type, deltaSS, gradient_depth), **env_kwargs)
+
+
+def _attachSharedMemory(name):
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)  # Python 3.13+
+    except TypeError:
+        # Before 3.13, attaching also registers the block with the resource tracker (on POSIX), which then unlinks it
+        # when this worker exits, while the parent and other workers still use it. The parent owns the block, so
+        # undo the registration straight after attaching.
+        shm = shared_memory.SharedMemory(name=name)
+        if os.name == "posix":
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
+
+
+# Stores attached by this process, by location.
+_attached = {}
+
+
+def attachAssets(handle):
+    """The ScenarioAssets for handle, attached once per process and re-used by every task after."""
+    location = handle["location"]
+    if location not in _attached:
+        _attached[location] = ScenarioAssets(handle)
+    return _attached[location]
+
+
+# Handle given to this worker by initWorker.
+_worker_handle = None
+
+
+def initWorker(handle):
+    """Pool initializer: the handle is sent once per worker, so tasks themselves only carry scalars."""
+    global _worker_handle
+    _worker_handle = handle
+    attachAssets(handle)
+
+
+def workerAssets():
+    """The store this worker was initialized with (see initWorker)."""
+    if _worker_handle is None:
+        raise RuntimeError("No scenario assets attached. Start the pool with initializer=initWorker.")
+    return attachAssets(_worker_handle)
+
+
+def _demoTask(row):
+    env = workerAssets().env(row["scenario"], row["surface"], deltaSS=row["deltaSS"], gradient_depth=row["gradient_depth"])
+    return env["surface"].shape
+
+
+if __name__ == "__main__":
+    import pickle
+    from concurrent.futures import ProcessPoolExecutor
+    from CEA_automate import scenarios, surface_types
+
+    with AssetStore(scenarios, surface_types) as store:
+        print(f"Published {len(store.handle['entries'])} geometries in {store.nbytes / 1e3:.0f} kB of shared memory")
+        row = {"scenario": scenarios[0], "surface": surface_types[0], "deltaSS": 4, "gradient_depth": 6}
+        geometry = buildGeometry(surface_type=row["surface"], scenario=row["scenario"])
+        print(f"Per-task payload: {len(pickle.dumps(row))} bytes, instead of {len(pickle.dumps(geometry))} bytes for the geometry")
+        with ProcessPoolExecutor(max_workers=2, initializer=initWorker, initargs=(store.handle,)) as pool:
+            shapes = list(pool.map(_demoTask, [row] * 8))
+        print(f"Workers built {len(shapes)} environments from the shared geometry")
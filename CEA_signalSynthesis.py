@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 23:58:47 2026
+Complex Environmental Acoustics (CEA) modeling.
+Frank McQuarrie, Skidaway Institute of Oceanography
+
+Purpose of script: Whether a tag's transmission actually decodes, not just how many arrivals are loud enough.
+A VR2 receiver decodes a pulse-position (PPM) train of 69 kHz pulses. The arrivals from calculateArrivals are the
+channel's impulse response: each one is a delayed (time_of_arrival), scaled and phase-shifted (arrival_amplitude)
+copy of whatever was sent. Here the train is sent through that channel:
+    impulse response   every arrival at its delay, relative to the first, at baseband: amplitude x source level,
+                       less SBL per surface bounce, with the carrier phase of its delay. Arrivals landing in the
+                       same sample add up coherently, so multipath can reinforce or cancel.
+    received signal    the pulse train convolved with the impulse response. The train is the same pulse sent
+                       several times, so each run's response to one pulse is computed (scipy's FFT overlap-add
+                       oaconvolve, a whole batch of runs in one call) and added in at every pulse time.
+    decoding           levels are clipped at 0 dB, as in processArrivals. A pulse is heard if the received level
+                       reaches the detection threshold anywhere in its window (the pulse plus the receiver's
+                       blanking time after it). Energy that reaches the threshold outside every window is a false
+                       pulse, and the train is not decoded. Decoded means every pulse heard and no false pulses.
+Runs come as a CompactArrivals (so a whole sweep's arrivals are used where they are, with no per-run tables) or as
+a list of arrivals DataFrames. A 10k-run sweep takes a few seconds. Each run is decoded with its own SBL and detection
+threshold where its CompactArrivals metadata has them (runSweep stores every plan row's), else with the arguments.
+
+The pulse timing below is an example 8-pulse code. Use your tags' pulse times, length and your receiver's blanking.
+
+Scripts.
+CEA_automate : current. Runs and saves outputs from propagation modeling.
+CEA_singleExperiment: Run and save a specific model.
+
+CEA_createEnv: Creates an environment for Bellhop to model sound through.
+CEA_ssp: Sets a soundspeed profile. Currently set to create one given stratification strength and depth.
+CEA_surfaceLevels: defines surface waves for the environment.
+
+CEA_rayTracing: Traces (and can plot) sound pathways through the environment.
+CEA_arrivals: Measures signal strength and arrival timing for sound through the environment. Also adds initial power, and given a detection threshold, can define a ray as detectable or not.
+CEA_compactArrivals: Keeps a whole sweep's arrivals in memory in a compact columnar form.
+******CEA_signalSynthesis: Sends the tag's pulse train through each run's arrivals and decides whether it decodes.
+
+Usage:
+    python CEA_signalSynthesis.py <CompactArrivals folder> [--SBL 5] [--threshold 50] [--out decodes.csv]
+    --SBL and --threshold replace every run's own values; without them each run keeps the ones it was run with.
+"""
+
+import argparse
+import numpy as np
+from CEA_lazy import lazyModule
+from CEA_compactArrivals import CompactArrivals
+# Imported on first use (see CEA_lazy).
+pd = lazyModule("pandas")
+signal = lazyModule("scipy.signal")
+
+CARRIER = 69000             # (Hz) Tag frequency
+SAMPLE_RATE = 10000         # (Hz) Baseband sample rate; the pulses' envelope, not the 69 kHz carrier.
+PULSE_LENGTH = 0.01         # (s)
+PULSE_TIMES = np.cumsum([0, 0.31, 0.26, 0.42, 0.29, 0.35, 0.27, 0.38])  # (s) Start of each pulse (example code)
+BLANKING = 0.05             # (s) After a pulse, the receiver ignores further energy for this long.
+MAX_SPREAD = 0.5            # (s) Arrivals later than this after the first are left out.
+BATCH_SIZE = 256            # Runs convolved at once.
+
+RESULT_COLUMNS = ["Decoded", "Pulses_Heard", "Min_Pulse_dB", "Interference_dB", "SIR_dB", "Delay_Spread_ms"]
+
+#################################################
+
+def impulseResponses(times, amplitudes, surface_bounces, offsets, SBL=0, low_power_SL=142, carrier=CARRIER,
+                     fs=SAMPLE_RATE, max_spread=MAX_SPREAD):
+    """
+    Baseband impulse responses (uPa, relative to each run's first arrival) of many runs at once, shape
+    (runs, samples), and each run's delay spread (s). The arrivals of every run are in flat arrays, run k being
+    [offsets[k], offsets[k + 1]) as in CompactArrivals. SBL is one value for all runs or one per run.
+    """
+    offsets = np.asarray(offsets)
+    counts = np.diff(offsets)
+    n_runs = len(counts)
+    run = np.repeat(np.arange(n_runs), counts)
+    times = np.asarray(times, dtype=float)
+
+    first = np.full(n_runs, np.nan)
+    last = np.full(n_runs, np.nan)
+    filled = counts > 0
+    if filled.any():
+        first[filled] = np.minimum.reduceat(times, offsets[:-1][filled])
+        last[filled] = np.maximum.reduceat(times, offsets[:-1][filled])
+    delay = times - first[run]
+
+    keep = delay <= max_spread
+    sample = np.round(delay[keep] * fs).astype(int)
+    SBL = np.broadcast_to(np.asarray(SBL, dtype=float), (n_runs,))[run[keep]]
+    level = 10 ** ((low_power_SL - SBL * np.asarray(surface_bounces, dtype=float)[keep]) / 20)
+    # Passband delay -> baseband phase exp(-2 pi i f t), from the absolute time so paths keep their relative phase.
+    coefficient = np.asarray(amplitudes, dtype=complex)[keep] * level * np.exp(-2j * np.pi * carrier * times[keep])
+
+    irs = np.zeros((n_runs, (sample.max() + 1) if len(sample) else 1), dtype=complex)
+    np.add.at(irs, (run[keep], sample), coefficient)
+    return irs, np.minimum(last - first, max_spread)
+
+
+def receivedEnvelopes(irs, pulse_times=PULSE_TIMES, pulse_length=PULSE_LENGTH, fs=SAMPLE_RATE):
+    """Received envelope (uPa) of every run: the pulse train through each impulse response, as (runs, samples)."""
+    starts = np.round(np.asarray(pulse_times) * fs).astype(int)
+    pulse = np.ones(max(int(round(pulse_length * fs)), 1))
+    response = signal.oaconvolve(irs, pulse[None, :], axes=-1)
+    received = np.zeros((len(irs), starts[-1] + response.shape[1]), dtype=complex)
+    for s in starts:
+        received[:, s:s + response.shape[1]] += response
+    return np.abs(received)
+
+
+def decode(envelopes, detectionThreshold=50, pulse_times=PULSE_TIMES, pulse_length=PULSE_LENGTH, fs=SAMPLE_RATE,
+           blanking=BLANKING):
+    """
+    Decode every run's received envelope. Returns a dict of arrays, one value per run: pulses heard, the weakest
+    pulse and the strongest false pulse (dB re 1 uPa), their ratio (dB) and whether the train decoded.
+    detectionThreshold is one value for all runs or one per run.
+    """
+    starts = np.round(np.asarray(pulse_times) * fs).astype(int)
+    window = int(round((pulse_length + blanking) * fs))
+    n_samples = envelopes.shape[1]
+
+    # Pulse windows as one index array, (pulses, window samples).
+    in_window = np.minimum(starts[:, None] + np.arange(window), n_samples - 1)
+    pulse_level = envelopes[:, in_window].max(axis=2)
+
+    outside = np.ones(n_samples, dtype=bool)
+    outside[in_window.ravel()] = False
+    interference = envelopes[:, outside].max(axis=1) if outside.any() else np.zeros(len(envelopes))
+
+    threshold = 10 ** (np.broadcast_to(np.asarray(detectionThreshold, dtype=float), (len(envelopes),)) / 20)
+    heard = (pulse_level >= threshold[:, None]).sum(axis=1)
+    min_pulse_dB = 20 * np.log10(np.maximum(pulse_level.min(axis=1), 1))
+    interference_dB = 20 * np.log10(np.maximum(interference, 1))
+    return {
+        "Decoded": (heard == len(starts)) & (interference < threshold),
+        "Pulses_Heard": heard,
+        "Min_Pulse_dB": min_pulse_dB,
+        "Interference_dB": interference_dB,
+        "SIR_dB": min_pulse_dB - interference_dB,
+    }
+
+
+def runValues(run_meta, key, default):
+    """One value per run: run_meta's key where the run has it, default where it does not."""
+    return np.array([default if meta.get(key) is None else meta[key] for meta in run_meta], dtype=float)
+
+
+def synthesize(
+    runs,                       # CompactArrivals, or a list of arrivals DataFrames
+    SBL = 0,                    # Surface bubble loss (dB) of runs that do not carry their own
+    detectionThreshold = 50,    # Det. threshold (dB) representing background noise, likewise
+    low_power_SL = 142,         # Tag source level (dB), as in processArrivals
+    pulse_times = PULSE_TIMES,
+    pulse_length = PULSE_LENGTH,
+    blanking = BLANKING,
+    fs = SAMPLE_RATE,
+    carrier = CARRIER,
+    batch_size = BATCH_SIZE
+):
+    """
+    Decode results of every run, one row per run (in the order given). A run whose metadata (run_meta) has SBL or
+    detectionThreshold is decoded with those; SBL and detectionThreshold are for runs without.
+    """
+    if not isinstance(runs, CompactArrivals):
+        compact = CompactArrivals()
+        for arrivals in runs:
+            compact.append(arrivals)
+        runs = compact
+
+    parts = []
+    for start in range(0, len(runs), batch_size):
+        batch = runs[start:start + batch_size]
+        run_SBL = runValues(batch.run_meta, "SBL", SBL)
+        run_threshold = runValues(batch.run_meta, "detectionThreshold", detectionThreshold)
+        irs, spread = impulseResponses(batch.column("time_of_arrival"), batch.column("arrival_amplitude"),
+                                       batch.column("surface_bounces"), batch.offsets, SBL=run_SBL,
+                                       low_power_SL=low_power_SL, carrier=carrier, fs=fs)
+        envelopes = receivedEnvelopes(irs, pulse_times, pulse_length, fs)
+        result = decode(envelopes, run_threshold, pulse_times, pulse_length, fs, blanking)
+        result["Delay_Spread_ms"] = spread * 1000
+        parts.append(pd.DataFrame(result, columns=RESULT_COLUMNS, index=batch.run_ids))
+    if not parts:
+        return pd.DataFrame(columns=RESULT_COLUMNS)
+    return pd.concat(parts)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Decode the tag's pulse train through every stored run's arrivals.")
+    parser.add_argument("folder", help="Folder saved by CompactArrivals.save")
+    parser.add_argument("--SBL", type=float, help="Use this SBL (dB) for every run instead of its own.")
+    parser.add_argument("--threshold", type=float, help="Use this threshold (dB) for every run instead of its own.")
+    parser.add_argument("--SL", type=float, default=142)
+    parser.add_argument("--blanking", type=float, default=BLANKING)
+    parser.add_argument("--out", help="Save the per-run results here (CSV).")
+    args = parser.parse_args()
+
+    runs = CompactArrivals.load(args.folder)
+    overrides = {key: value for key, value in (("SBL", args.SBL), ("detectionThreshold", args.threshold))
+                 if value is not None}
+    runs.run_meta = [dict(meta, **overrides) for meta in runs.run_meta]
+    results = synthesize(runs, low_power_SL=args.SL, blanking=args.blanking)
+    print(f"{len(results)} runs, {results['Decoded'].mean():.1%} decoded")
+    if args.out:
+        results.to_csv(args.out, index_label="Run")
@@ -18,31 +18,38 @@ CEA_rayTracing: Traces (and can plot) sound pathways through the environment.
 CEA_arrivals: Measures signal strength and arrival timing for sound through the environment. Also adds initial power, and given a detection threshold, can define a ray as detectable or not.
 @author: fmm17241
 """
-import os
-# Script location
-os.chdir(r"C:\*")
-import arlpy.uwapm as pm
 import numpy as np
-from importlib import reload
-import matplotlib.pyplot as plt
-import CEA_createEnv
-import CEA_bathymetry 
-import CEA_surfaceLevels
-import CEA_ssp
-import CEA_rayTracing
-import CEA_arrivals
-reload(CEA_createEnv)
-reload(CEA_bathymetry)
-reload(CEA_ssp)
-reload(CEA_surfaceLevels)
-reload(CEA_rayTracing)
-reload(CEA_arrivals)
+from CEA_lazy import lazyModule
+# Imported on first use (see CEA_lazy).
+pm = lazyModule("arlpy.uwapm")
+plt = lazyModule("matplotlib.pyplot")
+
+# Set True when editing the CEA modules in an open console (e.g. Spyder), to pick up your changes without
+# restarting it. Reloading re-runs every module, so leave it off otherwise.
+RELOAD_MODULES = False
+if RELOAD_MODULES:
+    from importlib import reload
+    import CEA_createEnv
+    import CEA_bathymetry
+    import CEA_surfaceLevels
+    import CEA_ssp
+    import CEA_rayTracing
+    import CEA_arrivals
+    reload(CEA_createEnv)
+    reload(CEA_bathymetry)
+    reload(CEA_ssp)
+    reload(CEA_surfaceLevels)
+    reload(CEA_rayTracing)
+    reload(CEA_arrivals)
 from CEA_createEnv import createEnv
 from CEA_rayTracing import rayTracing
 from CEA_arrivals import calculateArrivals
+from CEA_runContext import RunContext
 
-# Output Directory
-output_dir = r"C:\path\scenarioData"
+# Bellhop's location (full path, or name if on your PATH). Outputs go to the folder named by the CEA_OUTPUT
+# environment variable (default: the current folder), which is created just before the first solve. Run from
+# anywhere; nothing here changes directory. You need to have previously run the AT makefile to create executables.
+context = RunContext(bellhop_exe=r"C:\path\executables\bellhop.exe")
 
 
 # CREATING THE ENVIRONMENT TO WORK IN
@@ -79,12 +86,14 @@ speed_data = soundspeed.values
 # MODELING RAYS THROUGH THE ENVIRONMENT
 # Range sets distance to trace and monitor.
 # env is built using BDA_createEnv's "createEnv" function.
+context.makeDirs()
 #sumBDA, bdaDataFrame,percentageRays,rays,rays_per_distance, filtered_rays = rayTracing(signalRange,
 rayTracing(signalRange,
             topDescrip,
             botDescrip,
             sspDescrip,
-            env=env)
+            env=env,
+            context=context)
 
 # Plot each ray. Optional
 #plt.figure(figsize=(10, 5))
@@ -112,7 +121,8 @@ arrivals, binned_countsLow, low_power_dB_hist, confidence_interval, \
                                                                             sspDescrip,
                                                                             env,
                                                                             detectionThreshold, 
-                                                                            SBL)
+                                                                            SBL,
+                                                                            context=context)
 
 ##########
 
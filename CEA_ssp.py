@@ -21,7 +21,27 @@ CEA_arrivals: Measures signal strength and arrival timing for sound through the
 
 ###########################################################
 import numpy as np
-import pandas as pd
+from CEA_lazy import lazyModule
+pd = lazyModule("pandas")  # Imported on first use (see CEA_lazy).
+
+def ssp_depths(depth_range=(0, 22), step=2):
+    """
+    Depths the stratified SSP is defined at: -5 m, then every `step` m through depth_range.
+    """
+    # Add -5 m explicitly and concatenate with desired profile depths
+    profile_depths = np.arange(depth_range[0], depth_range[1] + step, step)
+    return np.insert(profile_depths, 0, -5)
+
+
+def effective_gradient_depth(gradient_depth, depth_range=(0, 22)):
+    """
+    The SSP only changes at its grid depths, so every gradient_depth between two grid depths gives the same profile.
+    Returns the deepest grid depth still in the surface layer, which stands in for all of them.
+    """
+    depths = ssp_depths(depth_range)
+    inside = depths[depths <= gradient_depth]
+    return float(inside[-1]) if len(inside) else float(depths[0] - 1)
+
 
 def build_stratified_ssp(deltaSS, gradient_depth=6, base_speed=1513.5, depth_range=(0, 22), range_steps=[-10, 0, 2100]):
     """
@@ -29,9 +49,7 @@ def build_stratified_ssp(deltaSS, gradient_depth=6, base_speed=1513.5, depth_ran
     """
     top_speed = base_speed + deltaSS  # Surface sound speed
 
-    # Add -5 m explicitly and concatenate with desired profile depths
-    profile_depths = np.arange(depth_range[0], depth_range[1] + 2, 2)
-    depths = np.insert(profile_depths, 0, -5)
+    depths = ssp_depths(depth_range)
 
     ssp_profile = []
 
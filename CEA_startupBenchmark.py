@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 19:02:14 2026
+Complex Environmental Acoustics (CEA) modeling.
+Frank McQuarrie, Skidaway Institute of Oceanography
+
+Purpose of script: Measure how long the CEA modules take to start. Each module is imported in a fresh Python process
+(so nothing is cached from a previous import), several times, with heavy imports deferred (the default, see CEA_lazy)
+and with CEA_EAGER_IMPORTS=1 for comparison. Also lists which heavy libraries each import actually pulled in.
+
+Scripts.
+CEA_automate : current. Runs and saves outputs from propagation modeling.
+CEA_singleExperiment: Run and save a specific model.
+
+CEA_createEnv: Creates an environment for Bellhop to model sound through.
+CEA_ssp: Sets a soundspeed profile. Currently set to create one given stratification strength and depth.
+CEA_surfaceLevels: defines surface waves for the environment.
+
+CEA_rayTracing: Traces (and can plot) sound pathways through the environment.
+CEA_arrivals: Measures signal strength and arrival timing for sound through the environment. Also adds initial power, and given a detection threshold, can define a ray as detectable or not.
+******CEA_startupBenchmark: Times cold imports of the CEA modules, with and without deferred imports.
+
+Usage:
+    python CEA_startupBenchmark.py
+    python CEA_startupBenchmark.py CEA_automate CEA_workQueue --repeats 10
+"""
+
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+# Modules timed when none are given.
+DEFAULT_MODULES = ("CEA_automate", "CEA_asyncRunner", "CEA_arrivals", "CEA_createEnv", "CEA_workQueue", "CEA_gallery")
+
+# Libraries worth knowing about when they are imported.
+HEAVY_LIBRARIES = ("pandas", "scipy.stats", "matplotlib", "matplotlib.pyplot", "bokeh", "arlpy", "arlpy.uwapm", "pyDOE2")
+
+# Run in the child process: import the module, report the time taken and what was imported.
+_CHILD = """
+import sys, time, json
+t0 = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - t0
+print(json.dumps({{"seconds": seconds, "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+#################################################
+
+def timeImport(module, eager=False, python=sys.executable):
+    """
+    Import module once in a fresh interpreter. Returns {"seconds", "loaded"}, or {"error"} if the import failed.
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, CEA_EAGER_IMPORTS="1" if eager else "0")
+    env["PYTHONPATH"] = os.pathsep.join(p for p in (here, env.get("PYTHONPATH")) if p)
+    code = _CHILD.format(module=module, heavy=HEAVY_LIBRARIES)
+    proc = subprocess.run([python, "-c", code], capture_output=True, text=True, env=env,
+                          cwd=here)
+    if proc.returncode != 0:
+        return {"error": (proc.stderr.strip().splitlines() or ["unknown error"])[-1]}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def benchmark(modules=DEFAULT_MODULES, repeats=5):
+    """
+    Median cold import time of every module, deferred vs eager. Returns a list of dicts, one per module.
+    """
+    results = []
+    for module in modules:
+        row = {"module": module}
+        for mode, eager in (("deferred", False), ("eager", True)):
+            runs = [timeImport(module, eager=eager) for _ in range(repeats)]
+            errors = [r["error"] for r in runs if "error" in r]
+            if errors:
+                row[mode] = None
+                row[f"{mode}_error"] = errors[0]
+                continue
+            row[mode] = statistics.median(r["seconds"] for r in runs)
+            row[f"{mode}_loaded"] = runs[-1]["loaded"]
+        results.append(row)
+    return results
+
+
+def printReport(results):
+    print(f"{'module':<20}{'deferred (s)':>14}{'eager (s)':>12}{'speed-up':>10}   heavy libraries loaded (deferred)")
+    for row in results:
+        deferred, eager = row["deferred"], row["eager"]
+        if deferred is None or eager is None:
+            print(f"{row['module']:<20}  FAILED: {row.get('deferred_error') or row.get('eager_error')}")
+            continue
+        speedup = f"{eager / deferred:.1f}x" if deferred > 0 else "-"
+        loaded = ", ".join(row["deferred_loaded"]) or "none"
+        print(f"{row['module']:<20}{deferred:>14.3f}{eager:>12.3f}{speedup:>10}   {loaded}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time cold imports of the CEA modules.")
+    parser.add_argument("modules", nargs="*", default=list(DEFAULT_MODULES))
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    printReport(benchmark(args.modules, repeats=args.repeats))
@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 23:58:12 2026
+Complex Environmental Acoustics (CEA) modeling.
+Frank McQuarrie, Skidaway Institute of Oceanography
+
+Purpose of script: Average over random sea surfaces instead of modeling one fixed wave.
+A "rough" run with rough_waves is one sinusoid at one phase, so its arrivals depend on where the crests happen to
+fall. Here one environment is solved under K random surfaces drawn from a Pierson-Moskowitz or JONSWAP spectrum
+(CEA_surfaceLevels.spectralSurfaces, all K drawn at once):
+    geometry     built once for the scenario; only the surface changes between realizations.
+    solves       all K go through the async Bellhop runner, several at a time.
+    outputs      each realization's detectable fraction, average signal and dB histogram, from its arrivals directly
+                 (the same arithmetic as processArrivals, without the tables and printing).
+    averages     mean, spread and confidence interval over the realizations (CEA_onlineStats), the pooled detectable
+                 fraction of all arrivals, and the average arrivals per dB bin.
+K = 50 realizations costs 50 Bellhop solves; the surfaces and the averaging take milliseconds.
+
+Scripts.
+CEA_automate : current. Runs and saves outputs from propagation modeling.
+CEA_singleExperiment: Run and save a specific model.
+
+CEA_createEnv: Creates an environment for Bellhop to model sound through.
+CEA_ssp: Sets a soundspeed profile. Currently set to create one given stratification strength and depth.
+CEA_surfaceLevels: defines surface waves for the environment.
+
+CEA_rayTracing: Traces (and can plot) sound pathways through the environment.
+CEA_arrivals: Measures signal strength and arrival timing for sound through the environment. Also adds initial power, and given a detection threshold, can define a ray as detectable or not.
+CEA_onlineStats: Mergeable running statistics and histograms for sweep outputs, updated as runs finish.
+******CEA_surfaceEnsemble: Solves one environment under many random sea surfaces and averages the results.
+
+Usage:
+    python CEA_surfaceEnsemble.py <scenario> [--realizations 50] [--spectrum JONSWAP] [--wind-speed 8]
+                                  [--fetch 20000] [--SBL 5] [--threshold 50] [--seed 1] [--out ensemble.csv]
+"""
+
+import argparse
+import numpy as np
+from CEA_lazy import lazyModule
+from CEA_surfaceLevels import SPECTRA, spectralSurfaces, significantWaveHeight
+from CEA_createEnv import buildGeometry, envFromGeometry
+from CEA_asyncRunner import runJobs
+from CEA_onlineStats import RunningStats, HistogramSketch
+from CEA_arrivals import arrivalLevels, clippedLevels
+pd = lazyModule("pandas")  # Imported on first use (see CEA_lazy).
+
+REALIZATION_COLUMNS = ["Realization", "Hs_m", "N_Arrivals", "Detectable", "Detectable_Fraction", "Avg_Signal_dB"]
+
+#################################################
+
+def realizationOutputs(arrivals, SBL, detectionThreshold, low_power_SL=142):
+    """(clipped low-power dB of every arrival, detectable count, average signal dB) of one solve."""
+    low_power_dB = arrivalLevels(arrivals["arrival_amplitude"], arrivals["surface_bounces"], SBL, low_power_SL)
+    if len(low_power_dB) == 0:
+        return low_power_dB, 0, np.nan
+    clipped = clippedLevels(low_power_dB)
+    return clipped, int(np.count_nonzero(clipped >= detectionThreshold)), float(low_power_dB.mean())
+
+
+def runEnsemble(
+    scenario,                   # Scenario from CEA_createEnv
+    n_realizations = 50,        # Number of random surfaces (K)
+    spectrum = "JONSWAP",       # "PM" (fully developed) or "JONSWAP" (fetch-limited)
+    wind_speed = 8.0,           # (m/s)
+    fetch = 20000,              # (m) JONSWAP only
+    SBL = 0,                    # Surface bubble loss (dB)
+    detectionThreshold = 50,    # Det. threshold (dB) representing background noise.
+    deltaSS = 4,                # Strength of sound speed (m/s) stratification.
+    gradient_depth = 6,         # Depth (m) of sound speed stratification.
+    bottom_absorption = 0,
+    nBeams = 1000,
+    seed = None,                # Same seed, same surfaces.
+    concurrency = None,         # Bellhop processes at once; defaults to one per core.
+    timeout = 600,
+    retries = 1,
+    context = None              # RunContext: Bellhop's location and scratch folder (see CEA_runContext).
+):
+    """
+    Solve the scenario under n_realizations random surfaces. Returns (summary, realizations): a dict of the
+    ensemble averages, and a table with one row per solved realization.
+    """
+    if spectrum not in SPECTRA:
+        raise ValueError(f"Invalid spectrum '{spectrum}'. Must be one of {list(SPECTRA)}.")
+    spectrum_kwargs = {"wind_speed": wind_speed}
+    if spectrum == "JONSWAP":
+        spectrum_kwargs["fetch"] = fetch
+
+    geometry = buildGeometry(surface_type="flat_surface", scenario=scenario, deltaSS=deltaSS,
+                             gradient_depth=gradient_depth)
+    surfaces = spectralSurfaces(geometry["signalRange"], n_realizations, spectrum, seed=seed, **spectrum_kwargs)
+    heights = significantWaveHeight(surfaces)
+    print(f">>> {scenario}: {n_realizations} {spectrum} surfaces, wind {wind_speed} m/s, "
+          f"mean Hs {heights.mean():.2f} m")
+
+    def jobs():
+        for k in range(n_realizations):
+            realization = dict(geometry, surface=surfaces[k], topDescrip=f"{spectrum} {wind_speed:g} m/s #{k}")
+            yield k, envFromGeometry(realization, nBeams=nBeams, bottom_absorption=bottom_absorption)
+
+    rows = []
+    fraction, signal = RunningStats(), RunningStats()
+    histogram = HistogramSketch()
+    totals = {"arrivals": 0, "detectable": 0}
+
+    def on_result(k, arrivals, error):
+        if error is not None:
+            print(f" SKIPPING realization {k} (Bellhop error): {error}")
+            return
+        clipped, detectable, avg_low_dB = realizationOutputs(arrivals, SBL, detectionThreshold)
+        n = len(clipped)
+        rows.append([k, heights[k], n, detectable, detectable / n if n else np.nan, avg_low_dB])
+        fraction.update(rows[-1][4])
+        signal.update(avg_low_dB)
+        histogram.addValues(clipped)
+        totals["arrivals"] += n
+        totals["detectable"] += detectable
+
+    runJobs(jobs(), on_result, concurrency=concurrency, timeout=timeout, retries=retries, context=context)
+
+    realizations = pd.DataFrame(rows, columns=REALIZATION_COLUMNS).sort_values("Realization", ignore_index=True)
+    solved = len(realizations)
+    summary = {
+        "scenario": scenario,
+        "spectrum": spectrum,
+        "wind_speed": wind_speed,
+        "fetch": fetch if spectrum == "JONSWAP" else None,
+        "SBL": SBL,
+        "detectionThreshold": detectionThreshold,
+        "Realizations": n_realizations,
+        "Solved": solved,
+        "Hs_m": float(heights.mean()),
+        "Detectable_Fraction": fraction.mean if fraction.n else np.nan,
+        "Detectable_Fraction_Std": fraction.std,
+        "Detectable_Fraction_CI": fraction.ci(),
+        "Avg_Signal_dB": signal.mean if signal.n else np.nan,
+        "Avg_Signal_dB_Std": signal.std,
+        "Avg_Signal_dB_CI": signal.ci(),
+        # Every arrival of every realization together, rather than the mean of the per-realization fractions.
+        "Pooled_Detectable_Fraction": totals["detectable"] / totals["arrivals"] if totals["arrivals"] else np.nan,
+        "Mean_Arrivals": totals["arrivals"] / solved if solved else np.nan,
+        "Mean_Binned_Counts": pd.Series(histogram.counts / max(solved, 1),
+                                        index=pd.IntervalIndex.from_breaks(histogram.edges, closed="right")),
+    }
+    return summary, realizations
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Average one environment over random sea surfaces.")
+    parser.add_argument("scenario")
+    parser.add_argument("--realizations", type=int, default=50)
+    parser.add_argument("--spectrum", default="JONSWAP", choices=list(SPECTRA))
+    parser.add_argument("--wind-speed", type=float, default=8.0)
+    parser.add_argument("--fetch", type=float, default=20000)
+    parser.add_argument("--SBL", type=float, default=0)
+    parser.add_argument("--threshold", type=float, default=50)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--concurrency", type=int)
+    parser.add_argument("--out", help="Save the per-realization table here (CSV).")
+    args = parser.parse_args()
+
+    summary, realizations = runEnsemble(args.scenario, n_realizations=args.realizations, spectrum=args.spectrum,
+                                        wind_speed=args.wind_speed, fetch=args.fetch, SBL=args.SBL,
+                                        detectionThreshold=args.threshold, seed=args.seed,
+                                        concurrency=args.concurrency)
+    for key, value in summary.items():
+        if key != "Mean_Binned_Counts":
+            print(f"{key}: {value}")
+    print(summary["Mean_Binned_Counts"].round(2).to_string())
+    if args.out:
+        realizations.to_csv(args.out, index=False)
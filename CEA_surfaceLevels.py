@@ -5,6 +5,9 @@ Complex Environmental Acoustics (CEA) modeling.
 Frank McQuarrie, Skidaway Institute of Oceanography
 
 Purpose of script: Define the surface waves for acoustic modeling. These can be changed to fit anything you would like, just a few examples chosen.
+mid_waves and rough_waves are single sinusoids, so every run sees the same wave. spectralSurfaces draws random sea
+surfaces from a Pierson-Moskowitz or JONSWAP spectrum instead, many at once, for averaging over wave phase
+(see CEA_surfaceEnsemble).
 
 Scripts.
 CEA_automate : current. Runs and saves outputs from propagation modeling.
@@ -20,6 +23,8 @@ CEA_arrivals: Measures signal strength and arrival timing for sound through the
 
 import numpy as np
 
+G = 9.81  # Gravity (m/s^2)
+
 ##########################
 
 def flat_surface(signal_range, depth=0.0):
@@ -39,6 +44,63 @@ def rough_waves(signal_range, wave_amplitude=1.0, wave_frequency=0.01):
     return np.array([[r, -wave_amplitude * np.sin(2 * np.pi * wave_frequency * r)]
                      for r in np.linspace(0, range_max, num_points)])
 
+##########################
+# Random sea surfaces from a wave spectrum.
+
+# Fully developed sea. wind_speed (m/s) at 19.5 m. Significant wave height is about 0.21 * wind_speed^2 / g.
+def pierson_moskowitz(omega, wind_speed=8.0):
+    omega0 = G / wind_speed
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        S = 8.1e-3 * G**2 / omega**5 * np.exp(-0.74 * (omega0 / omega)**4)
+    return np.where(omega > 0, S, 0.0)
+
+# Fetch-limited sea (JONSWAP). wind_speed (m/s) at 10 m, fetch (m) the distance the wind has blown over.
+def jonswap(omega, wind_speed=8.0, fetch=20000, gamma=3.3):
+    alpha = 0.076 * (G * fetch / wind_speed**2) ** -0.22
+    omega_p = 22 * (G**2 / (wind_speed * fetch)) ** (1 / 3)
+    sigma = np.where(omega <= omega_p, 0.07, 0.09)
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        peak = gamma ** np.exp(-(omega - omega_p)**2 / (2 * sigma**2 * omega_p**2))
+        S = alpha * G**2 / omega**5 * np.exp(-1.25 * (omega_p / omega)**4) * peak
+    return np.where(omega > 0, S, 0.0)
+
+SPECTRA = {"PM": pierson_moskowitz, "JONSWAP": jonswap}
+
+def spectralSurfaces(signal_range, n_realizations=1, spectrum="JONSWAP", seed=None, **spectrum_kwargs):
+    """
+    n_realizations random surfaces along the transect, shape (n_realizations, points, 2), each in the same
+    [range, depth] form as the surfaces above (1 m spacing, to signal_range + 5 m).
+    Every wave component gets a random phase and all surfaces come from one inverse FFT. Waves are taken to travel
+    along the transect (long-crested), in deep water (omega^2 = g k).
+    spectrum_kwargs go to the spectrum, e.g. wind_speed=10, fetch=30000.
+    """
+    range_max = signal_range + 5
+    num_points = range_max + 1
+    rng = np.random.default_rng(seed)
+
+    # Twice the transect, so the FFT's periodic surface does not repeat along it.
+    n_fft = 2 ** int(np.ceil(np.log2(2 * num_points)))
+    k = 2 * np.pi * np.fft.rfftfreq(n_fft, d=1.0)
+    dk = k[1]
+    omega = np.sqrt(G * k)
+
+    # Frequency spectrum to wavenumber spectrum: S(k) = S(omega) * d(omega)/dk = S(omega) * g / (2 omega).
+    with np.errstate(divide="ignore", invalid="ignore"):
+        S_k = np.where(k > 0, SPECTRA[spectrum](omega, **spectrum_kwargs) * G / (2 * omega), 0.0)
+    amplitude = np.sqrt(2 * S_k * dk)
+    amplitude[-1] = 0.0  # Nyquist
+
+    phases = rng.uniform(0, 2 * np.pi, size=(n_realizations, len(k)))
+    elevation = np.fft.irfft(n_fft / 2 * amplitude * np.exp(1j * phases), n=n_fft, axis=-1)[:, :num_points]
+
+    ranges = np.broadcast_to(np.linspace(0, range_max, num_points), elevation.shape)
+    # Depth of the surface, so a crest is negative (above 0 m), as in the sinusoids above.
+    return np.stack([ranges, -elevation], axis=-1)
+
+def significantWaveHeight(surface):
+    """Hs = 4 x the standard deviation of the surface, for one surface or the last axis of many."""
+    return 4 * np.std(surface[..., 1], axis=-1)
+
 
 
 
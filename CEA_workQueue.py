@@ -0,0 +1,342 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 13:20:06 2026
+Complex Environmental Acoustics (CEA) modeling.
+Frank McQuarrie, Skidaway Institute of Oceanography
+
+Purpose of script: Spread one sweep across many machines. A coordinator writes the full sample plan (scenario,
+surface and the five LHS parameters) into a queue folder on a shared filesystem, split into chunks. Any number of
+workers, on any number of nodes, claim chunks, solve them with CEA_automate's runner and write one result file per
+chunk. A merge step stitches the chunks back into the usual modelOutputs / binnedAmplitudes files.
+
+The queue is only files and atomic renames, so it works on the shared scratch of an HPC allocation with no broker.
+(SQLite was considered, but its locking is not reliable over NFS.)
+    pending/   chunks waiting for a worker
+    claimed/   chunks being solved. The file's modified time is the worker's lease, refreshed while it works.
+               A lease older than lease_seconds means the worker died, and the chunk goes back to pending.
+    done/      finished chunks
+    results/   one modelOutputs and one binnedAmplitudes file per chunk, plus its running statistics (CEA_onlineStats)
+    scenarioAssets.npy   every scenario x surface geometry of the plan, built once by the coordinator
+               (CEA_sharedAssets, "npy" backend). Workers memory-map it, so workers on one node share the pages
+               and none of them rebuilds a geometry.
+
+Scripts.
+CEA_automate : current. Runs and saves outputs from propagation modeling.
+CEA_singleExperiment: Run and save a specific model.
+
+CEA_createEnv: Creates an environment for Bellhop to model sound through.
+CEA_ssp: Sets a soundspeed profile. Currently set to create one given stratification strength and depth.
+CEA_surfaceLevels: defines surface waves for the environment.
+
+CEA_rayTracing: Traces (and can plot) sound pathways through the environment.
+CEA_arrivals: Measures signal strength and arrival timing for sound through the environment. Also adds initial power, and given a detection threshold, can define a ray as detectable or not.
+******CEA_workQueue: Splits a sweep into chunks that workers on any number of nodes claim, solve, and merge.
+
+Usage:
+    python CEA_workQueue.py plan    <queue_dir> --iterations 100000 --chunk-size 200
+    python CEA_workQueue.py worker  <queue_dir>              (start as many as you like, on any node)
+    python CEA_workQueue.py status  <queue_dir>
+    python CEA_workQueue.py merge   <queue_dir> <modelOutputs.csv> <binnedAmplitudes.csv>
+"""
+
+import os
+import json
+import time
+import socket
+import argparse
+import threading
+
+# Seconds a claimed chunk may go without a heartbeat before it is handed to another worker.
+# Keep this well above the time it takes a node to solve a chunk's slowest run, and above any clock skew between nodes.
+LEASE_SECONDS = 1800
+# Seconds a worker waits before looking again when every chunk is claimed but not finished.
+POLL_SECONDS = 30
+
+SUBDIRS = ("pending", "claimed", "done", "results")
+
+#################################################
+# COORDINATOR
+
+def writePlan(queue_dir, plan, chunk_size=200, lease_seconds=LEASE_SECONDS, share_geometry=True):
+    """
+    Split the plan into chunks and write them into the queue. Returns the number of chunks.
+    With share_geometry, the plan's geometries are published into the queue for the workers (see CEA_sharedAssets).
+    """
+    for d in SUBDIRS:
+        os.makedirs(os.path.join(queue_dir, d), exist_ok=True)
+    if os.listdir(os.path.join(queue_dir, "pending")) or os.listdir(os.path.join(queue_dir, "claimed")):
+        raise ValueError(f"Queue '{queue_dir}' already holds a plan. Use a new folder for a new sweep.")
+
+    n_chunks = 0
+    for start in range(0, len(plan), chunk_size):
+        chunk_id = f"chunk_{n_chunks:06d}"
+        rows = plan[start:start + chunk_size]
+        _writeJson(os.path.join(queue_dir, "pending", f"{chunk_id}.json"), {"chunk_id": chunk_id, "first_run": start, "rows": rows})
+        n_chunks += 1
+
+    assets = None
+    if share_geometry:
+        from CEA_sharedAssets import AssetStore
+        scenarios = sorted({row["scenario"] for row in plan})
+        surface_types = sorted({row["surface"] for row in plan})
+        with AssetStore(scenarios, surface_types, backend="npy", folder=queue_dir) as store:
+            assets = store.handle
+
+    _writeJson(os.path.join(queue_dir, "plan.json"), {
+        "n_runs": len(plan),
+        "n_chunks": n_chunks,
+        "chunk_size": chunk_size,
+        "lease_seconds": lease_seconds,
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "assets": assets,
+    })
+    return n_chunks
+
+
+def requeueExpired(queue_dir, lease_seconds=None):
+    """
+    Send chunks whose lease has run out back to pending. Safe for any number of processes to call at once.
+    """
+    lease_seconds = lease_seconds or _planInfo(queue_dir).get("lease_seconds", LEASE_SECONDS)
+    claimed_dir = os.path.join(queue_dir, "claimed")
+    requeued = []
+    now = time.time()
+    for f in os.listdir(claimed_dir):
+        path = os.path.join(claimed_dir, f)
+        try:
+            if now - os.path.getmtime(path) > lease_seconds:
+                os.rename(path, os.path.join(queue_dir, "pending", f))
+                requeued.append(f[:-5])
+        except FileNotFoundError:
+            pass  # Finished or requeued by someone else in the meantime.
+    return requeued
+
+
+def queueStatus(queue_dir):
+    counts = {d: len(os.listdir(os.path.join(queue_dir, d))) for d in ("pending", "claimed", "done")}
+    counts["n_chunks"] = _planInfo(queue_dir).get("n_chunks")
+    return counts
+
+
+def mergeResults(queue_dir, output_file, output_file2, stats_file=None):
+    """
+    Stitch every chunk's results into one modelOutputs and one binnedAmplitudes file, chunk by chunk in plan order.
+    Within a chunk, rows are in the order its runs finished (solves run concurrently), not the plan's; the two files'
+    rows still line up one to one.
+    Lines are copied as text, so this is fast and needs no pandas even for very large sweeps.
+    If stats_file is given, the chunks' running statistics are merged into it as well.
+    """
+    results_dir = os.path.join(queue_dir, "results")
+    merged = {}
+    for suffix, target in (("modelOutputs", output_file), ("binnedAmplitudes", output_file2)):
+        parts = sorted(f for f in os.listdir(results_dir) if f.endswith(f"_{suffix}.csv"))
+        n_rows = 0
+        with open(target, "w", newline="") as out:
+            for k, part in enumerate(parts):
+                with open(os.path.join(results_dir, part), newline="") as fh:
+                    header = fh.readline()
+                    if k == 0:
+                        out.write(header)
+                    for line in fh:
+                        out.write(line)
+                        n_rows += 1
+        merged[target] = n_rows
+
+    if stats_file:
+        from CEA_onlineStats import mergeSnapshots
+        parts = sorted(os.path.join(results_dir, f) for f in os.listdir(results_dir) if f.endswith("_stats.json"))
+        if parts:
+            mergeSnapshots(parts).save(stats_file)
+            merged[stats_file] = len(parts)
+
+    status = queueStatus(queue_dir)
+    if status["pending"] or status["claimed"]:
+        print(f" WARNING: merged while {status['pending']} chunks pending and {status['claimed']} claimed.")
+    return merged
+
+
+#################################################
+# WORKER
+
+def claimChunk(queue_dir):
+    """
+    Claim the next pending chunk. The rename is atomic, so two workers can never claim the same chunk.
+    Returns (chunk, claimed_path), or None if nothing is pending.
+    """
+    pending_dir = os.path.join(queue_dir, "pending")
+    for f in sorted(os.listdir(pending_dir)):
+        claimed_path = os.path.join(queue_dir, "claimed", f)
+        try:
+            os.rename(os.path.join(pending_dir, f), claimed_path)
+        except (FileNotFoundError, PermissionError):
+            continue  # Another worker got there first.
+        # Start the lease now; the file's own time is when it was planned (or last requeued), so until this runs the
+        # lease looks expired and another worker's requeueExpired may already have sent the chunk back to pending.
+        try:
+            os.utime(claimed_path, None)
+            with open(claimed_path) as fh:
+                return json.load(fh), claimed_path
+        except FileNotFoundError:
+            continue
+    return None
+
+
+class _Heartbeat:
+    """Keeps a claimed chunk's lease fresh while a worker is solving it."""
+    def __init__(self, claimed_path, interval):
+        self.claimed_path = claimed_path
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                os.utime(self.claimed_path, None)
+            except FileNotFoundError:
+                return  # Lease was lost (chunk requeued); the work is still written, just possibly twice.
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def solveChunk(queue_dir, chunk, claimed_path, lease_seconds, context=None, assets=None):
+    """
+    Solve one chunk with CEA_automate's runner. Results go to temporary files first and are renamed into place
+    when the chunk is complete, so a worker dying halfway never leaves a partial result behind.
+    context (a RunContext) defaults to CEA_automate's run_context; assets are the queue's shared geometries, if any.
+    """
+    from CEA_automate import initOutputFiles, runSweep, run_context
+    from CEA_onlineStats import GroupedAccumulator
+
+    chunk_id = chunk["chunk_id"]
+    results_dir = os.path.join(queue_dir, "results")
+    tag = f"{socket.gethostname()}_{os.getpid()}"
+    final1 = os.path.join(results_dir, f"{chunk_id}_modelOutputs.csv")
+    final2 = os.path.join(results_dir, f"{chunk_id}_binnedAmplitudes.csv")
+    final3 = os.path.join(results_dir, f"{chunk_id}_stats.json")
+    tmp1 = f"{final1}.{tag}.tmp"
+    tmp2 = f"{final2}.{tag}.tmp"
+
+    initOutputFiles(output_file=tmp1, output_file2=tmp2)
+    stats = GroupedAccumulator()
+    with _Heartbeat(claimed_path, interval=max(1, lease_seconds / 4)):
+        completed = runSweep(chunk["rows"], output_file=tmp1, output_file2=tmp2, stats=stats,
+                             first_run=chunk["first_run"], context=context or run_context, assets=assets)
+
+    os.replace(tmp1, final1)
+    os.replace(tmp2, final2)
+    stats.save(final3)
+    try:
+        os.rename(claimed_path, os.path.join(queue_dir, "done", os.path.basename(claimed_path)))
+    except FileNotFoundError:
+        pass  # Our lease expired and the chunk was requeued. The results are identical either way.
+    return completed
+
+
+def runWorker(queue_dir, max_chunks=None, poll_seconds=POLL_SECONDS, context=None):
+    """
+    Claim and solve chunks until the queue is empty (or max_chunks have been done).
+    """
+    info = _planInfo(queue_dir)
+    lease_seconds = info.get("lease_seconds", LEASE_SECONDS)
+    assets = _queueAssets(queue_dir, info)
+    n_done = 0
+    while max_chunks is None or n_done < max_chunks:
+        requeueExpired(queue_dir, lease_seconds)
+        claim = claimChunk(queue_dir)
+        if claim is None:
+            status = queueStatus(queue_dir)
+            if status["claimed"] == 0:
+                break  # Nothing pending, nothing in flight: the sweep is done.
+            # Others are still working. Wait in case one of them dies and its chunk comes back.
+            time.sleep(poll_seconds)
+            continue
+
+        chunk, claimed_path = claim
+        print(f">>> Worker {socket.gethostname()}:{os.getpid()} solving {chunk['chunk_id']} ({len(chunk['rows'])} runs)")
+        completed = solveChunk(queue_dir, chunk, claimed_path, lease_seconds, context, assets)
+        print(f" COMPLETED {chunk['chunk_id']}: {completed}/{len(chunk['rows'])} runs")
+        n_done += 1
+    return n_done
+
+
+#################################################
+
+def _writeJson(path, obj):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as fh:
+        json.dump(obj, fh)
+    os.replace(tmp, path)
+
+
+def _planInfo(queue_dir):
+    path = os.path.join(queue_dir, "plan.json")
+    if not os.path.exists(path):
+        return {}
+    with open(path) as fh:
+        return json.load(fh)
+
+
+def _queueAssets(queue_dir, info):
+    """The plan's shared geometries, attached from this node's view of the queue folder (None if not shared)."""
+    handle = info.get("assets")
+    if not handle:
+        return None
+    from CEA_sharedAssets import attachAssets
+    # The coordinator's absolute path may be mounted elsewhere on this node.
+    handle = dict(handle, location=os.path.join(queue_dir, os.path.basename(handle["location"])))
+    return attachAssets(handle)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="File-based work queue for distributed CEA sweeps.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("plan", help="Draw the sample plan and write it into the queue.")
+    p.add_argument("queue_dir")
+    p.add_argument("--iterations", type=int, required=True)
+    p.add_argument("--chunk-size", type=int, default=200)
+    p.add_argument("--lease-seconds", type=int, default=LEASE_SECONDS)
+    p.add_argument("--no-shared-geometry", action="store_true", help="Let every worker build its own geometries.")
+
+    p = sub.add_parser("worker", help="Claim and solve chunks until the queue is empty.")
+    p.add_argument("queue_dir")
+    p.add_argument("--max-chunks", type=int, default=None)
+
+    p = sub.add_parser("status", help="Count pending, claimed and finished chunks.")
+    p.add_argument("queue_dir")
+
+    p = sub.add_parser("requeue", help="Return chunks with expired leases to pending.")
+    p.add_argument("queue_dir")
+
+    p = sub.add_parser("merge", help="Combine every chunk's results into the final output files.")
+    p.add_argument("queue_dir")
+    p.add_argument("output_file")
+    p.add_argument("output_file2")
+    p.add_argument("--stats-file", default=None, help="Also merge the chunks' running statistics into this file.")
+
+    args = parser.parse_args()
+
+    if args.command == "plan":
+        from CEA_automate import buildSamplePlan
+        plan = buildSamplePlan(args.iterations)
+        n_chunks = writePlan(args.queue_dir, plan, chunk_size=args.chunk_size, lease_seconds=args.lease_seconds,
+                             share_geometry=not args.no_shared_geometry)
+        print(f"Wrote {len(plan)} runs in {n_chunks} chunks to {args.queue_dir}")
+    elif args.command == "worker":
+        n = runWorker(args.queue_dir, max_chunks=args.max_chunks)
+        print(f"Worker finished after {n} chunks")
+    elif args.command == "status":
+        print(queueStatus(args.queue_dir))
+    elif args.command == "requeue":
+        print(f"Requeued: {requeueExpired(args.queue_dir)}")
+    elif args.command == "merge":
+        merged = mergeResults(args.queue_dir, args.output_file, args.output_file2, stats_file=args.stats_file)
+        for path, n_rows in merged.items():
+            print(f"{path}: {n_rows} {'chunks' if path == args.stats_file else 'rows'}")
@@ -0,0 +1,7 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for the CEA scripts. Run from the repository folder:
+    python -m pytest -q
+None of them need Bellhop: they check the pure-Python parts (grouping, statistics, storage, file queue, sensitivity
+indices, interpolation, input files, collisions and preflight) against brute-force or reference results.
+"""
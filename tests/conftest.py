@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""The CEA scripts are plain modules in the repository folder; make them importable from the tests. Also a fake Bellhop."""
+
+import os
+import sys
+import tempfile
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+# A stand-in for Bellhop: a script that logs each call in its working folder, writes "<name>.arr" containing that
+# folder, and hangs when the run's name contains "hang". Input writing and result loading are faked to match, so
+# the runners can be tested end to end without Bellhop or arlpy's file formats.
+FAKE_BELLHOP = """#!{python}
+import os, sys, time
+name = sys.argv[1]
+with open("calls.log", "a") as fh:
+    fh.write(name + "\\n")
+if "hang" in name:
+    time.sleep(60)
+with open(name + ".arr", "w") as fh:
+    fh.write(os.getcwd())
+"""
+
+
+@pytest.fixture
+def fakeBellhop(tmp_path, monkeypatch):
+    import CEA_asyncRunner
+    import CEA_bellhop
+    from CEA_runContext import RunContext
+
+    exe = tmp_path / "bellhop"
+    exe.write_text(FAKE_BELLHOP.format(python=sys.executable))
+    exe.chmod(0o755)
+
+    def writeInputs(env, task="arrivals", scratch_dir=None):
+        fd, path = tempfile.mkstemp(suffix=".env", prefix=f"{env['name']}_", dir=scratch_dir)
+        os.close(fd)
+        return path[:-len(".env")]
+
+    def loadResults(fname_base, task="arrivals"):
+        try:
+            with open(fname_base + ".arr") as fh:
+                return fh.read()
+        except FileNotFoundError:
+            raise RuntimeError("Bellhop did not generate expected output file")
+
+    def cleanup(fname_base):
+        for ext in (".env", ".arr"):
+            if os.path.exists(fname_base + ext):
+                os.remove(fname_base + ext)
+
+    for module in (CEA_asyncRunner, CEA_bellhop):
+        monkeypatch.setattr(module, "writeInputs", writeInputs)
+        monkeypatch.setattr(module, "loadResults", loadResults)
+        monkeypatch.setattr(module, "cleanup", cleanup)
+    scratch = tmp_path / "scratch"
+    scratch.mkdir()
+    return RunContext(bellhop_exe=str(exe), scratch_dir=str(scratch), output_dir=str(tmp_path / "out"))
+
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""CEA_arrayMode: transect geometries off a grid, instrument pairs, and the transmitter x receiver matrix."""
+
+import numpy as np
+import pandas as pd
+import pytest
+import CEA_arrayMode
+from CEA_arrayMode import arrayPairs, loadInstruments, runArray, transectGeometry
+from CEA_bathymetryGrid import BathymetryRaster
+
+
+@pytest.fixture
+def raster():
+    # 20 m deep in the west, shoaling to 10 m in the east; a patch with no data in the north-east corner.
+    x = np.arange(0, 2001, 20.0)
+    y = np.arange(0, 1001, 20.0)
+    depth = np.broadcast_to(20 - x[None, :] / 200, (len(y), len(x))).copy()
+    depth[np.ix_(y >= 900, x >= 1900)] = np.nan
+    return BathymetryRaster(x, y, depth)
+
+
+@pytest.fixture
+def instruments(tmp_path):
+    path = tmp_path / "array.csv"
+    pd.DataFrame({"name": ["A", "B", "C", "D"], "x": [100, 900, 1500, 1950], "y": [500, 500, 100, 950],
+                  "depth": [18, 14, 11, 5]}).to_csv(path, index=False)
+    return loadInstruments(str(path))
+
+
+def test_loadInstrumentsChecks(tmp_path):
+    path = tmp_path / "bad.csv"
+    pd.DataFrame({"name": ["A", "A"], "x": [0, 1], "y": [0, 1], "depth": [5, 5]}).to_csv(path, index=False)
+    with pytest.raises(ValueError, match="Duplicate"):
+        loadInstruments(str(path))
+    pd.DataFrame({"name": ["A"], "x": [0]}).to_csv(path, index=False)
+    with pytest.raises(ValueError, match="missing"):
+        loadInstruments(str(path))
+
+
+def test_arrayPairs(instruments):
+    pairs = arrayPairs(instruments)
+    assert len(pairs) == 12 and ("A", "B") in pairs and ("B", "A") in pairs and ("A", "A") not in pairs
+    assert sorted(arrayPairs(instruments, max_range=900)) == [("A", "B"), ("B", "A"), ("B", "C"), ("C", "B")]
+
+
+def test_transectGeometry(raster, instruments):
+    tx, rx = instruments.loc["A"], instruments.loc["B"]
+    geometry = transectGeometry(raster, tx, rx, surface_type="mid_waves", spacing=10, extend=10)
+    assert geometry["rx_range"] == 800 and geometry["signalRange"] == 800
+    np.testing.assert_allclose(geometry["bottom"][[0, -1]], [[0, 19.5], [810, 15.45]])
+    assert geometry["tx_depth"] == 18 and geometry["rx_depth"] == 14
+    assert geometry["topDescrip"] == "Mid" and geometry["botDescrip"] == "AtoBGrid"
+    # The SSP reaches below the deepest point of the transect.
+    assert max(float(d) for d in geometry["soundspeed"].index) >= 19.5
+
+
+def test_transectGeometryChecks(raster, instruments):
+    with pytest.raises(ValueError, match="no bathymetry"):
+        transectGeometry(raster, instruments.loc["C"], instruments.loc["D"])
+    shallow = instruments.loc["C"].copy()
+    shallow["depth"] = 13
+    with pytest.raises(ValueError, match="below the bottom"):
+        transectGeometry(raster, instruments.loc["A"], shallow)
+    with pytest.raises(ValueError, match="surface_type"):
+        transectGeometry(raster, instruments.loc["A"], instruments.loc["B"], surface_type="choppy")
+
+
+def test_runArray(raster, instruments, monkeypatch):
+    solved = []
+
+    def runJobs(jobs, on_result, **kwargs):
+        for pair, env in jobs:
+            solved.append(pair)
+            # Longer transects lose more: one arrival drops below the threshold per 500 m.
+            n_lost = int(env["rx_range"] // 500)
+            amplitude = np.array([10 ** (-80 / 20)] * (4 - n_lost) + [10 ** (-110 / 20)] * n_lost, dtype=complex)
+            on_result(pair, pd.DataFrame({"time_of_arrival": np.linspace(0.5, 0.6, 4), "angle_of_arrival": 0.0,
+                                          "surface_bounces": 0, "bottom_bounces": [0, 1, 1, 2],
+                                          "arrival_amplitude": amplitude}), None)
+
+    monkeypatch.setattr(CEA_arrayMode, "runJobs", runJobs)
+    matrix, details = runArray(instruments, raster, nBeams=100)
+    # D sits in the no-data patch, so no transect to or from it is solved.
+    assert len(solved) == 6 and not any("D" in pair for pair in solved)
+    assert list(matrix.index) == list(matrix.columns) == ["A", "B", "C", "D"]
+    assert np.isnan(np.diag(matrix)).all() and matrix.loc["D"].isna().all() and matrix["D"].isna().all()
+    assert matrix.loc["A", "B"] == 0.75 and matrix.loc["B", "A"] == 0.75
+    assert matrix.loc["A", "C"] == 0.5
+    assert list(details["Transmitter"]) == ["A", "A", "B", "B", "C", "C"]
@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+"""CEA_arrivals: received levels, SBL and clipping, shared by processArrivals and the scripts that skip its tables."""
+
+import numpy as np
+import pandas as pd
+import pytest
+from CEA_arrivals import arrivalLevels, clippedLevels, processArrivals
+from CEA_collisionSim import channelFromArrivals
+from CEA_lookupTables import tabulateArrivals
+from CEA_surfaceEnsemble import realizationOutputs
+
+
+def arrivals():
+    level = np.array([70.0, 55.0, 52.0, -10.0])
+    return pd.DataFrame({"time_of_arrival": [0.50, 0.51, 0.53, 0.60], "angle_of_arrival": 0.0,
+                         "surface_bounces": [0, 1, 2, 3], "bottom_bounces": [0, 0, 1, 1],
+                         "arrival_amplitude": (1j * 10 ** ((level - 142) / 20)).astype(object)})
+
+
+def test_arrivalLevels():
+    table = arrivals()
+    np.testing.assert_allclose(arrivalLevels(table["arrival_amplitude"], table["surface_bounces"], SBL=2),
+                               [70, 53, 48, -16])
+    # A column of SBL values: one row of levels per SBL.
+    levels = arrivalLevels(table["arrival_amplitude"], table["surface_bounces"], np.array([[0.0], [2.0]]))
+    np.testing.assert_allclose(levels, [[70, 55, 52, -10], [70, 53, 48, -16]])
+    assert list(clippedLevels(levels[1])) == [70, 53, 48, 0]
+
+
+def test_callersAgreeWithProcessArrivals():
+    out = processArrivals(arrivals(), detectionThreshold=50, SBL=2, verbose=False)
+    X_detectable, avg_low_dB = out[4], out[6]
+    assert X_detectable == 2 and avg_low_dB == pytest.approx(np.mean([70, 53, 48, -16]))
+    clipped, detectable, average = realizationOutputs(arrivals(), SBL=2, detectionThreshold=50)
+    assert detectable == X_detectable and average == avg_low_dB
+    np.testing.assert_allclose(clipped, out[2])
+    fraction, averages, n = tabulateArrivals(arrivals(), [2.0], [50.0])
+    assert fraction[0, 0] == X_detectable / n and averages[0] == avg_low_dB
+    assert channelFromArrivals(arrivals(), SBL=2, detectionThreshold=50)["Last_Arrival_s"] == 0.51
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""CEA_asyncRunner: hung runs are killed and retried, launch failures retried, and results reach the callback."""
+
+import os
+import time
+from CEA_asyncRunner import BellhopTimeout, runJobs
+
+
+def calls(context):
+    """Names Bellhop was started with, in order."""
+    path = os.path.join(context.scratch_dir, "calls.log")
+    if not os.path.exists(path):
+        return []
+    with open(path) as fh:
+        return [line.split("_")[0] for line in fh.read().split()]
+
+
+def leftovers(context):
+    return [f for f in os.listdir(context.scratch_dir) if f != "calls.log"]
+
+
+def test_resultsReachCallback(fakeBellhop):
+    finished = {}
+
+    def on_result(key, result, error):
+        finished[key] = (result, error)
+
+    runJobs(((k, {"name": f"run{k}"}) for k in range(5)), on_result, concurrency=2, context=fakeBellhop)
+    # Bellhop ran in the scratch folder, whatever the test's working directory is.
+    assert finished == {k: (fakeBellhop.scratch_dir, None) for k in range(5)}
+    assert sorted(calls(fakeBellhop)) == [f"run{k}" for k in range(5)]
+    assert leftovers(fakeBellhop) == []
+
+
+def test_hungRunIsKilledAndRetried(fakeBellhop):
+    start = time.monotonic()
+    results = runJobs([("ok", {"name": "ok"}), ("stuck", {"name": "hang"})], concurrency=2, timeout=1, retries=2,
+                      context=fakeBellhop)
+    # Three attempts of one second each, not the minute the fake Bellhop would hang for.
+    assert time.monotonic() - start < 20
+    assert results["ok"] == fakeBellhop.scratch_dir
+    assert isinstance(results["stuck"], BellhopTimeout) and "attempt 3" in str(results["stuck"])
+    assert calls(fakeBellhop).count("hang") == 3
+    assert leftovers(fakeBellhop) == []
+
+
+def test_launchFailureIsRetried(fakeBellhop, monkeypatch):
+    import CEA_asyncRunner
+    attempts = []
+    writeInputs = CEA_asyncRunner.writeInputs
+
+    def countingWriteInputs(env, task="arrivals", scratch_dir=None):
+        attempts.append(env["name"])
+        return writeInputs(env, task, scratch_dir)
+
+    monkeypatch.setattr(CEA_asyncRunner, "writeInputs", countingWriteInputs)
+    missing = fakeBellhop.replace(bellhop_exe=os.path.join(fakeBellhop.scratch_dir, "no_bellhop_here"))
+    results = runJobs([(0, {"name": "run0"})], retries=1, context=missing)
+    assert isinstance(results[0], OSError)
+    assert attempts == ["run0", "run0"]
+    assert leftovers(fakeBellhop) == []
+
+
+def test_bellhopErrorIsNotRetried(fakeBellhop, monkeypatch):
+    import CEA_asyncRunner
+
+    def fatal(fname_base, task="arrivals"):
+        raise RuntimeError("FATAL ERROR in Bellhop")
+
+    monkeypatch.setattr(CEA_asyncRunner, "loadResults", fatal)
+    results = runJobs([(0, {"name": "run0"})], retries=3, context=fakeBellhop)
+    assert isinstance(results[0], RuntimeError)
+    assert calls(fakeBellhop) == ["run0"]
+
+
+def test_failingCallbackDoesNotStopTheSweep(fakeBellhop, capsys):
+    seen = []
+
+    def on_result(key, result, error):
+        seen.append(key)
+        if key == 1:
+            raise ValueError("bad post-processing")
+
+    runJobs(((k, {"name": f"run{k}"}) for k in range(3)), on_result, concurrency=1, context=fakeBellhop)
+    assert sorted(seen) == [0, 1, 2]
+    assert "Post-processing failed for run 1" in capsys.readouterr().out
+
+
+def test_concurrencyLimit(fakeBellhop, monkeypatch):
+    import CEA_asyncRunner
+    running, most = 0, 0
+    solveAsync = CEA_asyncRunner.solveAsync
+
+    async def countingSolve(env, **kwargs):
+        nonlocal running, most
+        running += 1
+        most = max(most, running)
+        try:
+            return await solveAsync(env, **kwargs)
+        finally:
+            running -= 1
+
+    monkeypatch.setattr(CEA_asyncRunner, "solveAsync", countingSolve)
+    results = runJobs(((k, {"name": f"run{k}"}) for k in range(6)), concurrency=3, context=fakeBellhop)
+    assert len(results) == 6 and most == 3
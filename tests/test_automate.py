@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""CEA_automate: old modelOutputs files get the Fidelity column, and screened rows are kept or escalated once."""
+
+import csv
+import pandas as pd
+import pytest
+import CEA_asyncRunner
+import CEA_automate
+from CEA_automate import OUTPUT_FIELDS, initOutputFiles, runSweep
+from CEA_fidelity import SCREEN_THEN_FULL
+from CEA_runContext import RunContext
+
+
+def readRows(path):
+    with open(path, newline="") as fh:
+        return list(csv.reader(fh))
+
+
+def test_oldOutputFileGetsFidelityColumn(tmp_path):
+    output_file, output_file2 = str(tmp_path / "modelOutputs.csv"), str(tmp_path / "binned.csv")
+    old_row = ["2025-04-12 14:13:18", "FS17toSTSNew1Real", "flat_surface", "3.1", "2.5", "8.0", "50.0", "1.2",
+               "40", "10", "62.4"]
+    with open(output_file, "w", newline="") as fh:
+        csv.writer(fh).writerows([OUTPUT_FIELDS[:-1], old_row])
+    initOutputFiles(output_file, output_file2)
+    assert readRows(output_file) == [OUTPUT_FIELDS, old_row + ["full"]]
+    # Already upgraded: left as it is.
+    initOutputFiles(output_file, output_file2)
+    assert readRows(output_file) == [OUTPUT_FIELDS, old_row + ["full"]]
+
+
+def test_unknownOutputFileIsRefused(tmp_path):
+    output_file = str(tmp_path / "modelOutputs.csv")
+    with open(output_file, "w", newline="") as fh:
+        fh.write("Run,Value\n1,2\n")
+    with pytest.raises(ValueError, match="modelOutputs columns"):
+        initOutputFiles(output_file, str(tmp_path / "binned.csv"))
+    assert readRows(output_file) == [["Run", "Value"], ["1", "2"]]
+
+
+def test_screenThenFull(tmp_path, monkeypatch):
+    output_file, output_file2 = str(tmp_path / "modelOutputs.csv"), str(tmp_path / "binned.csv")
+    initOutputFiles(output_file, output_file2)
+    # One shared environment; SBL decides how detectable each row is.
+    plan = [{"scenario": "FS17toSTSNew1Real", "surface": "flat_surface", "bottom_absorption": 1.0, "deltaSS": 2.0,
+             "gradient_depth": 8.0, "detectionThreshold": 50.0, "SBL": sbl} for sbl in (0.0, 7.0, 14.0, 6.0)]
+    solved = []
+
+    def createTierEnv(tier, **kwargs):
+        return {"nBeams": tier.nBeams}, "flat", "ssp", "bottom", None, None, None, None, 18.0, 19.0, None
+
+    async def solveAsync(env, **kwargs):
+        solved.append(env["nBeams"])
+        return env
+
+    def processArrivals(arrivals, detectionThreshold, SBL):
+        # The screen sees rows 1 and 3 as part-detectable; the full solve settles them.
+        detectable = {0.0: 10, 7.0: 5, 14.0: 0, 6.0: 6}[SBL]
+        if arrivals["nBeams"] == 1000 and detectable not in (0, 10):
+            detectable += 2
+        binned = pd.Series([10 - detectable, detectable], index=pd.IntervalIndex.from_breaks([0, 50, 100]))
+        return arrivals, binned, None, None, detectable, 10 - detectable, 60.0, None, None, None
+
+    monkeypatch.setattr(CEA_automate, "createTierEnv", createTierEnv)
+    monkeypatch.setattr(CEA_asyncRunner, "solveAsync", solveAsync)
+    monkeypatch.setattr(CEA_automate, "processArrivals", processArrivals)
+    context = RunContext(scratch_dir=str(tmp_path / "scratch"), output_dir=str(tmp_path))
+
+    completed = runSweep(plan, output_file=output_file, output_file2=output_file2, context=context,
+                         tiers=SCREEN_THEN_FULL)
+    assert completed == 4
+    assert solved == [100, 1000]
+    rows = readRows(output_file)
+    assert rows[0] == OUTPUT_FIELDS
+    # Each row written once, by the tier that kept it; screen counts scaled from 100 beams to 1000.
+    kept = {(row[3], row[8], row[9], row[11]) for row in rows[1:]}
+    assert len(rows) == 5 and kept == {("0.0", "100", "0", "screen"), ("14.0", "0", "100", "screen"),
+                                       ("7.0", "7", "3", "full"), ("6.0", "8", "2", "full")}
+    # The dB bins (Bin_25, Bin_75) are scaled the same way.
+    assert sorted(tuple(row[-2:]) for row in readRows(output_file2)[1:]) == [
+        ("0", "100"), ("100", "0"), ("2", "8"), ("3", "7")]
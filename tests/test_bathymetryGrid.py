@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+"""CEA_bathymetryGrid: depths and profiles off a grid, read whole or by tile, simplified, and cached by contents."""
+
+import os
+import numpy as np
+import pytest
+import CEA_bathymetryGrid
+from CEA_bathymetryGrid import BathymetryProvider, BathymetryRaster, convertGrid, openGrid, simplifyProfile
+
+
+def plane(x, y):
+    # Bilinear interpolation is exact for a plane, so any point can be checked against it.
+    return 10 + 0.01 * x - 0.02 * y
+
+
+@pytest.fixture
+def raster():
+    # North-up: y decreasing, as most rasters are stored.
+    x = np.arange(0, 1000, 10.0)
+    y = np.arange(500, -1, -10.0)
+    return BathymetryRaster(x, y, plane(x[None, :], y[:, None]))
+
+
+def test_depthAt(raster):
+    rng = np.random.default_rng(0)
+    x, y = rng.uniform(0, 990, (3, 50)), rng.uniform(0, 500, (3, 50))
+    np.testing.assert_allclose(raster.depthAt(x, y), plane(x, y))
+    # Off the grid: the depth at its edge.
+    np.testing.assert_allclose(raster.depthAt([-100, 2000], [250, 600]), [plane(0, 250), plane(990, 500)])
+    assert list(raster.contains([5, -1, 500], [5, 5, 501])) == [True, False, False]
+
+
+def test_profile(raster):
+    start, end = (100.0, 100.0), (400.0, 500.0)
+    profile = raster.profile(start, end, spacing=30, extend=12)
+    ranges = profile[:, 0]
+    # Every 30 m, the receiver's range (500 m) exactly, then on to 512 m.
+    np.testing.assert_allclose(ranges, list(np.arange(0, 500, 30)) + [500, 512])
+    direction = (np.array(end) - start) / 500
+    x, y = start[0] + ranges * direction[0], start[1] + ranges * direction[1]
+    np.testing.assert_allclose(profile[:, 1], plane(np.minimum(x, 990), np.minimum(y, 500)))
+    assert len(raster.profile(start, end, spacing=100)) == 6
+    with pytest.raises(ValueError):
+        raster.profile(start, start)
+
+
+def test_gridChecks():
+    with pytest.raises(ValueError, match="shape"):
+        BathymetryRaster(np.arange(3), np.arange(4), np.zeros((3, 4)))
+    with pytest.raises(ValueError, match="evenly spaced"):
+        BathymetryRaster([0, 1, 3], [0, 1], np.zeros((2, 3)))
+
+
+class Reader:
+    """Stands in for a GeoTIFF/NetCDF reader: the grid is only reachable a block at a time."""
+
+    def __init__(self, depth):
+        self._depth = depth
+        self.shape = depth.shape
+        self.blocks = 0
+
+    def __getitem__(self, key):
+        self.blocks += 1
+        return self._depth[key]
+
+
+def test_tiledReaderMatchesArray(raster, monkeypatch):
+    monkeypatch.setattr(CEA_bathymetryGrid, "TILE", 16)
+    monkeypatch.setattr(CEA_bathymetryGrid, "MAX_TILES", 4)
+    reader = Reader(np.asarray(raster.depth))
+    tiled = BathymetryRaster(raster.x, raster.y, reader)
+    rng = np.random.default_rng(1)
+    x, y = rng.uniform(0, 990, 300), rng.uniform(0, 500, 300)
+    np.testing.assert_allclose(tiled.depthAt(x, y), raster.depthAt(x, y))
+    # A short transect only reads the tiles it crosses, and reading it again hits the tile cache.
+    reader.blocks = 0
+    np.testing.assert_allclose(tiled.profile((10, 10), (100, 60)), raster.profile((10, 10), (100, 60)))
+    first = reader.blocks
+    tiled.profile((10, 10), (100, 60))
+    assert 0 < first <= 4 and reader.blocks == first
+
+
+def test_nodataAndElevation():
+    x, y = np.arange(3.0), np.arange(3.0)
+    heights = -np.array([[5.0, 5.0, 5.0], [6.0, 6.0, -9999.0], [7.0, 7.0, 7.0]])
+    grid = BathymetryRaster(x, y, heights, nodata=9999.0, elevation=True)
+    assert grid.depthAt(0.5, 0.5) == pytest.approx(5.5)
+    assert np.isnan(grid.depthAt(1.5, 1.5))
+
+
+def test_convertGrid(raster, tmp_path):
+    np.savez(tmp_path / "survey.npz", x=raster.x, y=raster.y, depth=np.asarray(raster.depth))
+    converted = convertGrid(str(tmp_path / "survey.npz"), str(tmp_path / "survey.npy"), rows_per_block=7)
+    assert isinstance(converted.depth, np.memmap) and converted.depth.dtype == np.float32
+    np.testing.assert_allclose(converted.x, raster.x)
+    np.testing.assert_allclose(converted.y, raster.y)
+    np.testing.assert_allclose(converted.profile((0, 0), (900, 400)), raster.profile((0, 0), (900, 400)), rtol=1e-6)
+    with pytest.raises(ValueError, match="Unsupported"):
+        openGrid(str(tmp_path / "survey.xyz"))
+
+
+def test_simplifyProfile():
+    r = np.arange(0, 1001, 5.0)
+    profile = np.column_stack([r, 15 + 2 * np.sin(r / 150) + 0.01 * np.cos(r)])
+    simple = simplifyProfile(profile, tolerance=0.05)
+    assert 2 < len(simple) < len(profile) / 4
+    assert (simple[[0, -1]] == profile[[0, -1]]).all()
+    # Every dropped point is within the tolerance of the simplified line.
+    assert np.abs(np.interp(r, simple[:, 0], simple[:, 1]) - profile[:, 1]).max() <= 0.05
+    line = np.column_stack([r, 10 + 0.01 * r])
+    assert len(simplifyProfile(line, 0.001)) == 2
+    assert simplifyProfile(profile, 0) is profile
+
+
+def test_providerCachesInMemory(raster):
+    provider = BathymetryProvider(raster, spacing=10, extend=0, tolerance=0.05)
+    first = provider.profile((0, 0), (800, 300))
+    np.testing.assert_allclose(first, simplifyProfile(raster.profile((0, 0), (800, 300), 10, 0), 0.05))
+    # The same instruments to the millimetre hit the cache; callers get copies they may change.
+    first[:, 1] = 0
+    again = provider.profile((0.0001, 0), (800, 300.0002))
+    assert provider.hits == 1 and provider.misses == 1 and again[:, 1].min() > 0
+    provider.profile((0, 0), (800, 300), spacing=20)
+    assert provider.misses == 2
+
+
+def test_providerDiskCacheKeyedOnContents(raster, tmp_path):
+    cache = str(tmp_path / "cache")
+    BathymetryProvider(raster, cache_dir=cache).profile((0, 0), (800, 300))
+    assert len(os.listdir(cache)) == 1
+    # A new provider over an identical grid (another object) reads the file.
+    copy = BathymetryRaster(raster.x, raster.y, np.array(raster.depth))
+    provider = BathymetryProvider(copy, cache_dir=cache)
+    provider.profile((0, 0), (800, 300))
+    assert provider.hits == 1 and provider.misses == 0
+    # Different depths, same shape and placement: a different entry, not the old profile.
+    deeper = BathymetryRaster(raster.x, raster.y, np.array(raster.depth) + 5)
+    provider = BathymetryProvider(deeper, cache_dir=cache, tolerance=0)
+    profile = provider.profile((0, 0), (800, 300))
+    assert provider.misses == 1 and len(os.listdir(cache)) == 2
+    np.testing.assert_allclose(profile, deeper.profile((0, 0), (800, 300), 5.0, 10.0))
+
+
+def test_providerDiskCacheFollowsGridFile(raster, tmp_path):
+    cache = str(tmp_path / "cache")
+    path = str(tmp_path / "survey.npz")
+    np.savez(path, x=raster.x, y=raster.y, depth=np.asarray(raster.depth))
+    BathymetryProvider(path, cache_dir=cache).profile((0, 0), (800, 300))
+    provider = BathymetryProvider(path, cache_dir=cache)
+    provider.profile((0, 0), (800, 300))
+    assert provider.hits == 1
+    # Rewriting the grid invalidates what was cached from it.
+    np.savez(path, x=raster.x, y=raster.y, depth=np.asarray(raster.depth) + 5)
+    os.utime(path, ns=(os.stat(path).st_atime_ns, os.stat(path).st_mtime_ns + 10 ** 9))
+    provider = BathymetryProvider(path, cache_dir=cache)
+    assert provider.profile((0, 0), (800, 300))[0, 1] == pytest.approx(plane(0, 0) + 5)
+    assert provider.misses == 1
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+"""CEA_canonical: rows are snapped to what Bellhop actually sees and grouped into one solve each."""
+
+from CEA_canonical import canonicalParams, canonicalKey, groupPlan, paramsFromKey, dedupReport, SOLVE_PARAMS
+
+
+def row(**kwargs):
+    base = {"scenario": "FS17toSTSNew1Real", "surface": "flat_surface", "deltaSS": 4.0, "gradient_depth": 6.0,
+            "bottom_absorption": 0.5, "SBL": 3.0, "detectionThreshold": 50.0}
+    base.update(kwargs)
+    return base
+
+
+def test_gradientDepthSnapsToTheSspGrid():
+    # The SSP grid is every 2 m, so anything from 6 to just under 8 m gives the 6 m profile.
+    assert canonicalParams(row(gradient_depth=6.0))["gradient_depth"] == 6.0
+    assert canonicalParams(row(gradient_depth=7.9))["gradient_depth"] == 6.0
+    assert canonicalParams(row(gradient_depth=8.0))["gradient_depth"] == 8.0
+    assert canonicalParams(row(gradient_depth=5.9))["gradient_depth"] == 4.0
+
+
+def test_noStratificationIgnoresGradientDepth():
+    assert canonicalKey(row(deltaSS=0, gradient_depth=3)) == canonicalKey(row(deltaSS=0.001, gradient_depth=15))
+
+
+def test_continuousParamsAreRounded():
+    assert canonicalKey(row(deltaSS=4.001, bottom_absorption=0.504)) == canonicalKey(row(deltaSS=4.0, bottom_absorption=0.5))
+    assert canonicalKey(row(deltaSS=4.01)) != canonicalKey(row(deltaSS=4.0))
+
+
+def test_postProcessingParamsDoNotSplitGroups():
+    assert canonicalKey(row(SBL=0, detectionThreshold=30)) == canonicalKey(row(SBL=15, detectionThreshold=75))
+
+
+def test_groupPlanKeepsFirstSeenOrderAndEveryRow():
+    plan = [row(gradient_depth=6.5), row(surface="rough_waves"), row(gradient_depth=7.5, SBL=9), row(deltaSS=2)]
+    groups = groupPlan(plan)
+    assert list(groups.values()) == [[0, 2], [1], [3]]
+    first = paramsFromKey(next(iter(groups)))
+    assert list(first) == list(SOLVE_PARAMS)
+    assert first["surface"] == "flat_surface" and first["gradient_depth"] == 6.0
+
+
+def test_dedupReport():
+    report = dedupReport(groupPlan([row(), row(SBL=1), row(deltaSS=1)]), verbose=False)
+    assert report == {"rows": 3, "solves": 2, "saved": 1, "saved_pct": 100 / 3}
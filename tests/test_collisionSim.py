@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""CEA_collisionSim: vectorized collisions against a brute-force overlap check, and rates against the Poisson formula."""
+
+import numpy as np
+import pandas as pd
+import pytest
+from CEA_collisionSim import collisions, simulate, expectedRate, transmissionSchedule, channelFromArrivals
+
+
+def bruteForce(start, end):
+    overlaps = (start[:, None] < end[None, :]) & (start[None, :] < end[:, None])
+    np.fill_diagonal(overlaps, False)
+    return overlaps.any(axis=1)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_collisionsMatchBruteForce(seed):
+    rng = np.random.default_rng(seed)
+    n = 400
+    start = rng.uniform(0, 1000, n)
+    end = start + rng.uniform(0.5, 8, n)
+    np.testing.assert_array_equal(collisions(start, end), bruteForce(start, end))
+
+
+def test_collisionEdgeCases():
+    # Touching receptions do not overlap; a long one overlaps a later, non-adjacent one; equal starts collide.
+    start = np.array([0.0, 1.0, 10.0, 11.0, 12.0, 20.0, 20.0])
+    end = np.array([1.0, 2.0, 12.5, 11.5, 12.2, 21.0, 20.5])
+    np.testing.assert_array_equal(collisions(start, end), bruteForce(start, end))
+    np.testing.assert_array_equal(collisions(start, end), [False, False, True, True, True, True, True])
+    assert collisions(np.array([]), np.array([])).shape == (0,)
+
+
+def test_scheduleDelays():
+    tag, sent = transmissionSchedule(50, 3600, 60, 180, rng=0)
+    assert np.all(sent < 3600)
+    for t in range(50):
+        gaps = np.diff(sent[tag == t])
+        assert np.all((gaps >= 60) & (gaps <= 180))
+
+
+def test_rateMatchesPoissonFormula():
+    channels = pd.DataFrame({"group": ["g"], "receiver": ["r"], "First_Arrival_s": [0.0], "Last_Arrival_s": [0.0],
+                             "Level_dB": [80.0], "Audible": [True]})
+    rates = simulate(channels, tags=40, hours=48, min_delay=60, max_delay=180, train_duration=3.0, seed=0)
+    expected = expectedRate(40, 3.0, 120)
+    assert rates["Detection_Rate"].iloc[0] == pytest.approx(expected, abs=0.01)
+
+
+def test_inaudibleGroupsNeitherDetectNorCollide():
+    channels = pd.DataFrame({"group": ["loud", "quiet"], "receiver": ["r", "r"], "First_Arrival_s": [0.0, np.nan],
+                             "Last_Arrival_s": [0.0, np.nan], "Level_dB": [80.0, 0.0], "Audible": [True, False]})
+    rates = simulate(channels, tags={"loud": 1, "quiet": 500}, hours=10, seed=1).set_index("group")
+    assert rates.loc["quiet", "Receptions"] == 0 and rates.loc["quiet", "Detections"] == 0
+    assert rates.loc["loud", "Collisions"] == 0 and rates.loc["loud", "Detection_Rate"] == 1.0
+
+
+def test_channelFromArrivals():
+    arrivals = pd.DataFrame({"arrival_amplitude": [1e-3, 1e-5, 1e-2], "surface_bounces": [0, 0, 1],
+                             "time_of_arrival": [0.50, 0.52, 0.55]})
+    channel = channelFromArrivals(arrivals, SBL=5, detectionThreshold=100)
+    # 142 - 60 = 82, 142 - 100 = 42 and 142 - 40 - 5 = 97 dB: none reach 100 dB.
+    assert not channel["Audible"] and np.isnan(channel["First_Arrival_s"])
+    channel = channelFromArrivals(arrivals, SBL=5, detectionThreshold=80)
+    assert channel["Audible"] and (channel["First_Arrival_s"], channel["Last_Arrival_s"]) == (0.50, 0.55)
+    assert channel["Level_dB"] == pytest.approx(97)
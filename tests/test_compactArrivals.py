@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""CEA_compactArrivals: append, index, slice, convert, save and load without losing or mixing up runs."""
+
+import numpy as np
+import pandas as pd
+import pytest
+from CEA_compactArrivals import CompactArrivals
+
+
+def arrivals(n, seed):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "time_of_arrival": rng.uniform(0.4, 0.6, n),
+        "angle_of_arrival": rng.uniform(-60, 60, n),
+        "surface_bounces": rng.integers(0, 4, n),
+        "bottom_bounces": rng.integers(0, 4, n),
+        "arrival_amplitude": rng.normal(size=n) + 1j * rng.normal(size=n),
+        "low_power_dB": rng.uniform(0, 90, n),
+    })
+
+
+@pytest.fixture
+def runs():
+    # Small capacity so appends have to grow the columns and offsets; one run has no arrivals.
+    return [arrivals(n, seed) for seed, n in enumerate([5, 0, 300, 1, 70] * 20)]
+
+
+@pytest.fixture
+def store(runs):
+    store = CompactArrivals(capacity=8)
+    for i, df in enumerate(runs):
+        store.append(df, run_id=f"run{i}", SBL=float(i))
+    return store
+
+
+def assertSameRun(stored, df):
+    for name in df.columns:
+        np.testing.assert_allclose(stored[name], df[name].to_numpy().astype(stored[name].dtype))
+
+
+def test_appendAndIndex(store, runs):
+    assert len(store) == len(runs)
+    assert store.n_arrivals == sum(len(df) for df in runs)
+    np.testing.assert_array_equal(store.counts, [len(df) for df in runs])
+    for i in (0, 1, 2, len(runs) - 1, -1, -len(runs)):
+        assertSameRun(store[i], runs[i])
+    for i in (len(runs), len(runs) + 5, -len(runs) - 1):
+        with pytest.raises(IndexError):
+            store[i]
+    with pytest.raises(IndexError):
+        store[2:4][2]
+
+
+def test_sliceIsAView(store, runs):
+    view = store[2:9]
+    assert len(view) == 7 and view.run_ids == [f"run{i}" for i in range(2, 9)]
+    for k in range(len(view)):
+        assertSameRun(view[k], runs[2 + k])
+    assert np.shares_memory(view.column("time_of_arrival"), store.column("time_of_arrival"))
+    with pytest.raises(ValueError):
+        view.append(runs[0])
+
+
+def test_perRun(store, runs):
+    detectable = store.perRun(store.column("low_power_dB") >= 50)
+    expected = [int((df["low_power_dB"].astype(np.float32) >= 50).sum()) for df in runs]
+    np.testing.assert_array_equal(detectable, expected)
+    assert np.isnan(store.perRun(store.column("low_power_dB"), reduce="mean")[1])
+
+
+def test_toPandas(store, runs):
+    assert len(store.toPandas()) == store.n_arrivals
+    last = store.toPandas(-1)
+    assert set(last["run"]) == {f"run{len(runs) - 1}"} and len(last) == len(runs[-1])
+    assert len(store.toPandas(slice(0, 3))) == sum(len(df) for df in runs[:3])
+    with pytest.raises(IndexError):
+        store.toPandas(len(runs))
+
+
+def test_saveLoadRoundTrip(store, runs, tmp_path):
+    store.save(tmp_path / "sweep")
+    loaded = CompactArrivals.load(tmp_path / "sweep")
+    assert len(loaded) == len(store) and loaded.run_ids == store.run_ids and loaded.run_meta == store.run_meta
+    np.testing.assert_array_equal(loaded.offsets, store.offsets)
+    for name in store.fields:
+        np.testing.assert_array_equal(loaded.column(name), store.column(name))
+    for i in (0, 2, -1):
+        assertSameRun(loaded[i], runs[i])
+    assert isinstance(loaded.column("time_of_arrival"), np.memmap)
+    with pytest.raises(ValueError):
+        loaded.append(runs[0])
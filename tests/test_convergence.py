@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""CEA_convergence: runs go where the intervals are still wide, and the sweep stops once every stratum converges."""
+
+import math
+import numpy as np
+import pytest
+from CEA_convergence import ConvergenceController
+from CEA_onlineStats import GroupedAccumulator
+
+# Spread of Avg_Signal_dB in each stratum: the noisy one needs many more runs to pin down its mean.
+SPREAD = {("FS17toSTSNew1Real", "flat_surface"): 0.5, ("FS17toSTSNew1Real", "rough_waves"): 3.0}
+TARGETS = {"Avg_Signal_dB": 0.5}
+
+
+def buildPlan(n, scenario, surface):
+    return [{"scenario": scenario, "surface": surface} for _ in range(n)]
+
+
+def finish(controller, plan, rng):
+    for row in plan:
+        spread = SPREAD[(row["scenario"], row["surface"])]
+        controller.stats.update(row, {"Avg_Signal_dB": 60 + spread * rng.standard_normal()})
+
+
+def test_firstBatchGivesEveryStratumItsMinimum():
+    controller = ConvergenceController(SPREAD, targets=TARGETS, min_runs=10)
+    assert controller.allocate(100) == {s: 10 for s in SPREAD}
+    # A smaller batch is split evenly, and adds up to the batch size.
+    assert sorted(controller.allocate(7).values()) == [3, 4]
+
+
+def test_runsUntilConverged():
+    rng = np.random.default_rng(0)
+    controller = ConvergenceController(SPREAD, targets=TARGETS, min_runs=10)
+    batches = []
+    while not controller.done:
+        plan = controller.nextPlan(20, buildPlan)
+        assert 0 < len(plan) <= 20
+        batches.append(plan)
+        finish(controller, plan, rng)
+
+    quiet, noisy = SPREAD
+    assert all(controller.isConverged(s) for s in SPREAD)
+    assert controller.nRuns(noisy) > 4 * controller.nRuns(quiet)
+    assert controller.n_total == sum(len(plan) for plan in batches)
+    # Once converged, a stratum gets no more runs.
+    assert controller.allocate(20) == {}
+    status = controller.status()
+    assert list(status["converged"]) == [True, True]
+    assert (status["Avg_Signal_dB_halfwidth"] <= 0.5).all()
+
+
+def test_runsNeededScalesWithHalfWidth():
+    rng = np.random.default_rng(1)
+    controller = ConvergenceController(SPREAD, targets=TARGETS, min_runs=10)
+    noisy = list(SPREAD)[1]
+    finish(controller, buildPlan(40, *noisy), rng)
+    hw = controller.halfWidths(noisy)["Avg_Signal_dB"]
+    assert controller.runsNeeded(noisy) == math.ceil(40 * (hw / 0.5) ** 2) - 40
+    assert controller.runsNeeded(list(SPREAD)[0]) == 10
+
+
+def test_budgetStopsTheSweep():
+    rng = np.random.default_rng(2)
+    controller = ConvergenceController(SPREAD, targets=TARGETS, min_runs=10, max_runs=45)
+    while not controller.done:
+        finish(controller, controller.nextPlan(20, buildPlan), rng)
+    assert controller.n_total == 45 and controller.budget_left == 0
+    assert not controller.isConverged(list(SPREAD)[1])
+
+
+def test_statsMustTrackTheTargets():
+    with pytest.raises(ValueError, match="does not track"):
+        ConvergenceController(SPREAD, targets={"Detectable_Fraction": 0.02},
+                              stats=GroupedAccumulator(metrics=("Avg_Signal_dB",)))
+
+
+def test_stratumWithNoArrivalsStops():
+    # Every run of the shadowed stratum has no arrivals, so no fraction or average signal: NaN for both.
+    shadowed = ("STSNew1toFS17Real", "rough_waves")
+    controller = ConvergenceController(list(SPREAD) + [shadowed], targets=TARGETS, min_runs=10, max_runs=1000)
+    rng = np.random.default_rng(3)
+    while not controller.done:
+        for row in controller.nextPlan(20, buildPlan):
+            stratum = (row["scenario"], row["surface"])
+            value = np.nan if stratum == shadowed else 60 + SPREAD[stratum] * rng.standard_normal()
+            controller.stats.update(row, {"Avg_Signal_dB": value})
+    assert controller.nRuns(shadowed) == 10 and controller.isConverged(shadowed)
+    assert controller.degenerateMetrics(shadowed) == ["Avg_Signal_dB"]
+    assert list(controller.status()["degenerate"]) == ["", "", "Avg_Signal_dB"]
+
+
+def test_runsWithoutArrivalsCountTowardRuns():
+    controller = ConvergenceController(SPREAD, targets=TARGETS, min_runs=10)
+    noisy = list(SPREAD)[1]
+    rng = np.random.default_rng(4)
+    # Half the runs have no arrivals: twice as many runs are needed for the same number of values.
+    for k in range(40):
+        value = 60 + 3.0 * rng.standard_normal() if k % 2 else np.nan
+        controller.stats.update({"scenario": noisy[0], "surface": noisy[1]}, {"Avg_Signal_dB": value})
+    assert controller.nRuns(noisy) == 40 and controller.stats.stats(noisy, "Avg_Signal_dB").n == 20
+    hw = controller.halfWidths(noisy)["Avg_Signal_dB"]
+    assert controller.runsNeeded(noisy) == math.ceil((math.ceil(20 * (hw / 0.5) ** 2) - 20) * 2)
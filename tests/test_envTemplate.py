@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""CEA_envTemplate writes the same input files, byte for byte, as arlpy's own writer."""
+
+import os
+import glob
+import numpy as np
+import pandas as pd
+import pytest
+import arlpy.uwapm as pm
+import CEA_envTemplate
+from CEA_createEnv import createEnv
+
+
+def scenarioEnv(surface_type, scenario, **kwargs):
+    return createEnv(surface_type=surface_type, scenario=scenario, **kwargs)[0]
+
+
+ENVS = {
+    # Surface, bathymetry and a range-dependent SSP (.ati, .bty and .ssp), as CEA_automate builds them.
+    "rough_real": lambda: scenarioEnv("rough_waves", "FS17toSTSNew1Real", deltaSS=3.5, bottom_absorption=0.4),
+    "flat_linear": lambda: scenarioEnv("flat_surface", "STSNew1toFS17Linear", deltaSS=0, gradient_depth=2),
+    "linear_surface": lambda: scenarioEnv("mid_waves", "SURT20toSTSNew1Flat", surface_interp="linear"),
+    # arlpy's defaults: flat bottom, constant sound speed, no surface file.
+    "default": lambda: pm.create_env2d(),
+    "depth_profile_spline": lambda: pm.create_env2d(
+        depth=20, soundspeed=[[0, 1540], [5, 1535], [10, 1530], [20, 1532]], soundspeed_interp="spline",
+        rx_range=np.linspace(100, 1000, 10), rx_depth=np.array([5.0, 10, 15]), nbeams=250),
+    "single_column_ssp": lambda: pm.create_env2d(
+        depth=np.array([[0, 18], [300, 20], [900, 16]]), soundspeed=pd.DataFrame({0: [1520, 1524, 1527, 1530]}, index=[0, 5, 12, 20]),
+        rx_range=800, bottom_roughness=0.1),
+}
+
+
+def writtenFiles(fname_base):
+    files = {}
+    for path in sorted(glob.glob(fname_base + ".*")):
+        with open(path, "rb") as fh:
+            files[os.path.splitext(path)[1]] = fh.read()
+    return files
+
+
+@pytest.mark.parametrize("name", list(ENVS))
+@pytest.mark.parametrize("taskcode", ["A", "R"])
+def test_sameBytesAsArlpy(name, taskcode, tmp_path):
+    env = pm.check_env2d(ENVS[name]())
+    assert CEA_envTemplate.supported(env)
+    arlpy_base = str(tmp_path / "arlpy")
+    pm._Bellhop()._create_env_file(env, taskcode, fname_base=arlpy_base)
+
+    folder = str(tmp_path / "scratch")
+    os.makedirs(folder)
+    template_base = os.path.join(folder, "run")
+    try:
+        CEA_envTemplate.templateFor(env, folder).write(env, taskcode, template_base)
+        assert writtenFiles(template_base) == writtenFiles(arlpy_base)
+    finally:
+        CEA_envTemplate.clearTemplates(folder)
+
+
+def test_groupSharesBoundaryFiles(tmp_path):
+    folder = str(tmp_path)
+    first = pm.check_env2d(ENVS["rough_real"]())
+    second = pm.check_env2d(scenarioEnv("rough_waves", "FS17toSTSNew1Real", deltaSS=1.0, bottom_absorption=0.9))
+    with CEA_envTemplate.templatesInUse(folder):
+        template = CEA_envTemplate.templateFor(first, folder)
+        assert CEA_envTemplate.templateFor(second, folder) is template
+        template.write(second, "A", os.path.join(folder, "run2"))
+        arlpy_base = os.path.join(folder, "arlpy")
+        pm._Bellhop()._create_env_file(second, "A", fname_base=arlpy_base)
+        assert writtenFiles(os.path.join(folder, "run2")) == writtenFiles(arlpy_base)
+        assert glob.glob(os.path.join(folder, CEA_envTemplate.GROUP_PREFIX + "*"))
+    # Cleared with the last user of the folder.
+    assert not glob.glob(os.path.join(folder, CEA_envTemplate.GROUP_PREFIX + "*"))
@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+"""CEA_gallery: stashed runs render to figures off the solve loop, and failed renders are reported, not lost."""
+
+import os
+import numpy as np
+import pandas as pd
+from CEA_gallery import GalleryRenderer, renderGallery, stashRun
+
+
+def arrivals():
+    return pd.DataFrame({"time_of_arrival": [0.41, 0.43, 0.47], "angle_of_arrival": [-3.0, 5.0, 12.0],
+                         "surface_bounces": [0, 1, 2], "bottom_bounces": [0, 1, 2], "low_power_dB": [72.0, 65.0, 40.0]})
+
+
+def env():
+    return {"depth": np.array([[0.0, 20.0], [500.0, 22.0]]), "surface": None,
+            "tx_depth": 18.0, "rx_depth": 19.0, "rx_range": 500.0}
+
+
+def test_renderGallery(tmp_path):
+    stash, gallery = str(tmp_path / "stash"), str(tmp_path / "gallery")
+    stashRun(stash, "run0", arrivals=arrivals(), env=env(), meta={"detectionThreshold": 50})
+    stashRun(stash, "run1", arrivals=arrivals())
+    saved = renderGallery(stash, gallery, formats=("png", "svg"), max_workers=1)
+    assert sorted(os.path.basename(p) for p in saved) == ["run0.png", "run0.svg", "run1.png", "run1.svg"]
+    # Already rendered runs are skipped.
+    assert renderGallery(stash, gallery, formats=("png", "svg"), max_workers=1) == []
+
+
+def test_failedRenderIsReported(tmp_path, capsys):
+    stash, gallery = str(tmp_path / "stash"), str(tmp_path / "gallery")
+    with GalleryRenderer(stash, gallery, sample_fraction=1.0, seed=0) as renderer:
+        renderer.submit("good", arrivals=arrivals(), env=env())
+        # A bottom profile without a range column cannot be drawn.
+        renderer.submit("bad", arrivals=arrivals(), env={"depth": np.array([20.0, 21.0, 22.0])})
+    assert [run_id for run_id, _ in renderer.failed] == ["bad"]
+    assert isinstance(renderer.failed[0][1], IndexError)
+    assert "Gallery render failed for bad" in capsys.readouterr().out
+    assert os.listdir(gallery) == ["good.png"]
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+"""CEA_lazy: heavy libraries stay unimported until used, and then behave as the real module."""
+
+import os
+import sys
+import json
+import subprocess
+import pytest
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY = ["pandas", "scipy.stats", "matplotlib", "arlpy", "pyDOE2"]
+
+
+def freshImport(code, **env):
+    """Run code in a new interpreter (nothing imported yet) and return what it prints as JSON."""
+    result = subprocess.run([sys.executable, "-c", code], cwd=REPO, capture_output=True, text=True,
+                            env={**os.environ, "CEA_EAGER_IMPORTS": "0", **env}, check=True)
+    return json.loads(result.stdout)
+
+
+@pytest.mark.parametrize("module", ["CEA_automate", "CEA_asyncRunner", "CEA_arrivals", "CEA_createEnv",
+                                    "CEA_workQueue", "CEA_gallery"])
+def test_importingDoesNotLoadHeavyLibraries(module):
+    loaded = freshImport(f"import sys, json, {module}; print(json.dumps([m for m in {HEAVY} if m in sys.modules]))")
+    assert loaded == []
+
+
+def test_firstUseLoadsTheModule():
+    out = freshImport(
+        "import sys, json\n"
+        "from CEA_lazy import lazyModule, isLoaded\n"
+        "colorsys = lazyModule('colorsys')\n"
+        "before = isLoaded('colorsys')\n"
+        "rgb = colorsys.hsv_to_rgb(0, 0, 1)\n"
+        "import colorsys as real\n"
+        "print(json.dumps([before, isLoaded('colorsys'), list(rgb), colorsys.hsv_to_rgb is real.hsv_to_rgb,\n"
+        "                  'not loaded' in repr(lazyModule('wave'))]))")
+    assert out == [False, True, [1.0, 1.0, 1.0], True, True]
+
+
+def test_eagerImports():
+    loaded = freshImport("import sys, json, CEA_arrivals; print(json.dumps('pandas' in sys.modules))",
+                         CEA_EAGER_IMPORTS="1")
+    assert loaded is True
+
+
+def test_alreadyImportedModuleIsReturnedAsIs():
+    from CEA_lazy import lazyModule
+    assert lazyModule("json") is json
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""CEA_lookupTables.interpolate against scipy's RegularGridInterpolator."""
+
+import numpy as np
+import pytest
+from scipy.interpolate import RegularGridInterpolator
+from CEA_lookupTables import interpolate
+
+
+@pytest.fixture
+def table():
+    rng = np.random.default_rng(0)
+    grids = [np.array([0.0, 2.5, 5, 10, 15]), np.arange(30.0, 80, 5), np.array([-2.0, 0, 4]), np.array([1.0, 3, 6, 11])]
+    values = rng.uniform(0, 1, [len(g) for g in grids])
+    return values, grids
+
+
+def test_matchesScipyInsideTheGrid(table):
+    values, grids = table
+    rng = np.random.default_rng(1)
+    points = [rng.uniform(g[0], g[-1], 500) for g in grids]
+    expected = RegularGridInterpolator(grids, values)(np.column_stack(points))
+    np.testing.assert_allclose(interpolate(values, grids, points), expected)
+
+
+def test_scalarPointMatchesScipy(table):
+    values, grids = table
+    for point in ([3.3, 41.2, 1.0, 7.5], [0.0, 30.0, -2.0, 1.0], [15.0, 75.0, 4.0, 11.0], [5.0, 50.0, 0.0, 6.0]):
+        result = interpolate(values, grids, point)
+        assert isinstance(result, float)
+        assert result == pytest.approx(RegularGridInterpolator(grids, values)(point)[0])
+
+
+def test_outsideIsClampedToTheEdges(table):
+    values, grids = table
+    points = [np.array([-5.0, 20.0]), np.array([10.0, 100.0]), np.array([-9.0, 9.0]), np.array([0.0, 50.0])]
+    clamped = [np.clip(p, g[0], g[-1]) for p, g in zip(points, grids)]
+    expected = RegularGridInterpolator(grids, values)(np.column_stack(clamped))
+    np.testing.assert_allclose(interpolate(values, grids, points), expected)
+
+
+def test_broadcastShape(table):
+    values, grids = table
+    result = interpolate(values, grids, [np.linspace(0, 15, 6)[:, None], np.linspace(30, 75, 4)[None, :], 0.0, 2.0])
+    assert result.shape == (6, 4)
+
+
+def test_stepAxisTakesTheGridValueBelow(table):
+    values, grids = table
+    step = [False, False, False, True]
+    snapped = interpolate(values, grids, [7.0, 42.0, 1.0, 5.9], step=step)
+    assert snapped == pytest.approx(interpolate(values, grids, [7.0, 42.0, 1.0, 3.0]))
+    assert interpolate(values, grids, [7.0, 42.0, 1.0, 11.0], step=step) == \
+        pytest.approx(interpolate(values, grids, [7.0, 42.0, 1.0, 11.0]))
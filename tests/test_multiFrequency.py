@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""CEA_multiFrequency: one geometry for every frequency, per-frequency source levels, and a power-averaged broadband row."""
+
+import numpy as np
+import pandas as pd
+import pytest
+import CEA_multiFrequency
+from CEA_createEnv import buildGeometry, createEnv, envFromGeometry
+from CEA_multiFrequency import runFrequencyBand
+
+
+def test_envFromGeometryMatchesCreateEnv():
+    env = createEnv(surface_type="mid_waves", scenario="STSNew1toFS17Real", frequency=180000, deltaSS=4,
+                    gradient_depth=6, bottom_absorption=1.5)[0]
+    geometry = buildGeometry(surface_type="mid_waves", scenario="STSNew1toFS17Real", deltaSS=4, gradient_depth=6)
+    rebuilt = envFromGeometry(geometry, frequency=180000, bottom_absorption=1.5)
+    assert env.keys() == rebuilt.keys()
+    for key, value in env.items():
+        if isinstance(value, pd.DataFrame):
+            pd.testing.assert_frame_equal(value, rebuilt[key])
+        else:
+            np.testing.assert_array_equal(value, rebuilt[key])
+
+
+def arrivalsAt(frequency):
+    # Higher frequencies lose 6 dB more on every path.
+    loss = 6 if frequency > 100000 else 0
+    amplitude = 10 ** (np.array([-80.0, -90.0, -100.0, -110.0]) / 20 - loss / 20)
+    return pd.DataFrame({"time_of_arrival": [0.4, 0.41, 0.42, 0.43], "angle_of_arrival": [0.0, 5.0, -5.0, 10.0],
+                         "surface_bounces": [0, 0, 1, 1], "bottom_bounces": [0, 1, 1, 2],
+                         "arrival_amplitude": amplitude.astype(complex)})
+
+
+@pytest.fixture
+def solved(monkeypatch):
+    envs, geometries = [], []
+    buildGeometry = CEA_multiFrequency.buildGeometry
+
+    def countingBuildGeometry(**kwargs):
+        geometries.append(kwargs)
+        return buildGeometry(**kwargs)
+
+    def runJobs(jobs, on_result, **kwargs):
+        # Finish out of order, as the real runner may.
+        jobs = list(jobs)
+        envs.extend(env for _, env in jobs)
+        for f, env in reversed(jobs):
+            on_result(f, arrivalsAt(env["frequency"]), None)
+
+    monkeypatch.setattr(CEA_multiFrequency, "buildGeometry", countingBuildGeometry)
+    monkeypatch.setattr(CEA_multiFrequency, "runJobs", runJobs)
+    return envs, geometries
+
+
+def test_runFrequencyBand(solved):
+    envs, geometries = solved
+    results = runFrequencyBand([180000, 69000], SBL=2, detectionThreshold=40,
+                               source_levels={180000.0: 150.0})
+    assert len(geometries) == 1
+    assert [env["frequency"] for env in envs] == [180000, 69000]
+
+    assert list(results["Frequency_Hz"]) == [69000.0, 180000.0, "broadband"]
+    assert (results["SBL"] == 2).all() and (results["Detection_Threshold"] == 40).all()
+    low, high = results.iloc[0], results.iloc[1]
+    # 142 dB source at 69 kHz: 62, 52, 40, 30 dB after SBL. 150 dB at 180 kHz, 6 dB more path loss: 64, 54, 42, 32.
+    assert low["Avg_Signal_dB"] == pytest.approx(46.0) and low["Detectable"] == 3
+    assert high["Avg_Signal_dB"] == pytest.approx(48.0) and high["Detectable"] == 3
+
+    broadband = results.iloc[2]
+    assert broadband["Avg_Signal_dB"] == pytest.approx(10 * np.log10((10 ** 4.6 + 10 ** 4.8) / 2))
+    assert broadband["Detectable_Fraction"] == pytest.approx(0.75)
+    assert np.isnan(broadband["CI_Lower_dB"])
+
+
+def test_failedFrequencyIsSkipped(monkeypatch):
+    def runJobs(jobs, on_result, **kwargs):
+        for f, env in jobs:
+            if f > 100000:
+                on_result(f, None, RuntimeError("FATAL ERROR"))
+            else:
+                on_result(f, arrivalsAt(f), None)
+
+    monkeypatch.setattr(CEA_multiFrequency, "runJobs", runJobs)
+    results = runFrequencyBand([69000, 180000])
+    assert list(results["Frequency_Hz"]) == [69000.0, "broadband"]
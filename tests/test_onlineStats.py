@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""CEA_onlineStats: streamed and merged statistics match NumPy, and histograms match processArrivals' pd.cut."""
+
+import numpy as np
+import pandas as pd
+import pytest
+from CEA_onlineStats import RunningStats, HistogramSketch, GroupedAccumulator, DB_BINS
+
+
+@pytest.fixture
+def values():
+    return np.random.default_rng(0).normal(60, 12, 5000)
+
+
+def test_runningStatsMatchesNumpy(values):
+    stats = RunningStats()
+    for x in values:
+        stats.update(x)
+    assert stats.n == len(values)
+    assert stats.mean == pytest.approx(values.mean())
+    assert stats.variance == pytest.approx(values.var(ddof=1))
+    assert (stats.min, stats.max) == (values.min(), values.max())
+
+
+def test_mergeInAnyOrderMatchesNumpy(values):
+    parts = np.split(values, [7, 100, 2500, 4999])
+    forward = RunningStats()
+    for part in parts:
+        forward.merge(RunningStats.fromValues(part))
+    backward = RunningStats()
+    for part in reversed(parts):
+        backward.merge(RunningStats.fromValues(part))
+    for stats in (forward, backward):
+        assert stats.n == len(values)
+        assert stats.mean == pytest.approx(values.mean())
+        assert stats.std == pytest.approx(values.std(ddof=1))
+
+
+def test_nansAndEmptyMerges():
+    stats = RunningStats.fromValues([1.0, np.nan, 3.0])
+    stats.merge(RunningStats())
+    assert stats.n == 2 and stats.mean == 2.0
+    assert RunningStats().merge(stats).mean == 2.0
+    assert np.isnan(RunningStats.fromValues([5.0]).ci()[0])
+
+
+def test_roundTripThroughDict(values):
+    stats = RunningStats.fromValues(values)
+    again = RunningStats.fromDict(stats.toDict())
+    assert (again.n, again.mean, again.m2, again.min, again.max) == (stats.n, stats.mean, stats.m2, stats.min, stats.max)
+
+
+def test_histogramMatchesPdCut():
+    # Edge values on purpose: 0 and 10 are both in the first bin (right-closed, lowest edge included), 90 in the last.
+    values = np.concatenate([np.random.default_rng(1).uniform(-5, 100, 3000), [0, 10, 20, 80, 90]])
+    # As processArrivals bins them; values outside the edges are left out.
+    expected = pd.Series(pd.cut(values, bins=DB_BINS, include_lowest=True)).value_counts().sort_index().to_numpy()
+    sketch = HistogramSketch()
+    sketch.addValues(values)
+    np.testing.assert_array_equal(sketch.counts, expected)
+
+
+def test_histogramMerge():
+    rng = np.random.default_rng(2)
+    a, b = rng.uniform(0, 90, 400), rng.uniform(0, 90, 600)
+    merged = HistogramSketch()
+    merged.addValues(a)
+    other = HistogramSketch()
+    other.addValues(b)
+    merged.merge(other)
+    whole = HistogramSketch()
+    whole.addValues(np.concatenate([a, b]))
+    np.testing.assert_array_equal(merged.counts, whole.counts)
+    with pytest.raises(ValueError):
+        merged.merge(HistogramSketch(edges=[0, 50, 100]))
+
+
+def test_groupedAccumulatorMerge():
+    rows = [{"scenario": s, "surface": "flat_surface"} for s in ("A", "B", "A", "A")]
+    outputs = [{"Avg_Signal_dB": v, "Detectable_Fraction": v / 100} for v in (50, 60, 70, 80)]
+    whole, first, second = GroupedAccumulator(), GroupedAccumulator(), GroupedAccumulator()
+    for i, (r, o) in enumerate(zip(rows, outputs)):
+        whole.update(r, o)
+        (first if i < 2 else second).update(r, o)
+    first.merge(second)
+    for key in (("A", "flat_surface"), ("B", "flat_surface")):
+        assert first.stats(key, "Avg_Signal_dB").mean == pytest.approx(whole.stats(key, "Avg_Signal_dB").mean)
+    assert first.stats(("A", "flat_surface"), "Avg_Signal_dB").n == 3
+
+
+def test_runsIncludeRunsWithoutValues():
+    key = ("A", "flat_surface")
+    acc = GroupedAccumulator()
+    for v in (50, np.nan, np.nan, 70):
+        acc.update({"scenario": "A", "surface": "flat_surface"}, {"Avg_Signal_dB": v})
+    assert acc.runs(key) == 4 and acc.stats(key, "Avg_Signal_dB").n == 2
+    assert acc.merge(GroupedAccumulator.fromDict(acc.toDict())).runs(key) == 8
+    # Snapshots from before runs were counted fall back to the most values of any metric.
+    old = acc.toDict()
+    del old["groups"][0]["runs"]
+    assert GroupedAccumulator.fromDict(old).runs(key) == 4
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""CEA_preflight: a good environment passes, and each deliberately broken one is caught."""
+
+import copy
+import numpy as np
+import pandas as pd
+import pytest
+from CEA_createEnv import createEnv
+from CEA_preflight import checkEnv, checkRow, preflight
+
+
+@pytest.fixture(scope="module")
+def built():
+    outputs = createEnv(surface_type="rough_waves", scenario="STSNew1toFS17Real", deltaSS=4, gradient_depth=6)
+    return outputs[0], outputs[6]
+
+
+def errors(problems):
+    return [message for severity, message in problems if severity == "error"]
+
+
+def breakEnv(env, **changes):
+    broken = copy.deepcopy(env)
+    broken.update(changes)
+    return broken
+
+
+def test_builtEnvHasNoErrors(built):
+    env, signalRange = built
+    assert errors(checkEnv(env, signalRange)) == []
+
+
+def test_brokenBathymetry(built):
+    env, signalRange = built
+    depth = env["depth"].copy()
+    depth[[1, 2]] = depth[[2, 1]]
+    assert any("bathymetry ranges" in m for m in errors(checkEnv(breakEnv(env, depth=depth), signalRange)))
+    short = env["depth"][env["depth"][:, 0] < env["rx_range"] / 2]
+    assert any("before the receiver" in m for m in errors(checkEnv(breakEnv(env, depth=short), signalRange)))
+
+
+def test_shortSurfaceIsAWarningPastTheReceiver(built):
+    env, signalRange = built
+    surface = env["surface"][env["surface"][:, 0] <= env["rx_range"] + 1]
+    problems = checkEnv(breakEnv(env, surface=surface), signalRange)
+    assert errors(problems) == [] and any("surface ends" in m for s, m in problems if s == "warning")
+
+
+def test_surfaceReachingTheBottom(built):
+    env, signalRange = built
+    surface = env["surface"].copy()
+    surface[len(surface) // 2, 1] = 100.0
+    assert "surface reaches the bottom" in errors(checkEnv(breakEnv(env, surface=surface), signalRange))
+
+
+def test_brokenSsp(built):
+    env, signalRange = built
+    ssp = env["soundspeed"]
+    shallow = ssp[ssp.index < 10]
+    assert any("SSP ends" in m for m in errors(checkEnv(breakEnv(env, soundspeed=shallow), signalRange)))
+    narrow = ssp[[c for c in ssp.columns if c < 100]]
+    assert any("whole box" in m for m in errors(checkEnv(breakEnv(env, soundspeed=narrow), signalRange)))
+    holes = ssp.copy()
+    holes.iloc[3, 1] = np.nan
+    assert "SSP has missing sound speeds" in errors(checkEnv(breakEnv(env, soundspeed=holes), signalRange))
+    deep_start = ssp[ssp.index >= 0]
+    assert any("wave crest" in m for m in errors(checkEnv(breakEnv(env, soundspeed=deep_start), signalRange)))
+
+
+def test_instrumentsOutsideTheWater(built):
+    env, signalRange = built
+    assert any(m.startswith("transmitter") for m in errors(checkEnv(breakEnv(env, tx_depth=50.0), signalRange)))
+    assert any(m.startswith("receiver") for m in errors(checkEnv(breakEnv(env, rx_depth=0.0), signalRange)))
+
+
+def test_checkRow():
+    row = {"scenario": "STSNew1toFS17Real", "surface": "flat_surface", "bottom_absorption": 0.5, "SBL": 3,
+           "detectionThreshold": 50, "deltaSS": 4, "gradient_depth": 6}
+    assert checkRow(row, {"SBL": (0, 15)}) == []
+    assert checkRow(dict(row, SBL=20), {"SBL": (0, 15)})[0][0] == "warning"
+    assert [s for s, _ in checkRow(dict(row, deltaSS="4", gradient_depth=np.nan, surface=None))] == ["error"] * 3
+
+
+def test_preflightReportsBadScenarios():
+    plan = [{"scenario": scenario, "surface": "flat_surface", "bottom_absorption": 0.5, "SBL": 3,
+             "detectionThreshold": 50, "deltaSS": 4, "gradient_depth": 6}
+            for scenario in ("STSNew1toFS17Real", "NoSuchScenario")]
+    summary, problems = preflight(plan, concurrency=2, workers=1, verbose=False)
+    assert isinstance(problems, pd.DataFrame)
+    bad = problems[problems["severity"] == "error"]
+    assert list(bad["scenario"]) == ["NoSuchScenario"] and "createEnv failed" in bad["problem"].iloc[0]
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""CEA_replay: log gaps are filled in time, wind/noise/stratification map onto createEnv, and timesteps share solves."""
+
+import numpy as np
+import pandas as pd
+import pytest
+import CEA_replay
+from CEA_replay import loadLog, mapEnvironment, runReplay
+
+
+@pytest.fixture
+def logFile(tmp_path):
+    # Hourly met data; the glider only profiled every three hours.
+    path = tmp_path / "log.csv"
+    pd.DataFrame({
+        "timestamp": pd.date_range("2024-06-01", periods=7, freq="h").strftime("%Y-%m-%d %H:%M"),
+        "wind_speed": [0.0, 3.0, 6.0, 12.0, 20.0, 2.0, 3.5],
+        "noise_dB": [45.0, 45.0, 50.0, 55.0, 60.0, 45.0, 48.04],
+        "deltaSS": [4.0, None, None, 4.6, None, None, 4.02],
+        "gradient_depth": [6.0, None, None, 7.5, None, None, 6.1],
+    }).to_csv(path, index=False)
+    return str(path)
+
+
+def test_loadLogFillsGapsInTime(logFile):
+    log = loadLog(logFile)
+    assert isinstance(log.index, pd.DatetimeIndex) and log.index.is_monotonic_increasing
+    np.testing.assert_allclose(log["deltaSS"], [4.0, 4.2, 4.4, 4.6, 4.4067, 4.2133, 4.02], atol=1e-4)
+    assert not log.isna().any().any()
+
+
+def test_mapEnvironment(logFile):
+    params = mapEnvironment(loadLog(logFile), threshold_offset=2)
+    # UWAPL handbook points are hit exactly, and SBL is capped at 15 dB.
+    np.testing.assert_allclose(params["SBL"], [0, 2.21, 4.42, 13.12, 15, 1.47, 2.58])
+    assert list(params["surface"]) == ["flat_surface", "flat_surface", "mid_waves", "rough_waves", "rough_waves",
+                                       "flat_surface", "flat_surface"]
+    np.testing.assert_allclose(params["detectionThreshold"], [47, 47, 52, 57, 62, 47, 50])
+    # Stratification rounded to 0.1 m/s and 0.5 m, so nearly equal profiles compare equal.
+    np.testing.assert_allclose(params["deltaSS"], [4.0, 4.2, 4.4, 4.6, 4.4, 4.2, 4.0])
+    np.testing.assert_allclose(params["gradient_depth"], [6.0, 6.5, 7.0, 7.5, 7.0, 6.5, 6.0])
+
+
+def test_runReplaySharesSolves(logFile, monkeypatch):
+    built = []
+
+    def createEnv(surface_type, scenario, bottom_absorption, deltaSS, gradient_depth):
+        built.append((surface_type, deltaSS, gradient_depth))
+        return ({"surface": surface_type},)
+
+    def runJobs(jobs, on_result, **kwargs):
+        for key, env in jobs:
+            # A calm surface gives two direct paths; anything else also gives one surface bounce.
+            bounces = [0, 0] if env["surface"] == "flat_surface" else [0, 0, 1]
+            on_result(key, pd.DataFrame({
+                "time_of_arrival": np.linspace(0.4, 0.5, len(bounces)), "angle_of_arrival": 0.0,
+                "surface_bounces": bounces, "bottom_bounces": 0,
+                "arrival_amplitude": np.full(len(bounces), 10 ** (-90 / 20), dtype=complex)}), None)
+
+    monkeypatch.setattr(CEA_replay, "createEnv", createEnv)
+    monkeypatch.setattr(CEA_replay, "runJobs", runJobs)
+    series = runReplay(logFile, "STSNew1toFS17Real")
+
+    # Every layer depth here snaps to the same SSP grid point (see CEA_canonical), so hours 0 and 6, and 1 and 5,
+    # land on the same environment.
+    assert len(built) == 5 and len(set(built)) == 5
+    solve_id = list(series["Solve_ID"])
+    assert solve_id[0] == solve_id[6] and solve_id[1] == solve_id[5] and len(set(solve_id)) == 5
+    # 142 - 90 = 52 dB direct, less SBL on the surface bounce; each hour uses its own noise and SBL.
+    assert list(series["Detectable"]) == [2, 2, 2, 0, 0, 2, 2]
+    assert list(series["Undetectable"]) == [0, 0, 1, 3, 3, 0, 0]
+    assert series["Avg_Signal_dB"].iat[0] == 52.0
+    assert series["Avg_Signal_dB"].iat[3] == pytest.approx(round(52 - 13.12 / 3, 1))
+    assert (series["Scenario"] == "STSNew1toFS17Real").all()
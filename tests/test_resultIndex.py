@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+"""CEA_resultIndex: ingested sweeps answer filtered, sorted queries (Bin_* columns included) like pandas would."""
+
+import csv
+import os
+import sqlite3
+import numpy as np
+import pandas as pd
+import pytest
+import CEA_resultIndex
+from CEA_resultIndex import BIN_COLUMNS, RUN_COLUMNS, ResultIndex, parseCondition
+
+SCENARIOS = ["STSNew1toFS17Real", "FS17toSTSNew1Flat"]
+SURFACES = ["Flat", "Mid", "Rough"]
+
+
+def writeSweep(folder, n, seed, name="sweep"):
+    """A modelOutputs file and its binnedAmplitudes file, rows in the same order."""
+    rng = np.random.default_rng(seed)
+    runs = pd.DataFrame({
+        "Timestamp": "2026-10-19 12:00:00",
+        "Scenario": rng.choice(SCENARIOS, n),
+        "topDescrip": rng.choice(SURFACES, n),
+        "SBL": np.round(rng.uniform(0, 15, n), 2),
+        "deltaSS": np.round(rng.uniform(0, 10, n), 2),
+        "gradient_depth": np.round(rng.uniform(5, 12, n), 1),
+        "Detection_Threshold": np.round(rng.uniform(30, 75, n), 1),
+        "Bottom_Absorption": np.round(rng.uniform(0, 5, n), 2),
+        "Detectable": rng.integers(0, 200, n),
+        "Undetectable": rng.integers(0, 200, n),
+        "Avg_Signal_dB": np.round(rng.uniform(20, 80, n), 1),
+        "Fidelity": rng.choice(["screen", "full"], n),
+    })
+    bins = pd.DataFrame({c: rng.integers(0, 50, n) for c in BIN_COLUMNS})
+    output_file, output_file2 = os.path.join(folder, f"{name}_outputs.csv"), os.path.join(folder, f"{name}_bins.csv")
+    runs.to_csv(output_file, index=False)
+    pd.concat([runs[["Scenario", "deltaSS"]], bins], axis=1).to_csv(output_file2, index=False)
+    return output_file, output_file2, pd.concat([runs, bins], axis=1)
+
+
+@pytest.fixture
+def indexed(tmp_path):
+    output_file, output_file2, expected = writeSweep(str(tmp_path), 500, seed=0)
+    index = ResultIndex(str(tmp_path / "index.sqlite"))
+    assert index.ingest(output_file, output_file2) == 500
+    yield index, expected
+    index.close()
+
+
+def test_ingestSkipsUnchangedFiles(indexed, tmp_path):
+    index, _ = indexed
+    output_file, output_file2 = str(tmp_path / "sweep_outputs.csv"), str(tmp_path / "sweep_bins.csv")
+    assert index.ingest(output_file, output_file2) == 0
+    # Appended to since: re-loaded, not duplicated.
+    with open(output_file, "a", newline="") as fh:
+        csv.writer(fh).writerow(["2026-10-19 13:00:00", SCENARIOS[0], "Flat", 1, 1, 6, 50, 1, 1, 1, 50.0, "full"])
+    assert index.ingest(output_file, output_file2) == 501
+    assert index.count() == 501 and list(index.sources()["n_rows"]) == [501]
+
+
+def test_filters(indexed):
+    index, expected = indexed
+    got = index.query(["scenario", "surface", "SBL", "deltaSS"], scenario=SCENARIOS[0], surface=["Mid", "Rough"],
+                      SBL=(">", 10), where={"deltaSS": ("<=", 5)}, order_by="SBL")
+    want = expected[(expected["Scenario"] == SCENARIOS[0]) & expected["topDescrip"].isin(["Mid", "Rough"])
+                    & (expected["SBL"] > 10) & (expected["deltaSS"] <= 5)].sort_values("SBL")
+    assert len(got) > 0
+    np.testing.assert_array_equal(got["SBL"], want["SBL"])
+    assert index.count(scenario=SCENARIOS[0], SBL=(">", 10)) == int(
+        ((expected["Scenario"] == SCENARIOS[0]) & (expected["SBL"] > 10)).sum())
+
+
+def test_severalConditionsOnOneColumn(indexed):
+    index, expected = indexed
+    want = expected[(expected["SBL"] > 5) & (expected["SBL"] < 10) & (expected["deltaSS"] >= 2)
+                    & (expected["deltaSS"] <= 4)].sort_values("SBL")
+    assert 0 < len(want) < len(expected)
+    got = index.query(["SBL"], where=[("SBL", ">", 5), ("SBL", "<", 10)], deltaSS=(2, 4), order_by="SBL")
+    np.testing.assert_array_equal(got["SBL"], want["SBL"])
+    # The command line's parsed conditions, and an open-ended range.
+    assert index.count(where=[parseCondition("SBL>5"), parseCondition("SBL<10"), ("deltaSS", (2, 4))]) == len(want)
+    assert index.count(SBL=(None, 5)) == int((expected["SBL"] <= 5).sum())
+    with pytest.raises(ValueError, match="Unknown operator"):
+        index.count(where=[("SBL", "~", 5)])
+
+
+def test_binColumnsInFiltersAndOrder(indexed):
+    index, expected = indexed
+    # Sorting and filtering on a Bin_* column needs the bins table, even when no Bin_* column is selected.
+    got = index.query(["SBL", "Avg_Signal_dB"], where={"Bin_50": (">=", 40)}, order_by="Bin_50", limit=10)
+    want = expected[expected["Bin_50"] >= 40].sort_values("Bin_50", kind="stable")
+    assert len(got) == min(10, len(want))
+    kept = expected.set_index(["SBL", "Avg_Signal_dB"]).loc[list(zip(got["SBL"], got["Avg_Signal_dB"]))]
+    assert (kept["Bin_50"] >= 40).all() and kept["Bin_50"].is_monotonic_increasing
+    assert index.count(Bin_50=(">=", 40)) == len(want)
+    # Bin_* and run columns side by side, filtered on both tables.
+    got = index.query(["Scenario", "Bin_0", "Bin_90"], scenario=SCENARIOS[1], Bin_0=("<", 10), order_by="Bin_90")
+    want = expected[(expected["Scenario"] == SCENARIOS[1]) & (expected["Bin_0"] < 10)]
+    assert sorted(got["Bin_0"]) == sorted(want["Bin_0"]) and got["Bin_90"].is_monotonic_increasing
+
+
+def test_queriesUseIndexes(indexed):
+    index, _ = indexed
+    plan = " ".join(index.explain(["SBL"], scenario=SCENARIOS[0], surface="Flat"))
+    assert "USING INDEX" in plan
+
+
+def test_bulkLoad(tmp_path, monkeypatch):
+    monkeypatch.setattr(CEA_resultIndex, "BULK_BYTES", 0)
+    files = [writeSweep(str(tmp_path), 200, seed=k, name=f"sweep{k}")[:2] for k in range(3)]
+    with ResultIndex(str(tmp_path / "index.sqlite")) as index:
+        assert index.ingestMany(files) == 600
+        assert index.ingest(*files[0]) == 0
+        assert index.count() == 600 and len(index.query(["Bin_10"])) == 600
+        assert "USING INDEX" in " ".join(index.explain(["SBL"], deltaSS=("<", 1)))
+
+
+def test_oldIndexGetsNewColumns(tmp_path):
+    path = str(tmp_path / "old.sqlite")
+    conn = sqlite3.connect(path)
+    columns = ", ".join(f'"{c}" {t}' for c, t in RUN_COLUMNS.items() if c != "Fidelity")
+    conn.execute(f"CREATE TABLE runs (run_id INTEGER PRIMARY KEY, source_id INTEGER, row_number INTEGER, {columns})")
+    conn.execute('INSERT INTO runs (run_id, "Scenario") VALUES (1, ?)', (SCENARIOS[0],))
+    conn.commit()
+    conn.close()
+    with ResultIndex(path) as index:
+        got = index.query(["Scenario", "Fidelity"])
+    assert list(got["Scenario"]) == [SCENARIOS[0]] and got["Fidelity"].isna().all()
+
+
+def test_unknownColumn(indexed):
+    index, _ = indexed
+    with pytest.raises(ValueError, match="Unknown column"):
+        index.query(["SBL"], order_by="Bin_55")
+
+
+def test_parseCondition():
+    assert parseCondition("SBL>10") == ("SBL", (">", 10.0))
+    assert parseCondition(" deltaSS <= 2.5 ") == ("deltaSS", ("<=", 2.5))
+    assert parseCondition("scenario=STSNew1toFS17Real") == ("scenario", ("=", "STSNew1toFS17Real"))
+    with pytest.raises(ValueError):
+        parseCondition("SBL ~ 10")
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""CEA_runContext and CEA_bellhop.solve: paths are absolute, nothing changes directory, and threads do not collide."""
+
+import os
+import shutil
+import CEA_runContext
+from CEA_bellhop import solve, solveMany
+from CEA_runContext import RunContext
+
+
+def test_pathsAreAbsolute(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    context = RunContext(bellhop_exe="bin/bellhop", scratch_dir="scratch", output_dir="out")
+    assert context.bellhop_exe == str(tmp_path / "bin" / "bellhop")
+    assert context.scratch_dir == str(tmp_path / "scratch") and context.output_dir == str(tmp_path / "out")
+    # Created only when asked for.
+    assert not os.path.exists("scratch") and not os.path.exists("out")
+    assert context.makeDirs() is context
+    assert os.path.isdir("scratch") and os.path.isdir("out")
+    path = context.outputPath("figures", "run1.png")
+    assert path == str(tmp_path / "out" / "figures" / "run1.png") and os.path.isdir(os.path.dirname(path))
+    # Still the same folders after the working directory moves, also in a copy.
+    monkeypatch.chdir(tmp_path / "out")
+    copy = context.replace(output_dir="results")
+    assert copy.scratch_dir == str(tmp_path / "scratch") and copy.output_dir == str(tmp_path / "out" / "results")
+
+
+def test_executableIsLookedUpOnThePath():
+    assert RunContext(bellhop_exe="python3").bellhop_exe == shutil.which("python3")
+    # Not found: kept as given, so launching it reports the name.
+    assert RunContext(bellhop_exe="no_bellhop_here").bellhop_exe == "no_bellhop_here"
+
+
+def test_defaultsFromEnvironment():
+    assert RunContext().output_dir == os.path.abspath(CEA_runContext.DEFAULT_OUTPUT)
+    assert RunContext().scratch_dir == os.path.abspath(CEA_runContext.DEFAULT_SCRATCH)
+
+
+def test_solveLeavesWorkingDirectoryAlone(fakeBellhop, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    # The fake Bellhop reports the folder it ran in: the scratch folder, not ours.
+    assert solve({"name": "run0"}, context=fakeBellhop) == fakeBellhop.scratch_dir
+    assert os.getcwd() == str(tmp_path)
+    assert os.listdir(fakeBellhop.scratch_dir) == ["calls.log"]
+
+
+def test_solveManyInThreads(fakeBellhop):
+    results = solveMany([{"name": f"run{k}"} for k in range(8)], context=fakeBellhop, max_workers=4)
+    assert results == [fakeBellhop.scratch_dir] * 8
+    with open(os.path.join(fakeBellhop.scratch_dir, "calls.log")) as fh:
+        names = fh.read().split()
+    # Every run had its own files.
+    assert len(names) == len(set(names)) == 8
+    assert os.listdir(fakeBellhop.scratch_dir) == ["calls.log"]
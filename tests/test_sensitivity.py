@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""CEA_sensitivity: Sobol and Morris indices of analytic functions, whose indices are known exactly."""
+
+import numpy as np
+import pytest
+from CEA_sensitivity import saltelliDesign, morrisDesign, sobolIndices, morrisIndices, toPlan
+
+
+def ishigami(x, a=7, b=0.1):
+    x = -np.pi + 2 * np.pi * x          # The unit cube onto [-pi, pi]^3
+    return np.sin(x[..., 0]) + a * np.sin(x[..., 1]) ** 2 + b * x[..., 2] ** 4 * np.sin(x[..., 0])
+
+
+def ishigamiIndices(a=7, b=0.1):
+    v1 = 0.5 * (1 + b * np.pi ** 4 / 5) ** 2
+    v2 = a ** 2 / 8
+    v13 = b ** 2 * np.pi ** 8 * (1 / 18 - 1 / 50)
+    var = v1 + v2 + v13
+    return np.array([v1, v2, 0]) / var, np.array([v1 + v13, v2, v13]) / var
+
+
+def test_sobolOnIshigami():
+    A, B, AB = saltelliDesign(2 ** 13, 3, seed=0)
+    result = sobolIndices(ishigami(A), ishigami(B), ishigami(AB), n_bootstrap=200, seed=0)
+    S1, ST = ishigamiIndices()
+    np.testing.assert_allclose(result["S1"], S1, atol=0.03)
+    np.testing.assert_allclose(result["ST"], ST, atol=0.03)
+    assert result["n"] == 2 ** 13
+    assert np.all(result["S1_ci"][:, 0] <= result["S1_ci"][:, 1])
+
+
+def test_sobolDropsFailedPoints():
+    A, B, AB = saltelliDesign(256, 3, seed=1)
+    yA = ishigami(A)
+    yA[:10] = np.nan
+    assert sobolIndices(yA, ishigami(B), ishigami(AB), n_bootstrap=10, seed=0)["n"] == 246
+
+
+def test_saltelliDesign():
+    A, B, AB = saltelliDesign(64, 4, seed=2)
+    for i in range(4):
+        np.testing.assert_array_equal(AB[i][:, i], B[:, i])
+        np.testing.assert_array_equal(np.delete(AB[i], i, axis=1), np.delete(A, i, axis=1))
+
+
+def test_morrisOnLinearFunction():
+    # Every elementary effect of a linear function is its coefficient, whatever the point and direction.
+    coefficients = np.array([3.0, -1.0, 0.0, 0.5])
+    points, steps, delta = morrisDesign(30, 4, levels=4, seed=0)
+    assert np.all((points >= 0) & (points <= 1))
+    result = morrisIndices(points @ coefficients, steps, points, delta, n_bootstrap=50, seed=0)
+    np.testing.assert_allclose(result["mu"], coefficients)
+    np.testing.assert_allclose(result["mu_star"], np.abs(coefficients))
+    np.testing.assert_allclose(result["sigma"], 0, atol=1e-12)
+
+
+def test_morrisOnNonlinearFunction():
+    # x0 ** 2: the effect depends on where it is taken (sigma > 0); x1 does nothing.
+    points, steps, delta = morrisDesign(50, 2, seed=3)
+    result = morrisIndices(points[..., 0] ** 2, steps, points, delta, n_bootstrap=50, seed=0)
+    assert result["mu_star"][0] > 0 and result["sigma"][0] > 0
+    assert result["mu_star"][1] == 0
+
+
+def test_toPlanScalesToBounds():
+    bounds = {"SBL": (0, 15), "deltaSS": (-2, 4)}
+    plan = toPlan([[0, 1], [0.5, 0.5]], "S", "flat_surface", bounds)
+    assert plan[0] == {"SBL": 0.0, "deltaSS": 4.0, "scenario": "S", "surface": "flat_surface"}
+    assert plan[1]["SBL"] == pytest.approx(7.5) and plan[1]["deltaSS"] == pytest.approx(1.0)
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""CEA_sharedAssets: published geometries match buildGeometry, are read-only, and reach pool workers by name."""
+
+import sys
+import numpy as np
+import pytest
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import CEA_sharedAssets
+from CEA_createEnv import buildGeometry, envFromGeometry
+from CEA_sharedAssets import AssetStore, ScenarioAssets, initWorker, workerAssets
+
+SCENARIOS = ["FS17toSTSNew1Real", "STSNew1toFS17Flat"]
+SURFACES = ["flat_surface", "rough_waves"]
+
+
+def surfaceShape(row):
+    env = workerAssets().env(row["scenario"], row["surface"], deltaSS=row["deltaSS"],
+                             gradient_depth=row["gradient_depth"])
+    return np.shape(env["surface"]), env["soundspeed"].shape
+
+
+@pytest.mark.parametrize("backend", ["shm", "npy"])
+def test_geometryMatchesBuildGeometry(backend, tmp_path):
+    with AssetStore(SCENARIOS, SURFACES, backend=backend, folder=str(tmp_path)) as store:
+        assets = ScenarioAssets(store.handle)
+        for scenario in SCENARIOS:
+            for surface in SURFACES:
+                shared = assets.geometry(scenario, surface, deltaSS=3, gradient_depth=8)
+                built = buildGeometry(surface_type=surface, scenario=scenario, deltaSS=3, gradient_depth=8)
+                assert shared.keys() == built.keys()
+                for key in ("bottom", "surface"):
+                    np.testing.assert_array_equal(shared[key], np.asarray(built[key], dtype=float))
+                    assert not shared[key].flags.writeable
+                for key in ("topDescrip", "botDescrip", "sspDescrip", "signalRange", "rx_range", "tx_depth", "rx_depth"):
+                    assert shared[key] == built[key]
+                assert shared["soundspeed"].equals(built["soundspeed"])
+        # One bottom per scenario, one surface per scenario x surface.
+        assert len(store.handle["layout"]) == len(SCENARIOS) * (1 + len(SURFACES))
+        env = assets.env(SCENARIOS[0], SURFACES[1], frequency=180000)
+        reference = envFromGeometry(buildGeometry(surface_type=SURFACES[1], scenario=SCENARIOS[0]), frequency=180000)
+        np.testing.assert_array_equal(env["surface"], reference["surface"])
+        assert env["frequency"] == 180000
+
+
+def test_unpublishedScenario():
+    with AssetStore(SCENARIOS[:1], SURFACES[:1]) as store:
+        assets = ScenarioAssets(store.handle)
+        assert assets.published(SCENARIOS[0], SURFACES[0]) and not assets.published(SCENARIOS[0], SURFACES[1])
+        with pytest.raises(ValueError, match="not published"):
+            assets.geometry(SCENARIOS[0], SURFACES[1])
+    with pytest.raises(ValueError):
+        AssetStore(SCENARIOS, SURFACES, backend="pickle")
+
+
+def test_closeFreesSharedMemory():
+    store = AssetStore(SCENARIOS[:1], SURFACES[:1])
+    name = store.handle["location"]
+    store.close()
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name=name)
+
+
+def test_poolWorkersAttachByName():
+    rows = [{"scenario": sc, "surface": sf, "deltaSS": 4, "gradient_depth": 6} for sc in SCENARIOS for sf in SURFACES]
+    with AssetStore(SCENARIOS, SURFACES) as store:
+        with ProcessPoolExecutor(max_workers=2, initializer=initWorker, initargs=(store.handle,)) as pool:
+            shapes = list(pool.map(surfaceShape, rows))
+    expected = [np.shape(buildGeometry(surface_type=row["surface"], scenario=row["scenario"])["surface"]) for row in rows]
+    assert [surface for surface, _ in shapes] == expected
+
+
+def test_workerAssetsNeedsInitWorker(monkeypatch):
+    monkeypatch.setattr(CEA_sharedAssets, "_worker_handle", None)
+    with pytest.raises(RuntimeError, match="initWorker"):
+        workerAssets()
+
+
+def test_attachDoesNotPatchTheResourceTracker(monkeypatch):
+    from multiprocessing import resource_tracker
+    register, real_unregister = resource_tracker.register, resource_tracker.unregister
+    unregistered = []
+
+    def unregister(name, rtype):
+        # Nothing else in the process is affected while the block is attached.
+        assert resource_tracker.register is register
+        unregistered.append((name, rtype))
+        real_unregister(name, rtype)
+
+    monkeypatch.setattr(resource_tracker, "unregister", unregister)
+    with AssetStore(SCENARIOS[:1], SURFACES[:1]) as store:
+        assets = ScenarioAssets(store.handle)
+        assert resource_tracker.register is register
+        # Before Python 3.13 attaching registers the block, so it is unregistered straight away.
+        expected = [(assets._shm._name, "shared_memory")] if sys.version_info < (3, 13) else []
+        assert unregistered == expected
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""CEA_signalSynthesis: a train decodes when every pulse is heard and nothing loud lands outside the pulse windows."""
+
+import numpy as np
+import pandas as pd
+import pytest
+from CEA_compactArrivals import CompactArrivals
+from CEA_signalSynthesis import PULSE_TIMES, RESULT_COLUMNS, SAMPLE_RATE, decode, synthesize
+
+PULSE = int(0.01 * SAMPLE_RATE)
+STARTS = np.round(PULSE_TIMES * SAMPLE_RATE).astype(int)
+
+
+def train(levels_dB, n_samples=STARTS[-1] + 1000):
+    """An envelope with one pulse at each start, at the given levels (dB re 1 uPa)."""
+    envelope = np.zeros(n_samples)
+    for start, level in zip(STARTS, levels_dB):
+        envelope[start:start + PULSE] = 10 ** (level / 20)
+    return envelope
+
+
+def test_decode():
+    clean = train([60] * 8)
+    weak = train([60] * 7 + [40])
+    # An echo 20 ms after each pulse falls in the blanking time; one 150 ms after the first is a false pulse.
+    echo = clean.copy()
+    echo[STARTS + 200] = 10 ** (55 / 20)
+    false_pulse = clean.copy()
+    false_pulse[STARTS[0] + 1500] = 10 ** (55 / 20)
+    result = decode(np.vstack([clean, weak, echo, false_pulse]), detectionThreshold=50)
+
+    assert list(result["Decoded"]) == [True, False, True, False]
+    assert list(result["Pulses_Heard"]) == [8, 7, 8, 8]
+    np.testing.assert_allclose(result["Min_Pulse_dB"], [60, 40, 60, 60])
+    np.testing.assert_allclose(result["Interference_dB"], [0, 0, 0, 55], atol=1e-9)
+    np.testing.assert_allclose(result["SIR_dB"], [60, 40, 60, 5])
+
+
+def test_decodeThresholdAndBlanking():
+    envelope = train([60] * 8)
+    envelope[STARTS[0] + 1500] = 10 ** (55 / 20)
+    # Below a 56 dB threshold the false pulse no longer counts.
+    assert decode(envelope[None, :], detectionThreshold=56)["Decoded"][0]
+    # A longer blanking time swallows it too.
+    assert decode(envelope[None, :], detectionThreshold=50, blanking=0.2)["Decoded"][0]
+    assert not decode(envelope[None, :], detectionThreshold=61)["Decoded"][0]
+
+
+def arrivals(times, levels_dB, surface_bounces=0, sign=1):
+    return pd.DataFrame({"time_of_arrival": times, "angle_of_arrival": 0.0, "surface_bounces": surface_bounces,
+                         "bottom_bounces": 0,
+                         "arrival_amplitude": (sign * 10 ** ((np.asarray(levels_dB) - 142) / 20)).astype(complex)})
+
+
+def test_synthesize():
+    direct = arrivals([0.5], [60])
+    late_echo = arrivals([0.5, 0.65], [60, 58])
+    # Two equal paths in the same sample, opposite in phase: they cancel.
+    cancelled = pd.concat([arrivals([0.5], [60]), arrivals([0.5], [60], sign=-1)], ignore_index=True)
+    bounced = arrivals([0.5], [60], surface_bounces=2)
+    results = synthesize([direct, late_echo, cancelled, bounced], SBL=6, batch_size=3)
+
+    assert list(results.columns) == RESULT_COLUMNS and list(results.index) == [0, 1, 2, 3]
+    assert list(results["Decoded"]) == [True, False, False, False]
+    assert list(results["Pulses_Heard"]) == [8, 8, 0, 0]
+    assert results.loc[0, "Min_Pulse_dB"] == pytest.approx(60)
+    assert results.loc[3, "Min_Pulse_dB"] == pytest.approx(48)
+    assert results.loc[1, "Interference_dB"] == pytest.approx(58) and results.loc[1, "Delay_Spread_ms"] == pytest.approx(150)
+    assert synthesize([]).empty
+
+
+def test_synthesizeUsesEachRunsConditions():
+    # The same surface-bounced path, stored as a sweep stores it: each run with its own SBL and threshold.
+    runs = CompactArrivals()
+    bounced = arrivals([0.5], [60], surface_bounces=1)
+    runs.append(bounced, run_id="a", SBL=0, detectionThreshold=50)
+    runs.append(bounced, run_id="b", SBL=12, detectionThreshold=50)
+    runs.append(bounced, run_id="c", SBL=0, detectionThreshold=65)
+    runs.append(bounced, run_id="d")
+    results = synthesize(runs, SBL=12, detectionThreshold=40)
+    assert list(results.index) == ["a", "b", "c", "d"]
+    assert list(results["Decoded"]) == [True, False, False, True]
+    np.testing.assert_allclose(results["Min_Pulse_dB"], [60, 48, 60, 48])
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""CEA_surfaceLevels.spectralSurfaces and CEA_surfaceEnsemble: random surfaces have the spectrum's wave height."""
+
+import numpy as np
+import pandas as pd
+import pytest
+import CEA_surfaceEnsemble
+from CEA_surfaceEnsemble import REALIZATION_COLUMNS, runEnsemble
+from CEA_surfaceLevels import G, jonswap, significantWaveHeight, spectralSurfaces
+
+
+def spectrumHs(spectrum, **kwargs):
+    """4 x the square root of the area under the spectrum."""
+    omega = np.linspace(1e-3, 20, 200000)
+    return 4 * np.sqrt(np.trapz(spectrum(omega, **kwargs), omega))
+
+
+@pytest.mark.parametrize("wind_speed", [8.0, 12.0])
+def test_pmHeightFollowsWindSpeed(wind_speed):
+    surfaces = spectralSurfaces(1000, 100, "PM", seed=0, wind_speed=wind_speed)
+    # Fully developed sea: Hs of about 0.21 U^2 / g.
+    assert significantWaveHeight(surfaces).mean() == pytest.approx(0.21 * wind_speed ** 2 / G, rel=0.05)
+
+
+def test_jonswapHeightMatchesSpectrum():
+    surfaces = spectralSurfaces(1000, 100, "JONSWAP", seed=0, wind_speed=8.0, fetch=20000)
+    assert significantWaveHeight(surfaces).mean() == pytest.approx(spectrumHs(jonswap, wind_speed=8.0), rel=0.05)
+    # A shorter fetch, a smaller sea.
+    short = spectralSurfaces(1000, 100, "JONSWAP", seed=0, wind_speed=8.0, fetch=2000)
+    assert significantWaveHeight(short).mean() < 0.6 * significantWaveHeight(surfaces).mean()
+
+
+def test_surfaceShapeAndSeed():
+    surfaces = spectralSurfaces(500, 3, "PM", seed=7)
+    assert surfaces.shape == (3, 506, 2)
+    np.testing.assert_array_equal(surfaces[0, :, 0], np.arange(506))
+    np.testing.assert_array_equal(surfaces, spectralSurfaces(500, 3, "PM", seed=7))
+    assert not np.allclose(surfaces[0, :, 1], surfaces[1, :, 1])
+    assert not np.allclose(surfaces, spectralSurfaces(500, 3, "PM", seed=8))
+    assert significantWaveHeight(surfaces[0]) == significantWaveHeight(surfaces)[0]
+
+
+def test_runEnsemble(monkeypatch):
+    surfaces = []
+
+    def runJobs(jobs, on_result, **kwargs):
+        for k, env in jobs:
+            surfaces.append(env["surface"])
+            if k == 2:
+                on_result(k, None, RuntimeError("Bellhop failed"))
+                continue
+            # Realization k: k + 1 arrivals at 60 dB and one at 30 dB (low-power source level 142 dB).
+            level = np.array([60.0] * (k + 1) + [30.0])
+            on_result(k, pd.DataFrame({"time_of_arrival": np.linspace(0.5, 0.6, k + 2), "angle_of_arrival": 0.0,
+                                       "surface_bounces": 0, "bottom_bounces": 0,
+                                       "arrival_amplitude": (10 ** ((level - 142) / 20)).astype(complex)}), None)
+
+    monkeypatch.setattr(CEA_surfaceEnsemble, "runJobs", runJobs)
+    summary, realizations = runEnsemble("FS17toSTSNew1Real", n_realizations=4, spectrum="PM", seed=3,
+                                        detectionThreshold=50, nBeams=100)
+    assert len(surfaces) == 4 and not np.allclose(surfaces[0], surfaces[1])
+    assert list(realizations.columns) == REALIZATION_COLUMNS
+    assert list(realizations["Realization"]) == [0, 1, 3] and list(realizations["Detectable"]) == [1, 2, 4]
+    np.testing.assert_allclose(realizations["Detectable_Fraction"], [1 / 2, 2 / 3, 4 / 5])
+    assert summary["Realizations"] == 4 and summary["Solved"] == 3 and summary["fetch"] is None
+    assert summary["Detectable_Fraction"] == pytest.approx(np.mean([1 / 2, 2 / 3, 4 / 5]))
+    assert summary["Pooled_Detectable_Fraction"] == pytest.approx(7 / 10)
+    # Each row carries the height of the surface it was solved under; the summary averages all of them.
+    heights = [significantWaveHeight(np.asarray(surface)) for surface in surfaces]
+    np.testing.assert_allclose(realizations["Hs_m"], [heights[0], heights[1], heights[3]])
+    assert summary["Hs_m"] == pytest.approx(np.mean(heights))
+
+
+def test_invalidSpectrum():
+    with pytest.raises(ValueError, match="Invalid spectrum"):
+        runEnsemble("FS17toSTSNew1Real", spectrum="Bretschneider")
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""CEA_workQueue: chunks are claimed once, expired leases are requeued, and results merge back chunk by chunk."""
+
+import os
+import time
+import pytest
+from CEA_workQueue import writePlan, claimChunk, requeueExpired, queueStatus, mergeResults
+
+
+@pytest.fixture
+def queue(tmp_path):
+    plan = [{"scenario": "FS17toSTSNew1Real", "surface": "flat_surface", "SBL": float(i)} for i in range(10)]
+    queue_dir = str(tmp_path / "queue")
+    assert writePlan(queue_dir, plan, chunk_size=4, lease_seconds=60, share_geometry=False) == 3
+    return queue_dir
+
+
+def test_planChunks(queue):
+    assert queueStatus(queue) == {"pending": 3, "claimed": 0, "done": 0, "n_chunks": 3}
+    with pytest.raises(ValueError):
+        writePlan(queue, [{}], share_geometry=False)
+
+
+def test_eachChunkIsClaimedOnce(queue):
+    claims = [claimChunk(queue) for _ in range(4)]
+    assert claims[-1] is None
+    chunks = [chunk for chunk, _ in claims[:3]]
+    assert [c["chunk_id"] for c in chunks] == ["chunk_000000", "chunk_000001", "chunk_000002"]
+    assert [c["first_run"] for c in chunks] == [0, 4, 8]
+    assert [row["SBL"] for c in chunks for row in c["rows"]] == [float(i) for i in range(10)]
+    assert queueStatus(queue)["claimed"] == 3
+
+
+def test_expiredLeaseIsRequeued(queue):
+    (_, stale), (_, fresh) = claimChunk(queue), claimChunk(queue)
+    old = time.time() - 120
+    os.utime(stale, (old, old))
+    assert requeueExpired(queue) == ["chunk_000000"]
+    assert queueStatus(queue)["pending"] == 2 and os.path.exists(fresh)
+    # The requeued chunk goes to the next worker, with a new lease.
+    chunk, path = claimChunk(queue)
+    assert chunk["chunk_id"] == "chunk_000000"
+    assert time.time() - os.path.getmtime(path) < 60
+    assert requeueExpired(queue) == []
+
+
+def test_mergeChunksInPlanOrder(queue, tmp_path):
+    results = os.path.join(queue, "results")
+    # Written out of order, as workers finish; each file has its own header.
+    for k in (2, 0, 1):
+        for suffix in ("modelOutputs", "binnedAmplitudes"):
+            with open(os.path.join(results, f"chunk_{k:06d}_{suffix}.csv"), "w", newline="") as fh:
+                fh.write("Run,Value\n" + "".join(f"{k}{j},{suffix}\n" for j in range(2)))
+    out1, out2 = str(tmp_path / "m1.csv"), str(tmp_path / "m2.csv")
+    assert mergeResults(queue, out1, out2) == {out1: 6, out2: 6}
+    with open(out1) as fh:
+        lines = fh.read().splitlines()
+    assert lines[0] == "Run,Value" and [line.split(",")[0] for line in lines[1:]] == ["00", "01", "10", "11", "20", "21"]
+
+
+def test_claimSurvivesRequeueBeforeLeaseStarts(queue, monkeypatch):
+    # The chunk arrives in claimed/ with its planning time, so another worker can requeue it before the lease starts.
+    old = time.time() - 120
+    for f in os.listdir(os.path.join(queue, "pending")):
+        os.utime(os.path.join(queue, "pending", f), (old, old))
+    utime = os.utime
+
+    def requeueFirst(path, times=None):
+        monkeypatch.setattr(os, "utime", utime)
+        assert requeueExpired(queue) == ["chunk_000000"]
+        utime(path, times)
+
+    monkeypatch.setattr(os, "utime", requeueFirst)
+    chunk, _ = claimChunk(queue)
+    assert chunk["chunk_id"] == "chunk_000001"
+    assert queueStatus(queue)["pending"] == 2 and claimChunk(queue)[0]["chunk_id"] == "chunk_000000"